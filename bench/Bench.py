@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# Compile time benchmarks on synthetic programs (see RustGen.py).
+#
+# Every sweep grows one knob of the Workload over a list of values, compiles
+# the generated programs and records the time of every phase (lex, parse,
+# icgen and every optimization pass) with CompileStats, keeping the fastest
+# of --repeat runs. How a phase grows along a sweep is summed up by the slope
+# of log(time) against log(knob value): 1 for linear, 2 for quadratic.
+#
+# A phase fails when its slope is over --maxSlope, or over its slope in the
+# baseline by more than --slopeTolerance, or when it is more than
+# --timeTolerance times slower than in the baseline at the largest size.
+# Phases faster than --minTime at the largest size are too noisy to be
+# checked. Like timeit, the garbage collector is off while compiling, its
+# pauses growing with the number of live objects.
+#
+# Usage: Bench.py [--sweep NAME ...] [--quick] [--baseline FILE] [--update]
+
+import argparse
+import gc
+import json
+import math
+import sys
+import tempfile
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+from CompileStats import CompileStats
+
+import RustGen
+
+# name -> (knob, values, other knobs of the Workload)
+sweeps = {
+    "statements":  ("statements", [250, 500, 1000, 2000], {}),
+    "depth":       ("depth", [2, 4, 8, 16], {"statements": 800}),
+    "chain":       ("chain", [4, 8, 16, 32], {"statements": 250}),
+    "arraySize":   ("arraySize", [8, 16, 32, 64], {"statements": 500}),
+    "loopDensity": ("loopDensity", [0.1, 0.2, 0.4, 0.8], {"statements": 500}),
+}
+
+# --quick runs the first values of every sweep on smaller programs
+quickValues = 3
+quickScale = 4
+
+# Least squares slope of log(y) against log(x)
+def logSlope(xs, ys):
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    meanX = sum(x for x, _ in points) / len(points)
+    meanY = sum(y for _, y in points) / len(points)
+    var = sum((x - meanX) ** 2 for x, _ in points)
+    if var == 0:
+        return None
+    return sum((x - meanX) * (y - meanY) for x, y in points) / var
+
+# Fastest wall time of every phase over repeat compilations of the file at path
+def timePhases(sourcePath, level, repeat):
+    best = {}
+    for _ in range(repeat):
+        stats = CompileStats()
+        gc.collect()
+        gc.disable()
+        try:
+            Pipeline.compileFile(sourcePath, level=level, stats=stats)
+        finally:
+            gc.enable()
+        for name, entry in stats.phases.items():
+            if name != "setup":
+                best[name] = min(best.get(name, entry["wallTime"]), entry["wallTime"])
+    return best
+
+def runSweep(name, args, workDir):
+    knob, values, fixed = sweeps[name]
+    if args.quick:
+        values = values[:quickValues]
+        if knob == "statements":
+            values = [value // quickScale for value in values]
+        else:
+            fixed = dict(fixed, statements = fixed.get("statements", RustGen.Workload().statements) // quickScale)
+
+    times = {}
+    for value in values:
+        workload = RustGen.Workload(**dict(fixed, **{knob: value}))
+        sourcePath = path.join(workDir, "%s_%s.rs" % (name, value))
+        with open(sourcePath, "w") as f:
+            f.write(RustGen.generate(workload, args.seed))
+        for phase, seconds in timePhases(sourcePath, args.level, args.repeat).items():
+            times.setdefault(phase, {})[value] = seconds
+
+    phases = {}
+    for phase, byValue in times.items():
+        ys = [byValue.get(value, 0.0) for value in values]
+        phases[phase] = {"times": ys, "slope": logSlope(values, ys)}
+    return {"knob": knob, "values": values, "workload": fixed, "phases": phases}
+
+# Returns the list of failures of a phase, comparing it with its baseline
+def checkPhase(result, base, args):
+    failures = []
+    if result["times"][-1] < args.minTime:
+        return failures
+    slope = result["slope"]
+    if slope is not None and slope > args.maxSlope:
+        failures.append("slope %.2f > %.2f" % (slope, args.maxSlope))
+    if base is not None:
+        if slope is not None and base.get("slope") is not None and slope > base["slope"] + args.slopeTolerance:
+            failures.append("slope %.2f > baseline %.2f + %.2f" % (slope, base["slope"], args.slopeTolerance))
+        if args.timeTolerance > 0 and base["times"][-1] > 0 \
+                and result["times"][-1] > base["times"][-1] * args.timeTolerance:
+            failures.append("%.1fx slower than baseline" % (result["times"][-1] / base["times"][-1]))
+    return failures
+
+def main():
+    argParser = argparse.ArgumentParser(description="Compile time benchmarks on synthetic programs.")
+    argParser.add_argument("--sweep", nargs="+", choices=sorted(sweeps), default=list(sweeps))
+    argParser.add_argument("--level", type=int, default=2, help="optimization level")
+    argParser.add_argument("--repeat", type=int, default=3, help="runs per size, the fastest is kept")
+    argParser.add_argument("--seed", type=int, default=0)
+    argParser.add_argument("--quick", action="store_true", help="fewer and smaller sizes")
+    argParser.add_argument("--baseline", default=path.join(scriptPath, "baseline.json"))
+    argParser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    argParser.add_argument("--json", help="also write the results to this file")
+    argParser.add_argument("--maxSlope", type=float, default=1.4)
+    argParser.add_argument("--slopeTolerance", type=float, default=0.25)
+    argParser.add_argument("--timeTolerance", type=float, default=3.0, help="0 to not compare times")
+    argParser.add_argument("--minTime", type=float, default=0.005, help="seconds")
+    args = argParser.parse_args()
+
+    baseline = {}
+    if not args.update and path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    mode = "quick" if args.quick else "full"
+
+    results = {}
+    failed = False
+    with tempfile.TemporaryDirectory() as workDir:
+        for name in args.sweep:
+            result = results[name] = runSweep(name, args, workDir)
+            baseSweep = baseline.get(mode, {}).get(name, {})
+            if baseSweep.get("values") != result["values"]:
+                baseSweep = {}
+
+            rows = []
+            for phase, phaseResult in result["phases"].items():
+                base = baseSweep.get("phases", {}).get(phase, None)
+                failures = checkPhase(phaseResult, base, args)
+                failed = failed or len(failures) > 0
+                slope = phaseResult["slope"]
+                rows.append(
+                    [phase]
+                    + ["%.2f" % (seconds * 1000) for seconds in phaseResult["times"]]
+                    + ["-" if slope is None else "%.2f" % slope,
+                       "-" if base is None or base.get("slope") is None else "%.2f" % base["slope"],
+                       "\n".join(failures) if failures else "ok"])
+            print("Sweep %s, %s" % (name, result["workload"]))
+            print(RustParser.multiLineTabulate(
+                rows=rows,
+                headers=["Phase"] + ["%s=%s (ms)" % (result["knob"], value) for value in result["values"]]
+                        + ["Slope", "Baseline", "Status"]))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({mode: results}, f, indent=2)
+    if args.update:
+        if path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.setdefault(mode, {}).update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print("Wrote %s" % args.baseline)
+        return 0
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
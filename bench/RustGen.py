@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# Seeded generator of synthetic Rust programs for the benchmarks.
+#
+# The programs only use what the grammar accepts: i64 variables and arrays,
+# nested if/else, while and plain blocks, and +, -, * chains. Array indices
+# are constants or loop counters, both in bounds, so the programs also run
+# without panicking.
+#
+# Usage: RustGen.py [--seed N] [--statements N] [--depth N] [--chain N]
+#                   [--arraySize N] [--loopDensity F]
+
+import argparse
+import random
+
+class Workload():
+    """ Shape of a generated program.
+
+        statements:
+            Number of statements, counting the ones inside nested blocks.
+
+        depth:
+            Nesting depth of blocks. The program is a sequence of nests,
+            blocks holding a few statements and a nested if/else or while
+            statement, itself holding the next level, depth levels deep.
+
+        chain:
+            Number of terms in every expression.
+
+        arraySize:
+            Length of the arrays, and trip count of the loops.
+
+        loopDensity:
+            Fraction of the nested statements that are while loops, the
+            others being if/else statements.
+    """
+    # Simple statements at every level of a nest
+    perLevel = 4
+
+    def __init__(self, statements = 100, depth = 2, chain = 4, arraySize = 16, loopDensity = 0.3):
+        self.statements = statements
+        self.depth = depth
+        self.chain = chain
+        self.arraySize = arraySize
+        self.loopDensity = loopDensity
+
+    def asDict(self):
+        return dict(vars(self))
+
+class _Generator():
+    def __init__(self, workload, seed):
+        self.w = workload
+        self.rand = random.Random(seed)
+        self.lines = []
+        # Every scope is a dict of name -> kind ("var", "arr" or "counter")
+        self.scopes = []
+        self.names = 0
+
+    def _newName(self, prefix):
+        self.names += 1
+        return "%s%d" % (prefix, self.names)
+
+    def _visible(self, kind):
+        return [name for scope in self.scopes for name, k in scope.items() if k == kind]
+
+    def _emit(self, level, line):
+        self.lines.append("    " * level + line)
+
+    def _term(self):
+        rand = self.rand
+        choice = rand.random()
+        arrays = self._visible("arr")
+        if choice < 0.3 and arrays:
+            counters = self._visible("counter")
+            if counters and rand.random() < 0.5:
+                index = rand.choice(counters)
+            else:
+                index = str(rand.randrange(self.w.arraySize))
+            return "%s[%s]" % (rand.choice(arrays), index)
+        if choice < 0.7:
+            return rand.choice(self._visible("var") + self._visible("counter"))
+        return str(rand.randrange(100))
+
+    def _expr(self):
+        rand = self.rand
+        expr = self._term()
+        for _ in range(self.w.chain - 1):
+            if rand.random() < 0.1:
+                expr += " * %d" % rand.randrange(1, 4)
+            else:
+                expr += " %s %s" % (rand.choice("+-"), self._term())
+        return expr
+
+    def _simple(self, level):
+        """ Emits a declaration or assignment, returns the number of
+            statements emitted.
+        """
+        rand = self.rand
+        choice = rand.random()
+        variables = self._visible("var")
+        arrays = self._visible("arr")
+        if choice < 0.15 or not variables:
+            name = self._newName("v")
+            self._emit(level, "let mut %s:i64 = %s;" % (name, self._expr()))
+            self.scopes[-1][name] = "var"
+        elif choice < 0.2:
+            name = self._newName("a")
+            size = self.w.arraySize
+            if rand.random() < 0.5:
+                init = "[%d; %d]" % (rand.randrange(100), size)
+            else:
+                init = "[%s]" % ", ".join(self._expr() for _ in range(rand.randint(1, min(size, 4))))
+            self._emit(level, "let mut %s:[i64; %d] = %s;" % (name, size, init))
+            self.scopes[-1][name] = "arr"
+        elif choice < 0.4 and arrays:
+            counters = self._visible("counter")
+            index = rand.choice(counters) if counters and rand.random() < 0.5 else str(rand.randrange(self.w.arraySize))
+            self._emit(level, "%s[%s] = %s;" % (rand.choice(arrays), index, self._expr()))
+        else:
+            self._emit(level, "%s = %s;" % (rand.choice(variables), self._expr()))
+        return 1
+
+    def _nested(self, level, depth):
+        """ Emits a loop or an if/else holding the next level of a nest,
+            returns the number of statements emitted.
+        """
+        rand = self.rand
+        if rand.random() < self.w.loopDensity:
+            counter = self._newName("k")
+            self._emit(level, "let mut %s:i64 = 0;" % counter)
+            self.scopes[-1][counter] = "counter"
+            self._emit(level, "while %s < %d {" % (counter, self.w.arraySize))
+            emitted = 3 + self._nest(level + 1, depth)
+            self._emit(level + 1, "%s = %s + 1;" % (counter, counter))
+            self._emit(level, "}")
+            return emitted
+
+        self._emit(level, "if %s < %s {" % (self._expr(), self._expr()))
+        emitted = 1 + self._nest(level + 1, depth)
+        if rand.random() < 0.5:
+            self._emit(level, "} else {")
+            self.scopes.append({})
+            emitted += self._simple(level + 1)
+            self.scopes.pop()
+        self._emit(level, "}")
+        return emitted
+
+    def _nest(self, level, depth):
+        """ Emits the statements of a block in a new scope, and the nested
+            statement holding the next level while depth is left.
+        """
+        self.scopes.append({})
+        emitted = 0
+        for _ in range(self.w.perLevel):
+            emitted += self._simple(level)
+        if depth > 0:
+            emitted += self._nested(level, depth - 1)
+        self.scopes.pop()
+        return emitted
+
+    def generate(self):
+        self.lines = ["// Generated by bench/RustGen.py: %s" % self.w.asDict(), "fn main () {"]
+        # A variable and an array for the expressions to use from the start
+        self.scopes.append({"v0": "var", "a0": "arr"})
+        self._emit(1, "let mut v0:i64 = 1;")
+        self._emit(1, "let mut a0:[i64; %d] = [1; %d];" % (self.w.arraySize, self.w.arraySize))
+        emitted = 2
+        while emitted < self.w.statements:
+            self._emit(1, "{")
+            emitted += 1 + self._nest(2, self.w.depth)
+            self._emit(1, "}")
+        self.lines.append("}")
+        return "\n".join(self.lines) + "\n"
+
+# Returns the source of a program of the given Workload
+def generate(workload = None, seed = 0):
+    return _Generator(workload or Workload(), seed).generate()
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description="Generates a synthetic Rust program.")
+    argParser.add_argument("--seed", type=int, default=0)
+    defaults = Workload()
+    for name, value in defaults.asDict().items():
+        argParser.add_argument("--" + name, type=type(value), default=value)
+    args = vars(argParser.parse_args())
+    seed = args.pop("seed")
+    print(generate(Workload(**args), seed), end="")
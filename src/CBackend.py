@@ -0,0 +1,386 @@
+# Lowers a list of quads to a C translation unit.
+#
+# Every quad becomes one C statement inside pyrust_main(): labels become C
+# labels, IF/IFCMP/GOTO become (conditional) gotos and VAR/ARR allocations become
+# locals of the matching fixed width type, declared at the top of the
+# function. Array elements are addressed by byte offset, as in the IC.
+# Signed overflow wraps (-fwrapv), like the interpreter.
+#
+# build() compiles the source with the local C compiler and runNative() runs
+# the result with a timing harness, returning the final values of the
+# variables along with the time per run.
+
+import os
+import math
+import shutil
+import subprocess
+import tempfile
+
+import IntCodeGen as icg
+import ICInterp
+
+cTypes = {
+    "i8"  : "int8_t",
+    "i16" : "int16_t",
+    "i32" : "int32_t",
+    "i64" : "int64_t",
+    "u8"  : "uint8_t",
+    "u16" : "uint16_t",
+    "u32" : "uint32_t",
+    "u64" : "uint64_t",
+    "f32" : "float",
+    "f64" : "double",
+    "char": "uint32_t",
+    "bool": "bool"
+}
+
+# printf formats of the final values, by data type
+printFormats = {
+    "i8"  : ("%lld", "(long long)"),
+    "i16" : ("%lld", "(long long)"),
+    "i32" : ("%lld", "(long long)"),
+    "i64" : ("%lld", "(long long)"),
+    "u8"  : ("%llu", "(unsigned long long)"),
+    "u16" : ("%llu", "(unsigned long long)"),
+    "u32" : ("%llu", "(unsigned long long)"),
+    "u64" : ("%llu", "(unsigned long long)"),
+    "f32" : ("%.9g", "(double)"),
+    "f64" : ("%.17g", "(double)"),
+    "char": ("%llu", "(unsigned long long)"),
+    "bool": ("%d", "(int)")
+}
+
+_PROLOGUE = r'''/* Generated by PyRust CBackend. */
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+#include <time.h>
+
+static volatile uint64_t pyrust_sink;
+
+static void pyrust_panic(const char *msg) {
+    fprintf(stderr, "panicked: %s\n", msg);
+    exit(101);
+}
+
+'''
+
+_EPILOGUE = r'''
+int main(int argc, char **argv) {
+    long repeat = argc > 1 ? atol(argv[1]) : 1;
+    struct timespec start, end;
+    long i;
+
+    if (repeat < 1)
+        repeat = 1;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (i = 0; i < repeat; i++)
+        pyrust_main(i == repeat - 1);
+    clock_gettime(CLOCK_MONOTONIC, &end);
+    fprintf(stderr, "time: %.9f\n",
+            ((end.tv_sec - start.tv_sec) + (end.tv_nsec - start.tv_nsec) / 1e9) / repeat);
+    return 0;
+}
+'''
+
+def _dataType(dataType, default="i64"):
+    dataType = ICInterp.typeAliases.get(dataType, dataType)
+    return dataType if dataType in cTypes else default
+
+class _Lowering():
+    def __init__(self, quadList):
+        self.quadList = list(quadList)
+        # name -> (C name, data type, number of elements or None)
+        self.bindings = {}
+        # C declarations, in order
+        self.declarations = []
+        # temp -> data type
+        self.temps = {}
+        # bounds checks of the array elements used by the quad being lowered
+        self.checks = []
+        self.body = []
+
+    # A name has a single C variable, which the copies of its VAR/ARR quad
+    # (from unrolled loops) allocate again. The shadowing lets "name#N" (see
+    # IntCodeGen.nameTable) become vN_name.
+    def _bind(self, quad):
+        name = quad.x
+        if name in self.bindings:
+            return self.bindings[name][0]
+        base, _, number = name.partition("#")
+        cName = "v%s_%s" % (number, base)
+        dataType = _dataType(quad.z)
+        length = int(quad.y) // icg.bytesMap[dataType] if quad.type == "ARR" else None
+
+        if length is None:
+            self.declarations.append("%s %s = 0;" % (cTypes[dataType], cName))
+        else:
+            self.declarations.append("%s %s[%d] = {0};" % (cTypes[dataType], cName, length))
+        # set when the allocation is executed, only those are dumped
+        self.declarations.append("bool b_%s = false;" % cName)
+        self.bindings[name] = (cName, dataType, length)
+        return cName
+
+    def _temp(self, operand, dataType=None):
+        if operand.value not in self.temps:
+            self.temps[operand.value] = _dataType(operand.dataType if operand.dataType else dataType)
+            self.declarations.append("%s %s = 0;" % (cTypes[self.temps[operand.value]], operand.value))
+        return operand.value
+
+    def _constant(self, operand):
+        value = ICInterp.constValue(operand)
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, float):
+            if math.isnan(value):
+                return "NAN"
+            if math.isinf(value):
+                return "INFINITY" if value > 0 else "(-INFINITY)"
+            return "(%r)" % value
+        if value > 0x7fffffffffffffff:
+            return "%dULL" % value
+        return "(%dLL)" % value
+
+    def _binding(self, name):
+        binding = self.bindings.get(name, None)
+        if binding is None:
+            raise ValueError("%s used before allocation" % name)
+        return binding
+
+    # Data type of the value of an operand
+    def typeOf(self, operand):
+        if operand.type == "CONSTANT":
+            value = ICInterp.constValue(operand)
+            return _dataType(operand.dataType, "bool" if isinstance(value, bool) else "f64" if isinstance(value, float) else "i64")
+        if operand.type == "TEMPVAR":
+            return self.temps.get(operand.value, _dataType(operand.dataType))
+        if operand.type == "AE":
+            return self._binding(operand.base)[1]
+        return self._binding(operand.value)[1]
+
+    def operand(self, operand):
+        if operand.type == "CONSTANT":
+            return self._constant(operand)
+        if operand.type == "TEMPVAR":
+            return self._temp(operand)
+        if operand.type == "AE":
+            cName, dataType, length = self._binding(operand.base)
+            offset = self._offset(operand, 1)
+            return "(*(%s *)((char *)%s + %s))" % (cTypes[dataType], cName, offset)
+        return self._binding(operand.value)[0]
+
+    # C expression of the byte offset of an array element operand. The bounds
+    # check of count elements from there is added to the checks of the quad,
+    # unless the offset is constant and in bounds.
+    def _offset(self, operand, count):
+        disp = operand.disp
+        cName, dataType, length = self._binding(operand.base)
+        maxOffset = (length - count) * icg.bytesMap[dataType]
+
+        if operand.index is None:
+            if not 0 <= disp <= maxOffset:
+                self.checks.append("pyrust_panic(\"index out of bounds\");")
+            return "%d" % disp
+
+        offset = self.operand(operand.index)
+        if disp != 0:
+            offset = "(%s %s %d)" % (offset, "+" if disp > 0 else "-", abs(disp))
+        if maxOffset < 0:
+            self.checks.append("pyrust_panic(\"index out of bounds\");")
+        else:
+            self.checks.append(
+                "if ((uint64_t)%s > %dULL) pyrust_panic(\"index out of bounds\");" % (offset, maxOffset))
+        return offset
+
+    def _dest(self, operand, dataType):
+        if operand.type == "TEMPVAR":
+            self._temp(operand, dataType)
+        return self.operand(operand), self.typeOf(operand)
+
+    def _binop(self, quad):
+        y, z = self.operand(quad.y), self.operand(quad.z)
+        operandType = self.typeOf(quad.y)
+        x, xType = self._dest(quad.x, operandType if quad.op in {"+", "-", "*", "/", "%"} else "bool")
+        isFloat = operandType.startswith("f") or self.typeOf(quad.z).startswith("f")
+        code = []
+        if quad.op in {"/", "%"} and not isFloat:
+            code.append("if (%s == 0) pyrust_panic(\"attempt to divide by zero\");" % z)
+        if quad.op == "%" and isFloat:
+            expr = "fmod(%s, %s)" % (y, z)
+        else:
+            expr = "%s %s %s" % (y, quad.op, z)
+        code.append("%s = (%s)(%s);" % (x, cTypes[xType], expr))
+        return code
+
+    def _unop(self, quad):
+        y = self.operand(quad.y)
+        x, xType = self._dest(quad.x, self.typeOf(quad.y))
+        if quad.op == "-":
+            expr = "-%s" % y
+        elif xType == "bool" or self.typeOf(quad.y) == "bool":
+            expr = "!%s" % y
+        else:
+            expr = "~%s" % y
+        return ["%s = (%s)(%s);" % (x, cTypes[xType], expr)]
+
+    def _fill(self, quad):
+        count = ICInterp.constValue(quad.z)
+        if count <= 0:
+            return []
+        y = self.operand(quad.y)
+        cName, dataType, length = self._binding(quad.x.base)
+        offset = self._offset(quad.x, count)
+        return [
+            "for (i = 0; i < %d; i++) ((%s *)((char *)%s + %s))[i] = (%s)(%s);" % (count, cTypes[dataType], cName, offset, cTypes[dataType], y)
+        ]
+
+    def lower(self):
+        for quad in self.quadList:
+            typ = quad.type
+            if typ == "LABEL":
+                self.body.append("%s: ;" % quad.x)
+                continue
+            if typ == "EMPTY":
+                continue
+
+            if typ == "BINOP":
+                code = self._binop(quad)
+            elif typ == "UNOP":
+                code = self._unop(quad)
+            elif typ == "ASSIGN":
+                y = self.operand(quad.y)
+                x, xType = self._dest(quad.x, self.typeOf(quad.y))
+                code = ["%s = (%s)(%s);" % (x, cTypes[xType], y)]
+            elif typ == "FILL":
+                code = self._fill(quad)
+            elif typ == "IF":
+                code = ["if (%s) goto %s;" % (self.operand(quad.y), quad.x)]
+            elif typ == "IFCMP":
+                code = ["if (%s %s %s) goto %s;" % (self.operand(quad.y), icg.branchCompares[quad.op], self.operand(quad.z), quad.x)]
+            elif typ == "GOTO":
+                code = ["goto %s;" % quad.x]
+            elif typ in {"VAR", "ARR"}:
+                code = ["b_%s = true; /* %s */" % (self._bind(quad), str(quad).strip())]
+            else:
+                raise ValueError("cannot lower %r" % quad)
+            self.body.extend("    " + line for line in self.checks + code)
+            self.checks = []
+
+        return self._source()
+
+    # Prints every allocated variable
+    def _dump(self):
+        lines = ["    if (dump) {"]
+        for cName, dataType, length in self.bindings.values():
+            fmt, cast = printFormats[dataType]
+            lines.append("        if (b_%s) {" % cName)
+            if length is None:
+                lines.append('            printf("%s = %s\\n", %s%s);' % (cName, fmt, cast, cName))
+            else:
+                lines.append('            printf("%s = [");' % cName)
+                lines.append('            for (i = 0; i < %d; i++)' % length)
+                lines.append('                printf(i ? ", %s" : "%s", %s%s[i]);' % (fmt, fmt, cast, cName))
+                lines.append('            printf("]\\n");')
+            lines.append("        }")
+        lines.append("    }")
+        return lines
+
+    def _sink(self):
+        lines = []
+        for cName, dataType, length in self.bindings.values():
+            if length is None:
+                lines.append("    pyrust_sink ^= (uint64_t)%s;" % cName)
+            else:
+                lines.append("    for (i = 0; i < %d; i++) pyrust_sink ^= (uint64_t)%s[i];" % (length, cName))
+        return lines
+
+    def _source(self):
+        src = [_PROLOGUE, "static void pyrust_main(int dump) {", "    long i;"]
+        src.extend("    " + decl for decl in self.declarations)
+        src.append("")
+        src.extend(self.body)
+        src.append("")
+        src.extend(self._sink())
+        src.extend(self._dump())
+        src.append("}")
+        src.append(_EPILOGUE)
+        return "\n".join(src)
+
+# Returns the C source for a list of quads
+def generate(quadList):
+    return _Lowering(quadList).lower()
+
+# Variables in the order they are printed by the program, as (name, data
+# type, number of elements or None)
+def finalVariables(quadList):
+    lowering = _Lowering(quadList)
+    lowering.lower()
+    return [(name, dataType, length) for name, (_, dataType, length) in lowering.bindings.items()]
+
+def _compiler(cc):
+    return cc or os.environ.get("CC", "cc")
+
+# Compiles C source into the executable at output
+def build(source, output, cc=None, flags=("-O2",)):
+    srcPath = output + ".c"
+    with open(srcPath, "w") as f:
+        f.write(source)
+    subprocess.run([_compiler(cc)] + list(flags) + ["-fwrapv", "-w", "-o", output, srcPath, "-lm"],
+                   check=True, capture_output=True, text=True)
+    return output
+
+def _parseValue(text, dataType):
+    if text.startswith("["):
+        text = text[1:-1]
+        return [_parseValue(item.strip(), dataType) for item in text.split(",")] if text else []
+    if dataType.startswith("f"):
+        return ICInterp.wrap(float(text), dataType)
+    if dataType == "bool":
+        return text != "0"
+    return int(text)
+
+# Result of a native run
+class NativeResult():
+    __slots__ = ("variables", "seconds", "returnCode", "stderr")
+
+    def __init__(self, variables, seconds, returnCode, stderr):
+        # variable/array name -> final value, like ICInterp.ExecResult.variables
+        self.variables = variables
+        # wall time of one run of the program
+        self.seconds = seconds
+        self.returnCode = returnCode
+        self.stderr = stderr
+
+    def __repr__(self):
+        return "<NativeResult>: [seconds=%.9f, variables=%s]" % (self.seconds, self.variables)
+
+# Builds the quads into a native executable and runs it repeat times
+def runNative(quadList, repeat=1, cc=None, flags=("-O2",), workDir=None):
+    quadList = list(quadList)
+    lowering = _Lowering(quadList)
+    source = lowering.lower()
+    # C name -> (name, data type)
+    names = {cName: (name, dataType) for name, (cName, dataType, _) in lowering.bindings.items()}
+
+    tmpDir = workDir or tempfile.mkdtemp(prefix="pyrust-")
+    try:
+        exe = build(source, os.path.join(tmpDir, "pyrust_main"), cc, flags)
+        proc = subprocess.run([exe, str(repeat)], capture_output=True, text=True)
+    finally:
+        if workDir is None:
+            shutil.rmtree(tmpDir, ignore_errors=True)
+
+    variables = {}
+    for line in proc.stdout.splitlines():
+        cName, _, value = line.partition(" = ")
+        name, dataType = names[cName]
+        variables[name] = _parseValue(value, dataType)
+
+    seconds = None
+    for line in proc.stderr.splitlines():
+        if line.startswith("time: "):
+            seconds = float(line[len("time: "):])
+
+    return NativeResult(variables, seconds, proc.returncode, proc.stderr)
@@ -0,0 +1,205 @@
+# Content addressed on-disk cache of compiled quad lists.
+#
+# An entry is keyed by the sha256 of the source bytes, of the compiler
+# version (the AST configuration, the sources of the modules imported by the
+# pipeline and the binary IC format version) and of the names of the optimization passes.
+# Entries are stored in the ICBinary format under <directory>/<key[:2]>/, the
+# AST optionally next to them in the marshal form of RustAST.dumps().
+#
+# Files are written to a temporary file in the same directory and renamed over
+# the entry, so concurrent workers never see a partial entry and the last
+# writer of equal contents wins. Reading an entry touches it, and the least
+# recently used entries are removed when the cache grows over maxBytes.
+
+import hashlib
+import os
+import re
+import tempfile
+from os import path
+
+import ICBinary
+import RustAST
+
+_srcPath = path.dirname(path.realpath(__file__))
+
+# Modules whose imports, at any depth, make the AST or IC: the pipeline and
+# the lexer it can be given
+_rootModules = ["Pipeline", "RustScanner"]
+# Files the AST classes are generated from
+_generatorFiles = ["_rust_ast.cfg", "_ast_gen.py"]
+
+# import statements, at the top of a module or in a function
+_importPattern = re.compile(rb"^[ \t]*(?:import[ \t]+([\w., \t]+)|from[ \t]+(\w+)[ \t]+import)", re.M)
+
+# Names of the modules of the compiler imported by the given ones, anywhere in
+# their code, found by scanning their sources for import statements
+def _importedModules(roots):
+    seen = set()
+    stack = list(roots)
+    while stack:
+        name = stack.pop()
+        if name in seen or not path.exists(path.join(_srcPath, name + ".py")):
+            continue
+        seen.add(name)
+        with open(path.join(_srcPath, name + ".py"), "rb") as f:
+            source = f.read()
+        for names, module in _importPattern.findall(source):
+            if module:
+                stack.append(module.decode("ascii"))
+            else:
+                stack.extend(alias.split()[0].decode("ascii") for alias in names.split(b",") if alias.strip())
+    return sorted(seen)
+
+# Files whose contents change the produced AST or IC
+def versionFiles():
+    return _generatorFiles + [name + ".py" for name in _importedModules(_rootModules)]
+
+_compilerVersion = None
+
+def compilerVersion():
+    global _compilerVersion
+    if _compilerVersion is None:
+        h = hashlib.sha256(b"ICBinary %d\0" % ICBinary.VERSION)
+        for name in versionFiles():
+            with open(path.join(_srcPath, name), "rb") as f:
+                h.update(name.encode("utf-8") + b"\0")
+                h.update(f.read())
+        _compilerVersion = h.hexdigest()
+    return _compilerVersion
+
+# Names of the passes run for an optimization level or an explicit pass list,
+# with the group boundaries of the level
+def passSignature(level=1, passes=None):
+    import IntCodeOpt as ico
+    if passes is not None:
+        return "passes:" + ",".join(pas.__name__ for pas in passes)
+    return "level:" + "|".join(",".join(pas.__name__ for pas in group) for group in ico.optLevels[level])
+
+class CompileCache():
+    """ On-disk cache of compiled quad lists (and optionally ASTs).
+
+        directory:
+            Where the entries are stored, created when missing.
+
+        maxBytes:
+            Size bound of the entries. The least recently used ones are
+            removed after a put() that goes over it.
+    """
+    def __init__(self, directory, maxBytes = 64 * 1024 * 1024):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, passSignature):
+        h = hashlib.sha256()
+        h.update(compilerVersion().encode("ascii") + b"\0")
+        h.update(passSignature.encode("utf-8") + b"\0")
+        h.update(source)
+        return h.hexdigest()
+
+    def _path(self, key, suffix):
+        return path.join(self.directory, key[:2], key + suffix)
+
+    def get(self, key, withAST = False):
+        """ Returns (ast, quadList) for key, ast being None when it was not
+            stored or not asked for, or None on a miss.
+        """
+        icPath = self._path(key, ".pyic")
+        try:
+            with ICBinary.load(icPath) as view:
+                quadList = list(view)
+        except (OSError, ICBinary.ICFormatError):
+            self.misses += 1
+            return None
+
+        ast = None
+        if withAST:
+            try:
+                with open(self._path(key, ".ast"), "rb") as f:
+                    ast = RustAST.loads(f.read())
+            except (OSError, ValueError, EOFError, TypeError):
+                ast = None
+        try:
+            os.utime(icPath)
+        except OSError:
+            pass
+        self.hits += 1
+        return ast, quadList
+
+    def _write(self, target, data):
+        directory = path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmpPath, target)
+        except BaseException:
+            try:
+                os.unlink(tmpPath)
+            except OSError:
+                pass
+            raise
+
+    def put(self, key, quadList, ast = None):
+        if ast is not None:
+            self._write(self._path(key, ".ast"), RustAST.dumps(ast))
+        # the quads are written last, an entry exists once they are there
+        self._write(self._path(key, ".pyic"), ICBinary.dumps(quadList))
+        self.evict()
+
+    def entries(self):
+        """ Returns [(mtime, size, key)] of the stored entries, the size
+            including the AST.
+        """
+        entries = []
+        for sub in os.listdir(self.directory):
+            subPath = path.join(self.directory, sub)
+            if not path.isdir(subPath):
+                continue
+            sizes = {}
+            mtimes = {}
+            for name in os.listdir(subPath):
+                key, suffix = path.splitext(name)
+                if suffix not in (".pyic", ".ast"):
+                    continue
+                try:
+                    st = os.stat(path.join(subPath, name))
+                except OSError:
+                    # removed by another worker
+                    continue
+                sizes[key] = sizes.get(key, 0) + st.st_size
+                # an AST without quads (from an interrupted put) ages on its own
+                if suffix == ".pyic" or key not in mtimes:
+                    mtimes[key] = st.st_mtime
+            entries.extend((mtimes[key], sizes[key], key) for key in mtimes)
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, key in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            for suffix in (".pyic", ".ast"):
+                try:
+                    os.unlink(self._path(key, suffix))
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for _, _, key in self.entries():
+            for suffix in (".pyic", ".ast"):
+                try:
+                    os.unlink(self._path(key, suffix))
+                except OSError:
+                    pass
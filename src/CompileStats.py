@@ -0,0 +1,87 @@
+# Per-phase compile metrics.
+#
+# A CompileStats object is passed down the pipeline (RustParser.parse,
+# IntCodeGen.generate and IntCodeOpt.PassManager), which fill it in with
+# the wall and CPU time of each phase and pass, and with counts of the
+# produced tokens, AST nodes, quads, temporaries and labels.
+# Every stage checks for a stats object once per phase, so nothing is paid
+# when it is not given.
+
+import json
+import time
+from contextlib import contextmanager
+
+class CompileStats():
+    def __init__(self):
+        # phase name -> {"runs", "wallTime", "cpuTime"}, in the order the phases were first seen
+        self.phases = {}
+        # counter name -> value
+        self.counts = {}
+
+    @contextmanager
+    def phase(self, name):
+        """ Times the body of a with statement as the phase called name.
+            Repeated phases (like a pass that runs several times) are summed.
+        """
+        wallStart = time.perf_counter()
+        cpuStart = time.process_time()
+        try:
+            yield self
+        finally:
+            self.addTime(name, time.perf_counter() - wallStart, time.process_time() - cpuStart)
+
+    def addTime(self, name, wallTime, cpuTime):
+        entry = self.phases.get(name, None)
+        if entry is None:
+            entry = self.phases[name] = {"runs": 0, "wallTime": 0.0, "cpuTime": 0.0}
+        entry["runs"] += 1
+        entry["wallTime"] += wallTime
+        entry["cpuTime"] += cpuTime
+
+    def count(self, name, value):
+        self.counts[name] = value
+
+    def totalTime(self):
+        return sum(entry["wallTime"] for entry in self.phases.values())
+
+    def toDict(self):
+        return {
+            "phases": self.phases,
+            "counts": self.counts,
+            "totalWallTime": self.totalTime()
+        }
+
+    def toJSON(self, indent=None):
+        return json.dumps(self.toDict(), indent=indent)
+
+    def table(self):
+        """ Renders the phases and counts with Tabulate.multiLineTabulate.
+        """
+        from Tabulate import multiLineTabulate
+
+        phaseRows = [
+            [name, str(entry["runs"]), "%.3f" % (entry["wallTime"] * 1000), "%.3f" % (entry["cpuTime"] * 1000)]
+            for name, entry in self.phases.items()
+        ]
+        if len(phaseRows) == 0:
+            phaseRows = [["", "", "", ""]]
+        countRows = [[name, str(value)] for name, value in self.counts.items()]
+        if len(countRows) == 0:
+            countRows = [["", ""]]
+
+        return "\n".join([
+            multiLineTabulate(phaseRows, ["PHASE", "RUNS", "WALL (ms)", "CPU (ms)"]),
+            multiLineTabulate(countRows, ["COUNTER", "VALUE"])
+        ])
+
+# Number of nodes in an AST, walked without recursion.
+def countNodes(ast):
+    count = 0
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        count += 1
+        stack.extend(node)
+    return count
@@ -0,0 +1,349 @@
+# Control flow analysis of lists of quads.
+#
+# A ControlFlowGraph splits the quads into basic blocks. A block starts at a
+# label or after a jump, and ends with a jump (IF, IFCMP or GOTO) or before a
+# label.
+# Its successors are the block of the label it jumps to and, unless it ends
+# with a GOTO, the next block it falls through to. The first block is an
+# empty entry block, so that nothing jumps to the entry.
+#
+# A DominatorTree holds the immediate dominator of every block reachable from
+# the entry, found with the iterative algorithm of Cooper, Harvey and Kennedy
+# ("A Simple, Fast Dominance Algorithm"), and gives the dominance frontiers.
+#
+# A LoopForest holds the natural loops: an edge to a block dominating its
+# source is a back edge, and the loop of a header is made of the header and
+# the blocks reaching one of its back edges without going through it. Loops
+# with different headers are disjoint or nested, and form a forest whose
+# depth is the nesting depth.
+#
+# An AnalysisCache computes these for a list of quads when they are first
+# asked for, and keeps them until the quads change.
+
+from collections import Counter
+
+import IntCodeGen as icg
+
+class Block():
+    __slots__ = ("index", "start", "end", "jump", "fallthrough", "succs", "preds")
+
+    def __init__(self, index, start):
+        self.index = index
+        # the quads of the block are quadList[start:end]
+        self.start = start
+        self.end = start
+        # block of the label jumped to by the last quad, or None
+        self.jump = None
+        # next block, if the block can fall through to it, or None
+        self.fallthrough = None
+        self.succs = []
+        self.preds = []
+
+    def __repr__(self):
+        return "<Block>: [%d, quads=%d..%d, succs=%s, preds=%s]" % (
+            self.index, self.start, self.end - 1, self.succs, self.preds)
+
+class ControlFlowGraph():
+    """ Basic blocks of a list of quads. blocks[0] is the empty entry
+        block, and labelBlock maps every label to the index of the block it
+        starts.
+    """
+    def __init__(self, quadList):
+        self.quadList = quadList
+        self.blocks = [Block(0, 0)]
+        self.labelBlock = {}
+
+        block = None
+        for ind, quad in enumerate(quadList):
+            if block is None or (quad.type == "LABEL" and block.end > block.start):
+                block = Block(len(self.blocks), ind)
+                self.blocks.append(block)
+            if quad.type == "LABEL":
+                self.labelBlock[quad.x] = block.index
+            block.end = ind + 1
+            if quad.type in icg.jumpTypes:
+                block = None
+
+        for block in self.blocks:
+            last = quadList[block.end - 1] if block.end > block.start else None
+            if last is not None and last.type in icg.jumpTypes:
+                block.jump = self.labelBlock[last.x]
+            if (last is None or last.type != "GOTO") and block.index + 1 < len(self.blocks):
+                block.fallthrough = block.index + 1
+            for succ in (block.jump, block.fallthrough):
+                if succ is not None and succ not in block.succs:
+                    block.succs.append(succ)
+                    self.blocks[succ].preds.append(block.index)
+
+    def quads(self, block):
+        return self.quadList[block.start:block.end]
+
+    def reversePostOrder(self):
+        """ Indices of the blocks reachable from the entry, in reverse
+            postorder of a depth first search.
+        """
+        order = []
+        seen = {0}
+        stack = [(0, iter(self.blocks[0].succs))]
+        while stack:
+            ind, succs = stack[-1]
+            for succ in succs:
+                if succ not in seen:
+                    seen.add(succ)
+                    stack.append((succ, iter(self.blocks[succ].succs)))
+                    break
+            else:
+                stack.pop()
+                order.append(ind)
+        order.reverse()
+        return order
+
+class DominatorTree():
+    """ Dominators of the blocks of a ControlFlowGraph.
+
+        idom:
+            Index of the immediate dominator of every block, the entry being
+            its own and the blocks not reachable from the entry having None.
+
+        children:
+            Blocks immediately dominated by every block.
+
+        order:
+            Reachable blocks in reverse postorder, so every block comes after
+            its immediate dominator.
+    """
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.order = cfg.reversePostOrder()
+        blocks = cfg.blocks
+        rpoNumber = {ind: number for number, ind in enumerate(self.order)}
+        idom = [None] * len(blocks)
+        idom[0] = 0
+
+        def intersect(a, b):
+            while a != b:
+                while rpoNumber[a] > rpoNumber[b]:
+                    a = idom[a]
+                while rpoNumber[b] > rpoNumber[a]:
+                    b = idom[b]
+            return a
+
+        changed = True
+        while changed:
+            changed = False
+            for ind in self.order[1:]:
+                newIdom = None
+                for pred in blocks[ind].preds:
+                    if idom[pred] is not None:
+                        newIdom = pred if newIdom is None else intersect(pred, newIdom)
+                if idom[ind] != newIdom:
+                    idom[ind] = newIdom
+                    changed = True
+
+        self.idom = idom
+        self.children = [[] for _ in blocks]
+        for ind in self.order[1:]:
+            self.children[idom[ind]].append(ind)
+
+    def reachable(self, ind):
+        return self.idom[ind] is not None
+
+    def dominates(self, a, b):
+        """ Whether block a dominates block b (both reachable).
+        """
+        while b != a and b != 0:
+            b = self.idom[b]
+        return b == a
+
+    def frontiers(self):
+        """ Dominance frontier of every block: the blocks where its dominance
+            stops, a list of sets.
+        """
+        blocks = self.cfg.blocks
+        idom = self.idom
+        frontiers = [set() for _ in blocks]
+        for ind in self.order:
+            preds = [pred for pred in blocks[ind].preds if idom[pred] is not None]
+            if len(preds) < 2:
+                continue
+            for pred in preds:
+                runner = pred
+                while runner != idom[ind]:
+                    frontiers[runner].add(ind)
+                    runner = idom[runner]
+        return frontiers
+
+class Loop():
+    """ A natural loop of a ControlFlowGraph.
+
+        header:
+            Block entering the loop, which dominates all its blocks.
+
+        blocks:
+            Set of the blocks of the loop, those of the nested loops included.
+
+        backEdges:
+            Blocks jumping or falling through to the header from the loop.
+
+        exits:
+            Blocks out of the loop that blocks of the loop go to.
+
+        parent, children, depth:
+            Innermost loop holding this one (None for an outermost loop), the
+            loops it holds, and its nesting depth (1 for an outermost loop).
+    """
+    __slots__ = ("header", "blocks", "backEdges", "exits", "parent", "children", "depth")
+
+    def __init__(self, header, blocks, backEdges, exits):
+        self.header = header
+        self.blocks = blocks
+        self.backEdges = backEdges
+        self.exits = exits
+        self.parent = None
+        self.children = []
+        self.depth = 1
+
+    def __repr__(self):
+        return "<Loop>: [header=%d, blocks=%s, depth=%d, exits=%s]" % (
+            self.header, sorted(self.blocks), self.depth, sorted(self.exits))
+
+    def span(self, cfg):
+        """ (first, last) indices of the quads from the header to the goto
+            back to it, when the loop is laid out like the loops of
+            IntCodeGen: the header first, and the last block ending with that
+            goto. The quads in between may include blocks leaving the loop.
+            None otherwise.
+        """
+        last = max(self.blocks)
+        if min(self.blocks) != self.header:
+            return None
+        end = cfg.blocks[last].end - 1
+        quad = cfg.quadList[end] if end >= cfg.blocks[last].start else None
+        if quad is None or quad.type != "GOTO" or cfg.labelBlock.get(quad.x) != self.header:
+            return None
+        return cfg.blocks[self.header].start, end
+
+class LoopForest():
+    """ Natural loops of the blocks of a ControlFlowGraph.
+
+        loops:
+            All the loops, every loop coming after the loops holding it.
+
+        roots:
+            Outermost loops.
+
+        loopOf:
+            Innermost loop of every block, None for the blocks in no loop.
+    """
+    def __init__(self, cfg, domTree):
+        self.cfg = cfg
+        blocks = cfg.blocks
+
+        tails = {}
+        for ind in domTree.order:
+            for succ in blocks[ind].succs:
+                if domTree.dominates(succ, ind):
+                    tails.setdefault(succ, []).append(ind)
+
+        loops = []
+        for header, backEdges in tails.items():
+            body = {header}
+            stack = list(backEdges)
+            while stack:
+                ind = stack.pop()
+                if ind not in body:
+                    body.add(ind)
+                    stack.extend(pred for pred in blocks[ind].preds if domTree.reachable(pred))
+            exits = {succ for ind in body for succ in blocks[ind].succs if succ not in body}
+            loops.append(Loop(header, body, backEdges, exits))
+
+        # Larger loops first: a loop is held by the innermost of the loops
+        # before it that holds its header
+        loops.sort(key = lambda loop: (-len(loop.blocks), loop.header))
+        self.loops = loops
+        self.roots = []
+        self.loopOf = [None] * len(blocks)
+        for loop in loops:
+            loop.parent = self.loopOf[loop.header]
+            if loop.parent is None:
+                self.roots.append(loop)
+            else:
+                loop.parent.children.append(loop)
+                loop.depth = loop.parent.depth + 1
+            for ind in loop.blocks:
+                self.loopOf[ind] = loop
+        for loop in loops:
+            loop.children.sort(key = lambda child: child.header)
+        self.roots.sort(key = lambda loop: loop.header)
+
+    def depth(self, ind):
+        """ Nesting depth of block ind, 0 out of the loops.
+        """
+        loop = self.loopOf[ind]
+        return 0 if loop is None else loop.depth
+
+    def preorder(self):
+        """ The loops, outer loops before the ones they hold, in the order
+            of their headers.
+        """
+        order = []
+        stack = list(reversed(self.roots))
+        while stack:
+            loop = stack.pop()
+            order.append(loop)
+            stack.extend(reversed(loop.children))
+        return order
+
+    def postorder(self):
+        """ The loops, inner loops before the ones holding them.
+        """
+        order = []
+        stack = [(loop, False) for loop in reversed(self.roots)]
+        while stack:
+            loop, done = stack.pop()
+            if done:
+                order.append(loop)
+            else:
+                stack.append((loop, True))
+                stack.extend((child, False) for child in reversed(loop.children))
+        return order
+
+class AnalysisCache():
+    """ Analyses of a list of quads, computed when first asked for and kept
+        until invalidate() is called, which must be done when the quads
+        change. Asking for the analyses of another list recomputes them.
+
+        computed:
+            Number of times every analysis was computed.
+    """
+    def __init__(self):
+        self.computed = Counter()
+        self.invalidate()
+
+    def invalidate(self):
+        self.quadList = None
+        self._results = {}
+
+    def keep(self, quadList):
+        """ Keeps the analyses for quadList, holding the same quads as the
+            list they were computed for.
+        """
+        self.quadList = quadList
+
+    def _get(self, quadList, name, compute):
+        if quadList is not self.quadList:
+            self.invalidate()
+            self.quadList = quadList
+        if name not in self._results:
+            self.computed[name] += 1
+            self._results[name] = compute()
+        return self._results[name]
+
+    def cfg(self, quadList):
+        return self._get(quadList, "cfg", lambda: ControlFlowGraph(quadList))
+
+    def domTree(self, quadList):
+        return self._get(quadList, "domTree", lambda: DominatorTree(self.cfg(quadList)))
+
+    def loops(self, quadList):
+        return self._get(quadList, "loops", lambda: LoopForest(self.cfg(quadList), self.domTree(quadList)))
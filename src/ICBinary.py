@@ -0,0 +1,218 @@
+# Binary format for lists of quads.
+#
+# All the numbers are little endian. A file is made of:
+#     header:    magic "PYIC", version (u16), flags (u16), number of strings,
+#                operands and quads (u32 each)
+#     strings:   number of strings + 1 offsets (u32) into the string data,
+#                followed by the UTF-8 string data
+#     operands:  24 byte records: kind (u8), value tag (u8), padding (u16),
+#                value and data type as string indices (u32), index (u32,
+#                the operand index of the index of array elements) and
+#                displacement (i64, of array elements)
+#     quads:     16 byte records: op as a string index, x, y and z as operand
+#                indices (u32)
+# Missing operands and data types are NONE. Equal strings and operands are
+# stored once. The value of an array element is the name of its array, and
+# its index operand comes before it. Folded displacements beyond the range of
+# an i64 are stored as a string index instead, with a value tag of 1.
+#
+# dump()/dumps() write a list of quads, load()/loads() return an ICView that
+# decodes the quads one at a time when they are indexed, load() memory
+# mapping the file.
+
+import mmap
+import struct
+
+import IntCodeGen as icg
+
+MAGIC = b"PYIC"
+VERSION = 3
+
+NONE = 0xffffffff
+
+_header = struct.Struct("<4sHHIII")
+_offset = struct.Struct("<I")
+_operand = struct.Struct("<BBHIIIq")
+
+_dispRange = range(-1 << 63, 1 << 63)
+_quad = struct.Struct("<IIII")
+
+class ICFormatError(ValueError): pass
+
+# Operand kinds. RAW is for the plain strings that some quads hold instead of
+# operands (labels, names and sizes of allocations).
+operandKinds = ["RAW", "CONSTANT", "ID", "TEMPVAR", "AE"]
+_kindCodes = {kind: code for code, kind in enumerate(operandKinds)}
+
+# Types of operand values, folded constants not being strings anymore
+_valueTags = [str, int, float, bool]
+_tagCodes = {typ: code for code, typ in enumerate(_valueTags)}
+
+def _decodeValue(tag, text):
+    if tag == 0:
+        return text
+    if tag == 3:
+        return text == "True"
+    return _valueTags[tag](text)
+
+class _Writer():
+    def __init__(self):
+        self.strings = {}
+        self.operands = {}
+        self.operandRecords = []
+
+    def string(self, value):
+        if value is None:
+            return NONE
+        index = self.strings.get(value, None)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def operand(self, operand):
+        if operand is None:
+            return NONE
+        if isinstance(operand, icg.Operand):
+            tag = _tagCodes.get(type(operand.value), None)
+            if tag is None:
+                raise ICFormatError("cannot store the operand value %r" % (operand.value, ))
+            if operand.type == "AE":
+                disp = (0, operand.disp) if operand.disp in _dispRange else (1, self.string(str(operand.disp)))
+                key = (_kindCodes["AE"], disp[0], self.string(operand.base), self.string(operand.dataType),
+                       self.operand(operand.index), disp[1])
+            else:
+                key = (_kindCodes[operand.type], tag, self.string(str(operand.value)), self.string(operand.dataType), NONE, 0)
+        else:
+            key = (_kindCodes["RAW"], 0, self.string(str(operand)), NONE, NONE, 0)
+        index = self.operands.get(key, None)
+        if index is None:
+            index = self.operands[key] = len(self.operandRecords)
+            self.operandRecords.append(key)
+        return index
+
+    def write(self, quadList):
+        quadRecords = bytearray()
+        count = 0
+        for quad in quadList:
+            quadRecords += _quad.pack(self.string(quad.op), self.operand(quad.x), self.operand(quad.y), self.operand(quad.z))
+            count += 1
+
+        data = [s.encode("utf-8") for s in self.strings]
+        offsets = [0]
+        for encoded in data:
+            offsets.append(offsets[-1] + len(encoded))
+
+        return b"".join([
+            _header.pack(MAGIC, VERSION, 0, len(data), len(self.operandRecords), count),
+            struct.pack("<%dI" % len(offsets), *offsets),
+            b"".join(data),
+            b"".join(_operand.pack(kind, tag, 0, value, dataType, index, disp)
+                     for kind, tag, value, dataType, index, disp in self.operandRecords),
+            bytes(quadRecords)
+        ])
+
+# Returns the binary form of a list of quads
+def dumps(quadList):
+    return _Writer().write(quadList)
+
+def dump(quadList, path):
+    with open(path, "wb") as f:
+        f.write(dumps(quadList))
+
+class ICView():
+    """ Read-only sequence of the quads stored in a buffer in the binary
+        format. Quads are decoded when they are indexed, into new Quad
+        objects every time.
+    """
+    def __init__(self, buffer, closeable=None):
+        self.buffer = buffer
+        self._closeable = closeable
+        if len(buffer) < _header.size:
+            raise ICFormatError("truncated header")
+        magic, version, _, self.stringCount, self.operandCount, self.quadCount = _header.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ICFormatError("not an IC file")
+        if version != VERSION:
+            raise ICFormatError("unsupported IC format version %d" % version)
+
+        self._offsetsAt = _header.size
+        self._stringsAt = self._offsetsAt + (self.stringCount + 1) * _offset.size
+        stringsSize = _offset.unpack_from(buffer, self._offsetsAt + self.stringCount * _offset.size)[0]
+        self._operandsAt = self._stringsAt + stringsSize
+        self._quadsAt = self._operandsAt + self.operandCount * _operand.size
+        if len(buffer) < self._quadsAt + self.quadCount * _quad.size:
+            raise ICFormatError("truncated IC file")
+
+        self._strings = {}
+
+    def string(self, index):
+        if index == NONE:
+            return None
+        value = self._strings.get(index, None)
+        if value is None:
+            start, end = struct.unpack_from("<II", self.buffer, self._offsetsAt + index * _offset.size)
+            value = self._strings[index] = self.buffer[self._stringsAt + start:self._stringsAt + end].decode("utf-8")
+        return value
+
+    def operand(self, index):
+        if index == NONE:
+            return None
+        kind, tag, _, value, dataType, aeIndex, disp = _operand.unpack_from(self.buffer, self._operandsAt + index * _operand.size)
+        if kind == 0:
+            return self.string(value)
+        if kind == _kindCodes["AE"]:
+            if tag == 1:
+                disp = int(self.string(disp))
+            return icg.arrayElement(self.string(value), self.operand(aeIndex), disp, self.string(dataType))
+        return icg.Operand(_decodeValue(tag, self.string(value)), operandKinds[kind], self.string(dataType))
+
+    def __len__(self):
+        return self.quadCount
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.quadCount))]
+        if index < 0:
+            index += self.quadCount
+        if not 0 <= index < self.quadCount:
+            raise IndexError("quad index out of range")
+        op, x, y, z = _quad.unpack_from(self.buffer, self._quadsAt + index * _quad.size)
+        return icg.Quad(op = self.string(op), x = self.operand(x), y = self.operand(y), z = self.operand(z))
+
+    def __iter__(self):
+        for index in range(self.quadCount):
+            yield self[index]
+
+    def close(self):
+        self._strings = {}
+        self.buffer = None
+        if self._closeable is not None:
+            for closeable in self._closeable:
+                closeable.close()
+            self._closeable = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Returns an ICView over the binary form of a list of quads
+def loads(data):
+    return ICView(data)
+
+# Returns an ICView over a memory mapped file. Close it when done.
+def load(path):
+    f = open(path, "rb")
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # empty file
+        f.close()
+        raise ICFormatError("truncated header")
+    try:
+        return ICView(mapped, closeable=[mapped, f])
+    except ICFormatError:
+        mapped.close()
+        f.close()
+        raise
@@ -0,0 +1,285 @@
+# Interpreter for the quads produced by IntCodeGen.generate
+#
+# Variables and arrays live in a flat byte memory: every VAR/ARR quad
+# allocates its bytes and array element operands are byte offsets from the
+# start of the array. They are found by name, a let shadowing another binding
+# having a name of its own ("name#N", see IntCodeGen.nameTable). Values are
+# stored with the width and signedness of their data type, integer arithmetic
+# wraps around like Rust release builds and f32 values are rounded to single
+# precision.
+# Temporaries are kept aside, with the data type of their operand.
+#
+# run() returns the number of executed instructions per opcode, the number
+# of times each label was reached and the final values of the variables.
+
+import ast
+import math
+import struct
+from collections import Counter
+
+import IntCodeGen as icg
+
+class ICRuntimeError(Exception): pass
+
+# Literal types left over from parsing that were never coerced
+typeAliases = icg.typeAliases
+
+# struct formats of the data types in icg.bytesMap
+structFormats = {
+    "i8"  : "<b",
+    "i16" : "<h",
+    "i32" : "<i",
+    "i64" : "<q",
+    "u8"  : "<B",
+    "u16" : "<H",
+    "u32" : "<I",
+    "u64" : "<Q",
+    "f32" : "<f",
+    "f64" : "<d",
+    "char": "<I",
+    "bool": "<?"
+}
+
+def _dataType(dataType):
+    return typeAliases.get(dataType, dataType)
+
+# Converts a Python value to the given data type, wrapping integers to its width.
+def wrap(value, dataType):
+    dataType = _dataType(dataType)
+    if dataType is None:
+        return value
+    kind = dataType[0]
+    if kind in {"i", "u"}:
+        bits = icg.bytesMap[dataType] * 8
+        value = int(value) & ((1 << bits) - 1)
+        if kind == "i" and value >= 1 << (bits - 1):
+            value -= 1 << bits
+        return value
+    if kind == "f":
+        value = float(value)
+        if dataType == "f32" and math.isfinite(value):
+            try:
+                value = struct.unpack("<f", struct.pack("<f", value))[0]
+            except OverflowError:
+                value = math.copysign(math.inf, value)
+        return value
+    if dataType == "bool":
+        return bool(value)
+    return value
+
+# Value of a CONSTANT operand. Constants straight from the parser are strings,
+# folded ones are already Python values.
+def constValue(operand):
+    value = operand.value
+    if not isinstance(value, str):
+        return value
+    if value in {"True", "False"}:
+        return value == "True"
+    if value.startswith("'"):
+        return ord(ast.literal_eval(value))
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+def _isFloat(*values):
+    return any(isinstance(value, float) for value in values)
+
+def _divide(a, b):
+    if _isFloat(a, b):
+        if b == 0:
+            return math.nan if a == 0 or math.isnan(a) else math.copysign(math.inf, a) * math.copysign(1, b)
+        return a / b
+    if b == 0:
+        raise ICRuntimeError("attempt to divide by zero")
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+def _remainder(a, b):
+    if _isFloat(a, b):
+        return math.fmod(a, b) if b != 0 else math.nan
+    if b == 0:
+        raise ICRuntimeError("attempt to calculate the remainder with a divisor of zero")
+    r = abs(a) % abs(b)
+    return r if a >= 0 else -r
+
+binaryOps = {
+    "+":  lambda a, b: a + b,
+    "-":  lambda a, b: a - b,
+    "*":  lambda a, b: a * b,
+    "/":  _divide,
+    "%":  _remainder,
+    "<":  lambda a, b: a < b,
+    ">":  lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "&&": lambda a, b: bool(a) and bool(b),
+    "||": lambda a, b: bool(a) or bool(b),
+}
+
+# Evaluates a binary operator with Rust semantics for a result of dataType.
+def evalBinOp(op, a, b, dataType=None):
+    return wrap(binaryOps[op](a, b), dataType)
+
+# Evaluates a unary operator. "!" is logical not on bools and bitwise not on integers.
+def evalUnOp(op, a, dataType=None):
+    if op == "-":
+        return wrap(-a, dataType)
+    if isinstance(a, bool) or _dataType(dataType) == "bool":
+        return not a
+    return wrap(~int(a), dataType)
+
+# Result of running a list of quads
+class ExecResult():
+    __slots__ = ("opCounts", "labelCounts", "steps", "variables")
+
+    def __init__(self, opCounts, labelCounts, steps, variables):
+        # opcode -> number of executions
+        self.opCounts = opCounts
+        # label -> number of times it was reached
+        self.labelCounts = labelCounts
+        # number of executed instructions (labels and empty quads excluded)
+        self.steps = steps
+        # variable/array name -> final value (list of values for arrays)
+        self.variables = variables
+
+    def __repr__(self):
+        return "<ExecResult>: [steps=%d, variables=%s]" % (self.steps, self.variables)
+
+class Machine():
+    """ Executes a list of quads. Use run() unless the memory needs to be
+        inspected afterwards.
+    """
+    def __init__(self, quadList, maxSteps=10**7):
+        self.quadList = list(quadList)
+        self.maxSteps = maxSteps
+        self.memory = bytearray()
+        # name -> (address, data type, number of elements or None for variables)
+        self.bindings = {}
+        # quad index of a VAR/ARR -> address, so that loops reuse their allocations
+        self.allocations = {}
+        self.temps = {}
+
+    def _allocate(self, ind, quad):
+        address = self.allocations.get(ind, None)
+        size = int(quad.y)
+        if address is None:
+            address = len(self.memory)
+            self.memory.extend(bytes(size))
+            self.allocations[ind] = address
+        dataType = _dataType(quad.z)
+        elemSize = icg.bytesMap[dataType]
+        self.bindings[quad.x] = (address, dataType, size // elemSize if quad.type == "ARR" else None)
+
+    def _binding(self, name):
+        binding = self.bindings.get(name, None)
+        if binding is None:
+            raise ICRuntimeError("%s used before allocation" % name)
+        return binding
+
+    def _address(self, operand):
+        if operand.type == "AE":
+            address, dataType, length = self._binding(operand.base)
+            offset = operand.disp
+            if operand.index is not None:
+                offset += self.load(operand.index)
+            if offset < 0 or offset + icg.bytesMap[dataType] > length * icg.bytesMap[dataType]:
+                raise ICRuntimeError("index out of bounds: %s at byte offset %d" % (operand.base, offset))
+            return address + offset, dataType
+        address, dataType, _ = self._binding(operand.value)
+        return address, dataType
+
+    def load(self, operand):
+        if operand.type == "CONSTANT":
+            return constValue(operand)
+        if operand.type == "TEMPVAR":
+            try:
+                return self.temps[operand.value]
+            except KeyError:
+                raise ICRuntimeError("%s used before assignment" % operand.value)
+        address, dataType = self._address(operand)
+        return struct.unpack_from(structFormats[dataType], self.memory, address)[0]
+
+    def store(self, operand, value):
+        if operand.type == "TEMPVAR":
+            self.temps[operand.value] = wrap(value, operand.dataType)
+            return
+        address, dataType = self._address(operand)
+        struct.pack_into(structFormats[dataType], self.memory, address, wrap(value, dataType))
+
+    # Stores value into count consecutive elements, starting from the array element operand
+    def fill(self, operand, value, count):
+        if count <= 0:
+            return
+        address, dataType = self._address(operand)
+        base, _, length = self._binding(operand.base)
+        size = icg.bytesMap[dataType]
+        if address - base + count * size > length * size:
+            raise ICRuntimeError("index out of bounds: filling %d elements of %s" % (count, operand.value))
+        self.memory[address:address + count * size] = struct.pack(structFormats[dataType], wrap(value, dataType)) * count
+
+    def run(self):
+        quadList = self.quadList
+        labelInd = {quad.x: ind for ind, quad in enumerate(quadList) if quad.type == "LABEL"}
+        opCounts = Counter()
+        labelCounts = Counter()
+        steps = 0
+        ind = 0
+
+        while ind < len(quadList):
+            quad = quadList[ind]
+            typ = quad.type
+            ind += 1
+
+            if typ == "LABEL":
+                labelCounts[quad.x] += 1
+                continue
+            if typ == "EMPTY":
+                continue
+
+            steps += 1
+            if steps > self.maxSteps:
+                raise ICRuntimeError("step limit of %d exceeded" % self.maxSteps)
+
+            if typ == "BINOP":
+                opCounts[quad.op] += 1
+                self.store(quad.x, evalBinOp(quad.op, self.load(quad.y), self.load(quad.z), quad.x.dataType))
+            elif typ == "UNOP":
+                opCounts[quad.op] += 1
+                self.store(quad.x, evalUnOp(quad.op, self.load(quad.y), quad.x.dataType))
+            else:
+                opCounts[typ] += 1
+                if typ == "ASSIGN":
+                    self.store(quad.x, self.load(quad.y))
+                elif typ == "FILL":
+                    self.fill(quad.x, self.load(quad.y), constValue(quad.z))
+                elif typ == "IF":
+                    if self.load(quad.y):
+                        ind = labelInd[quad.x]
+                elif typ == "IFCMP":
+                    if binaryOps[icg.branchCompares[quad.op]](self.load(quad.y), self.load(quad.z)):
+                        ind = labelInd[quad.x]
+                elif typ == "GOTO":
+                    ind = labelInd[quad.x]
+                elif typ in {"VAR", "ARR"}:
+                    self._allocate(ind - 1, quad)
+                else:
+                    raise ICRuntimeError("cannot execute %r" % quad)
+
+        return ExecResult(opCounts, labelCounts, steps, self.variables())
+
+    def variables(self):
+        values = {}
+        for name, (address, dataType, length) in self.bindings.items():
+            fmt = structFormats[dataType]
+            if length is None:
+                values[name] = struct.unpack_from(fmt, self.memory, address)[0]
+            else:
+                values[name] = [value for (value, ) in struct.iter_unpack(fmt, self.memory[address:address + length * icg.bytesMap[dataType]])]
+        return values
+
+# Runs a list of quads and returns an ExecResult
+def run(quadList, maxSteps=10**7):
+    return Machine(quadList, maxSteps).run()
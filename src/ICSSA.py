@@ -0,0 +1,227 @@
+# Static single assignment form of lists of quads.
+#
+# Every definition of a variable or temp gets a new version of its name,
+# "name.N", so that every version is assigned exactly once. This includes the
+# VAR quad of a let. The VAR quads of a name all come from the same let, run
+# again in a loop or copied by unrolling, as a let shadowing another binding
+# has a name of its own (see IntCodeGen.nameTable). Version 0 ("name.0") is the
+# undefined value a name has on entry. Where versions of a name meet, at the
+# iterated dominance frontier of its definitions, a Phi picks the version of
+# the edge the block was entered from. Phis are only placed for the names read
+# in some block before being defined in it (semi-pruned SSA), the others only
+# living in a block.
+#
+# Arrays are not versioned: array elements are memory, and only the variable
+# or temp of their index is renamed.
+#
+# toQuads() destroys the SSA form by giving every version back the name of
+# its variable and dropping the phis. This is correct as long as the versions
+# of a name are never live at the same time, which holds for the SSA built
+# here and is kept by changes that only replace uses with constants or remove
+# code (see IntCodeOpt.sparseConditionalConstantPropagation).
+
+import IntCodeGen as icg
+from ICAnalysis import ControlFlowGraph, DominatorTree
+
+class Phi():
+    __slots__ = ("name", "target", "args")
+
+    def __init__(self, name, target, args):
+        # name of the variable or temp
+        self.name = name
+        # version defined by the phi
+        self.target = target
+        # version coming from every predecessor of the block, in the order
+        # of its preds (None for the ones not reachable from the entry)
+        self.args = args
+
+    def __repr__(self):
+        return "<Phi>: [%s = phi(%s)]" % (self.target, ", ".join(map(str, self.args)))
+
+    def __str__(self):
+        return "    %s = phi %s" % (self.target, ", ".join(map(str, self.args)))
+
+def version(name, number):
+    return "%s.%d" % (name, number)
+
+# Name of the variable or temp of a version
+def baseName(name):
+    return name.rpartition(".")[0] or name
+
+# Scalars defined by a quad: variables and temps (not array elements)
+def definedName(quad):
+    if quad.type in {"ASSIGN", "BINOP", "UNOP"} and quad.x.type in {"ID", "TEMPVAR"}:
+        return quad.x.value
+    if quad.type == "VAR":
+        return quad.x
+    return None
+
+# Names of the variables and temps read by a quad, the index of array elements included
+def readNames(quad):
+    if quad.type not in {"BINOP", "UNOP", "ASSIGN", "FILL", "IF", "IFCMP"}:
+        return
+    for operand in (quad.x, quad.y, quad.z):
+        if not isinstance(operand, icg.Operand):
+            continue
+        if operand.type == "AE":
+            if operand.index is not None:
+                yield operand.index.value
+        elif operand.type in {"ID", "TEMPVAR"} and operand is not quad.x:
+            yield operand.value
+
+# operand with the names it reads given by rename(name)
+def _renamedOperand(operand, rename):
+    if not isinstance(operand, icg.Operand):
+        return operand
+    if operand.type == "AE":
+        if operand.index is None:
+            return operand
+        return icg.arrayElement(operand.base, _renamedOperand(operand.index, rename), operand.disp, operand.dataType)
+    if operand.type in {"ID", "TEMPVAR"}:
+        return icg.Operand(rename(operand.value), operand.type, operand.dataType)
+    return operand
+
+# Copy of quad reading the names given by rename and defining target
+def _renamedQuad(quad, rename, target):
+    if quad.type in {"LABEL", "GOTO", "ARR", "EMPTY"}:
+        return quad
+    if quad.type == "VAR":
+        return icg.Quad(op = quad.op, x = target, y = quad.y, z = quad.z)
+    x = quad.x
+    if target is not None:
+        x = icg.Operand(target, x.type, x.dataType)
+    elif isinstance(x, icg.Operand) and x.type == "AE":
+        x = _renamedOperand(x, rename)
+    return icg.Quad(op = quad.op, x = x, y = _renamedOperand(quad.y, rename), z = _renamedOperand(quad.z, rename))
+
+class SSAForm():
+    """ SSA form of a list of quads.
+
+        cfg, domTree:
+            ICAnalysis.ControlFlowGraph of the quads and its DominatorTree.
+
+        phis, code:
+            Phis and quads (renamed copies) of every block. The blocks not
+            reachable from the entry have none, and are left out by toQuads().
+
+        versions:
+            Number of versions of every name, version 0 included.
+    """
+    def __init__(self, quadList):
+        quadList = list(quadList)
+        self.cfg = ControlFlowGraph(quadList)
+        self.domTree = DominatorTree(self.cfg)
+        blocks = self.cfg.blocks
+        self.phis = [[] for _ in blocks]
+        self.code = [[] for _ in blocks]
+        self.versions = {}
+        self._placePhis(quadList)
+        self._rename(quadList)
+
+    def _placePhis(self, quadList):
+        blocks = self.cfg.blocks
+        # blocks defining every name, and the names read before being defined
+        # in a block
+        defBlocks = {}
+        globalNames = set()
+        for ind in self.domTree.order:
+            block = blocks[ind]
+            defined = set()
+            for quad in quadList[block.start:block.end]:
+                for name in readNames(quad):
+                    if name not in defined:
+                        globalNames.add(name)
+                name = definedName(quad)
+                if name is not None:
+                    defined.add(name)
+                    inds = defBlocks.setdefault(name, [])
+                    if not inds or inds[-1] != ind:
+                        inds.append(ind)
+
+        frontiers = self.domTree.frontiers()
+        for name in sorted(globalNames):
+            hasPhi = set()
+            work = list(defBlocks.get(name, ()))
+            queued = set(work)
+            while work:
+                ind = work.pop()
+                for frontier in frontiers[ind]:
+                    if frontier in hasPhi:
+                        continue
+                    hasPhi.add(frontier)
+                    self.phis[frontier].append(Phi(name, None, [None] * len(blocks[frontier].preds)))
+                    if frontier not in queued:
+                        queued.add(frontier)
+                        work.append(frontier)
+
+    def _newVersion(self, name):
+        number = self.versions.get(name, 1)
+        self.versions[name] = number + 1
+        return version(name, number)
+
+    def _rename(self, quadList):
+        blocks = self.cfg.blocks
+        # name -> stack of its versions in the blocks dominating the current one
+        stacks = {}
+
+        def current(name):
+            stack = stacks.get(name, None)
+            if stack:
+                return stack[-1]
+            self.versions.setdefault(name, 1)
+            return version(name, 0)
+
+        # The dominator tree is walked in preorder, the versions defined in a
+        # block being popped once all the blocks it dominates are renamed.
+        work = [(0, False)]
+        while work:
+            ind, done = work.pop()
+            block = blocks[ind]
+            if done:
+                for phi in self.phis[ind]:
+                    stacks[phi.name].pop()
+                for quad in self.code[ind]:
+                    name = definedName(quad)
+                    if name is not None:
+                        stacks[baseName(name)].pop()
+                continue
+
+            for phi in self.phis[ind]:
+                phi.target = self._newVersion(phi.name)
+                stacks.setdefault(phi.name, []).append(phi.target)
+            code = self.code[ind]
+            for quad in quadList[block.start:block.end]:
+                name = definedName(quad)
+                target = None if name is None else self._newVersion(name)
+                code.append(_renamedQuad(quad, current, target))
+                if target is not None:
+                    stacks.setdefault(name, []).append(target)
+            for succ in block.succs:
+                predInd = blocks[succ].preds.index(ind)
+                for phi in self.phis[succ]:
+                    phi.args[predInd] = current(phi.name)
+
+            work.append((ind, True))
+            for child in reversed(self.domTree.children[ind]):
+                work.append((child, False))
+
+    def __str__(self):
+        lines = []
+        for ind in sorted(self.domTree.order):
+            block = self.cfg.blocks[ind]
+            lines.append("# block %d, preds %s" % (ind, block.preds))
+            lines.extend(str(phi) for phi in self.phis[ind])
+            lines.extend(str(quad) for quad in self.code[ind])
+        return "\n".join(lines)
+
+    def toQuads(self):
+        """ Quads of the reachable blocks in their original order, every
+            version renamed back to its variable or temp.
+        """
+        quadList = []
+        for ind in sorted(self.domTree.order):
+            for quad in self.code[ind]:
+                if quad.type != "EMPTY":
+                    name = definedName(quad)
+                    quadList.append(_renamedQuad(quad, baseName, None if name is None else baseName(name)))
+        return quadList
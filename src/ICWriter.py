@@ -0,0 +1,141 @@
+# Streaming output of quads.
+#
+# An ICWriter formats quads as they are given to it and writes them to a file
+# object in chunks of about bufferSize characters, so that the quads of a
+# generator (like IntCodeGen.generate) are never all held in memory, nor is
+# their text. The formats are:
+#     text:  a line per quad, as str(quad)
+#     jsonl: a JSON object per line, {"op": ..., "x": ..., "y": ..., "z": ...},
+#            operands being {"value": ..., "type": ..., "dataType": ...} and
+#            plain strings (labels, names and sizes) staying strings. Array
+#            elements also have "base", "index" (an operand or null) and
+#            "disp".
+# readJSONLines() reads jsonl back into quads.
+
+import json
+
+import IntCodeGen as icg
+
+formats = ("text", "jsonl")
+
+_encodeJSON = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+# JSON of the values found in quads, by type. Anything else (like floats,
+# which have special values) goes through the json module.
+_jsonValues = {
+    str:        json.encoder.encode_basestring,
+    int:        int.__repr__,
+    bool:       lambda value: "true" if value else "false",
+    type(None): lambda value: "null",
+}
+
+def _jsonValue(value):
+    encode = _jsonValues.get(type(value), None)
+    return _encodeJSON(value) if encode is None else encode(value)
+
+def _jsonOperand(operand):
+    if isinstance(operand, icg.Operand):
+        if operand.type == "AE":
+            return '{"value":%s,"type":"AE","dataType":%s,"base":%s,"index":%s,"disp":%d}' % (
+                _jsonValue(operand.value), _jsonValue(operand.dataType), _jsonValue(operand.base),
+                _jsonOperand(operand.index), operand.disp)
+        return '{"value":%s,"type":%s,"dataType":%s}' % (
+            _jsonValue(operand.value), _jsonValue(operand.type), _jsonValue(operand.dataType))
+    return _jsonValue(operand)
+
+def _formatText(quad, formatters = icg.quadFormatters):
+    formatter = formatters.get(quad.type, None)
+    return str(quad) if formatter is None else formatter(quad)
+
+def _formatJSON(quad):
+    return '{"op":%s,"x":%s,"y":%s,"z":%s}' % (
+        _jsonValue(quad.op), _jsonOperand(quad.x), _jsonOperand(quad.y), _jsonOperand(quad.z))
+
+_formatters = {"text": _formatText, "jsonl": _formatJSON}
+
+class ICWriter():
+    """ Writes quads to the file object out, in the given format.
+
+        bufferSize:
+            Number of characters gathered before they are written to out.
+
+        Nothing is written to out after close() (or the end of a with
+        statement), which flushes the writer but leaves out open.
+    """
+    def __init__(self, out, format = "text", bufferSize = 1 << 16):
+        if format not in _formatters:
+            raise ValueError("unknown IC format %r, expected one of %s" % (format, ", ".join(formats)))
+        self.out = out
+        self.format = format
+        self.bufferSize = bufferSize
+        self.count = 0
+        self._format = _formatters[format]
+        self._chunk = []
+        self._chunkSize = 0
+
+    def write(self, quad):
+        line = self._format(quad)
+        self._chunk.append(line)
+        self._chunkSize += len(line) + 1
+        self.count += 1
+        if self._chunkSize >= self.bufferSize:
+            self.flush()
+
+    def writeAll(self, quads):
+        """ Writes all the quads of an iterable, returns how many there were.
+        """
+        fmt = self._format
+        chunk = self._chunk
+        size = self._chunkSize
+        bufferSize = self.bufferSize
+        start = self.count
+        for quad in quads:
+            line = fmt(quad)
+            chunk.append(line)
+            size += len(line) + 1
+            self.count += 1
+            if size >= bufferSize:
+                self._chunkSize = size
+                self.flush()
+                size = 0
+        self._chunkSize = size
+        return self.count - start
+
+    def flush(self):
+        if self._chunk:
+            self._chunk.append("")
+            self.out.write("\n".join(self._chunk))
+            self._chunk.clear()
+        self._chunkSize = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Writes all the quads of an iterable to out, returns how many there were
+def dump(quads, out, format = "text", bufferSize = 1 << 16):
+    with ICWriter(out, format = format, bufferSize = bufferSize) as writer:
+        return writer.writeAll(quads)
+
+def _operandFromJSON(value):
+    if isinstance(value, dict):
+        if value["type"] == "AE":
+            return icg.arrayElement(value["base"], _operandFromJSON(value["index"]), value["disp"], value["dataType"])
+        return icg.Operand(value["value"], value["type"], value["dataType"])
+    return value
+
+# Yields the quads written in the jsonl format to the file object f
+def readJSONLines(f):
+    for line in f:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        yield icg.Quad(op = record["op"],
+                       x = _operandFromJSON(record["x"]),
+                       y = _operandFromJSON(record["y"]),
+                       z = _operandFromJSON(record["z"]))
@@ -2,9 +2,15 @@
 
 import RustAST
 
-# Holds the generated IC for a given node
+# Holds the generated IC for a given node. The code of a node is generated
+# once, as a generator consumed once: a node shared by several expressions
+# (see the hash_cons option of RustParser) is computed where it is first
+# used, the later uses only reading its temp.
 codeCache = {}
 
+# Data type of the byte offsets computed for array elements
+indexType = "i64"
+
 # Number of bytes occupied by each datatype
 bytesMap = {
     "i8"  : 1,
@@ -21,7 +27,24 @@ bytesMap = {
     "bool": 1
 }
 
+# Literal types left over from parsing that were never coerced
+typeAliases = {
+    "integer": "i32",
+    "float": "f64"
+}
+
+# Compare-and-branch quads: "IF" followed by a comparison, jumping to label x
+# if y compares to z
+branchCompares = {"IF" + op: op for op in ("<", ">", "<=", ">=", "==", "!=")}
+
+# Types of the quads jumping to label x: conditional branches, and all jumps
+branchTypes = {"IF", "IFCMP"}
+jumpTypes = {"IF", "IFCMP", "GOTO"}
+
 # Row in Quadruples data-structure
+# VAR and ARR quads allocate y bytes for x, z being the (element) data type.
+# FILL quads store y into z consecutive array elements, starting from x.
+# IFCMP quads have one of the ops of branchCompares.
 class Quad():
     def __init__(self, op=None, x=None, y=None, z=None):
         self.op = op
@@ -32,49 +55,113 @@ class Quad():
         self.type = None
         if op in {"+", "-", "*", "/", "%", ">", "<", ">=", "<=", "!=", "==", "!", "&&", "||"}:
             self.type = "BINOP" if z else "UNOP"
-        elif op in {"ASSIGN", "LABEL", "IF", "GOTO", "VAR", "ARR", "EMPTY"}:
+        elif op in {"ASSIGN", "FILL", "LABEL", "IF", "GOTO", "VAR", "ARR", "EMPTY"}:
             self.type = op
+        elif op in branchCompares:
+            self.type = "IFCMP"
 
     def __repr__(self):
         return "<Quad>: [op=%s, x=%s, y=%s, z=%s]" % (self.op, self.x, self.y, self.z)
 
     def __str__(self):
-        if self.type == "BINOP":
-            return "    %s = %s %s %s" % (self.x, self.y, self.op, self.z)
-        elif self.type == "UNOP":
-            return "    %s = %s %s" % (self.x, self.op, self.y)
-        elif self.type == "ASSIGN":
-            return "    %s = %s" % (self.x, self.y)
-        elif self.type == "LABEL":
-            return "%s:" % self.x
-        elif self.type in {"VAR", "ARR"}:
-            return "    %s %s = alloc %s" % (self.op.lower(), self.x, self.y)
-        elif self.type == "IF":
-            return "    if %s goto %s" % (self.y, self.x)
-        elif self.type == "GOTO":
-            return "    goto %s" % (self.x)
-        elif self.type == "EMPTY":
-            return ""
-
-        return "str: op=%s, x=%s, y=%s, z=%s" % (self.op, self.x, self.y, self.z)
+        formatter = quadFormatters.get(self.type, None)
+        if formatter is None:
+            return "str: op=%s, x=%s, y=%s, z=%s" % (self.op, self.x, self.y, self.z)
+        return formatter(self)
+
+# Text of every type of quad, for Quad.__str__ and ICWriter
+quadFormatters = {
+    "BINOP":  lambda q: "    %s = %s %s %s" % (q.x.value, q.y.value, q.op, q.z.value),
+    "UNOP":   lambda q: "    %s = %s %s" % (q.x.value, q.op, q.y.value),
+    "ASSIGN": lambda q: "    %s = %s" % (q.x.value, q.y.value),
+    "FILL":   lambda q: "    %s = fill %s, %s" % (q.x.value, q.y.value, q.z.value),
+    "LABEL":  lambda q: "%s:" % q.x,
+    "VAR":    lambda q: "    var %s = alloc %s" % (q.x, q.y),
+    "ARR":    lambda q: "    arr %s = alloc %s" % (q.x, q.y),
+    "IF":     lambda q: "    if %s goto %s" % (q.y.value, q.x),
+    "IFCMP":  lambda q: "    if %s %s %s goto %s" % (q.y.value, branchCompares[q.op], q.z.value, q.x),
+    "GOTO":   lambda q: "    goto %s" % q.x,
+    "EMPTY":  lambda q: "",
+}
 
 # post order traversal of the ast to generate code bottom up
 def _postOrderTraverse(node, offset=0):
     code = codeCache.get(node, None)
 
     if not code:
-        for child_name, child in node.children():
-            _postOrderTraverse(child)
-
-        # TODO: For declarations, put variable in the symbolTable.
+        if isinstance(node, RustAST.ArrayElement):
+            # Only the part of the index left after folding needs code
+            aeTable[node] = _linearIndex(node.index)
+            if aeTable[node][0] is not None:
+                _postOrderTraverse(aeTable[node][0])
+        elif _isLogical(node):
+            for child in node:
+                _condTraverse(child)
+        elif isinstance(node, (RustAST.If, RustAST.While)):
+            _condTraverse(node.cond)
+            for child in node:
+                if child is not node.cond:
+                    _postOrderTraverse(child)
+        else:
+            for child in node:
+                _postOrderTraverse(child)
 
         gen = codeGens.get(type(node), None)
 
         if gen:
             codeCache[node] = gen(node)
 
+# Traversal of a condition: its logical operators and comparisons have no
+# code of their own, they become the jumps of _condJump
+def _condTraverse(node):
+    if _isCondOp(node):
+        for child in node:
+            _condTraverse(child)
+    elif _isCompare(node):
+        for child in node:
+            _postOrderTraverse(child)
+    else:
+        _postOrderTraverse(node)
+
+# ID -> name of the binding it refers to in the IC. The first let of a name
+# keeps it, the later ones are "name#N" for the Nth let of the name, so that
+# a let in a block no longer hides the binding it shadows once the block ends.
+nameTable = {}
+# name -> number of lets of it
+bindCount = {}
+
+def _bind(idNode, scopes):
+    count = bindCount.get(idNode.name, 0) + 1
+    bindCount[idNode.name] = count
+    scopes[-1][idNode.name] = idNode.name if count == 1 else "%s#%d" % (idNode.name, count)
+    nameTable[idNode] = scopes[-1][idNode.name]
+
+# Walks the ast in program order, with a scope per compound statement, to
+# fill nameTable. The initializer of a let reads the bindings made before it.
+def _resolveNames(node, scopes):
+    if isinstance(node, RustAST.ID):
+        nameTable[node] = next(scope[node.name] for scope in reversed(scopes) if node.name in scope)
+    elif isinstance(node, RustAST.Compound):
+        scopes.append({})
+        for child in node:
+            _resolveNames(child, scopes)
+        scopes.pop()
+    elif isinstance(node, RustAST.Declaration):
+        _resolveNames(node.assn.rvalue, scopes)
+        _bind(node.assn.lvalue, scopes)
+    elif isinstance(node, RustAST.ArrayDecl):
+        for assn in node.assignments:
+            _resolveNames(assn.rvalue, scopes)
+        _bind(node.assignments[0].lvalue.arrId, scopes)
+        for assn in node.assignments:
+            _resolveNames(assn.lvalue, scopes)
+    else:
+        for child in node:
+            _resolveNames(child, scopes)
+
 # Count for temporary variables in the three address code
 tc = -1
+# node -> name of its temp, or its operand for array elements
 tTable = {}
 
 def _getT():
@@ -82,6 +169,9 @@ def _getT():
     tc += 1
     return "t" + str(tc)
 
+# ArrayElement -> (term, scale, disp) of its index, see _linearIndex
+aeTable = {}
+
 # Count for labels (for each compound block) in the three address code
 cc = -1
 cTable = {}
@@ -104,31 +194,100 @@ def _getBytes(typ):
     length = int(typ["type"].get("length", 1))
     return str(bytesMap[typ["type"]["dataType"]] * length)
 
+def _intConstant(node):
+    if isinstance(node, RustAST.Constant) and node.type not in {"bool", "char"} and not node.type.startswith("f"):
+        try:
+            return int(node.value)
+        except ValueError:
+            return None
+    return None
+
+# Splits an index expression into (term, scale, disp), the index being
+# term * scale + disp. term is None for constant indices.
+def _linearIndex(node):
+    value = _intConstant(node)
+    if value is not None:
+        return None, 0, value
+
+    if isinstance(node, RustAST.BinaryOp) and node.op in {"+", "-", "*"}:
+        left, right = _intConstant(node.left), _intConstant(node.right)
+        if node.op == "*" and (left is not None or right is not None):
+            term, scale, disp = _linearIndex(node.right if right is None else node.left)
+            factor = right if right is not None else left
+            return (term if scale * factor else None), scale * factor, disp * factor
+        if node.op in {"+", "-"} and right is not None:
+            term, scale, disp = _linearIndex(node.left)
+            return term, scale, disp + right if node.op == "+" else disp - right
+        if node.op == "+" and left is not None:
+            term, scale, disp = _linearIndex(node.right)
+            return term, scale, disp + left
+
+    return node, 1, 0
+
+# type is the kind of operand (CONSTANT, ID, TEMPVAR or AE), dataType the
+# Rust type of its value, when known, and size the number of bytes of that
+# type (None if unknown).
+# Array elements (see arrayElement) are at the byte offset index + disp of
+# the array base, index being an ID or TEMPVAR operand (a temp, or a
+# variable for arrays of bytes), or None for constant offsets. Their value is
+# their text, "base[index+disp]", "base[index]" or "base[disp]".
+# Operands are not changed once made, passes make new ones.
 class Operand():
-    def __init__(self, value = "", type = None):
+    __slots__ = ("value", "type", "dataType", "size", "base", "index", "disp")
+
+    def __init__(self, value = "", type = None, dataType = None):
         self.value = value
         self.type = type
+        self.dataType = dataType
+        self.size = bytesMap.get(typeAliases.get(dataType, dataType), None)
+        self.base = None
+        self.index = None
+        self.disp = 0
 
     def __repr__(self):
-        return "<Operand>: [%s, %s]" % (self.value, self.type)
+        if self.type == "AE":
+            return "<Operand>: [%s, AE, %s, base=%s, index=%r, disp=%d]" % (
+                self.value, self.dataType, self.base, self.index, self.disp)
+        return "<Operand>: [%s, %s, %s]" % (self.value, self.type, self.dataType)
 
     def __str__(self):
         return str(self.value)
 
+# Operand of the element of array base at byte offset index + disp
+def arrayElement(base, index, disp, dataType):
+    if index is None:
+        value = "%s[%d]" % (base, disp)
+    elif disp == 0:
+        value = "%s[%s]" % (base, index.value)
+    else:
+        value = "%s[%s%+d]" % (base, index.value, disp)
+    operand = Operand(value, "AE", dataType)
+    operand.base = base
+    operand.index = index
+    operand.disp = disp
+    return operand
+
+# Name of the variable or temp read by an operand, the index of an array
+# element (None for constant offsets)
+def operandName(operand):
+    if operand.type == "AE":
+        return None if operand.index is None else operand.index.value
+    return operand.value
+
 # Gets the operand representation of a node
 def _getOperand(node):
     opRepr = Operand()
 
     if isinstance(node, RustAST.BinaryOp):
-        opRepr = Operand(tTable[node], "TEMPVAR")
+        opRepr = Operand(tTable[node], "TEMPVAR", node.type)
     if isinstance(node, RustAST.UnaryOp):
-        opRepr = Operand(tTable[node], "TEMPVAR")
+        opRepr = Operand(tTable[node], "TEMPVAR", node.type)
     elif isinstance(node, RustAST.Constant):
-        opRepr = Operand(str(node.value), "CONSTANT")
+        opRepr = Operand(str(node.value), "CONSTANT", node.type)
     elif isinstance(node, RustAST.ID):
-        opRepr = Operand(node.name, "ID")
+        opRepr = Operand(nameTable[node], "ID", node.type)
     elif isinstance(node, RustAST.ArrayElement):
-        opRepr = Operand(node.arrId.name + "[%s]" % tTable[node.index], "AE")
+        opRepr = tTable[node]
 
     return opRepr
 
@@ -140,37 +299,133 @@ def _threeAddr_Constant(cNode):
     return []
 
 def _threeAddr_BinaryOp(binOpNode):
+    if _isLogical(binOpNode):
+        return _threeAddr_Logical(binOpNode)
+
     childCode = _joinCodes(codeCache[binOpNode.left], codeCache[binOpNode.right])
 
     if not tTable.get(binOpNode, None):
         tTable[binOpNode] = _getT()
 
     binaryOpQuad = Quad(op = binOpNode.op,
-                        x  = Operand(tTable[binOpNode], "TEMPVAR"),
+                        x  = Operand(tTable[binOpNode], "TEMPVAR", binOpNode.type),
                         y  = _getOperand(binOpNode.left),
                         z  = _getOperand(binOpNode.right))
     return _joinCodes(childCode, binaryOpQuad)
 
 def _threeAddr_UnaryOp(unOpNode):
+    if _isLogical(unOpNode):
+        return _threeAddr_Logical(unOpNode)
+
     childCode = _joinCodes(codeCache[unOpNode.expr])
 
     if not tTable.get(unOpNode, None):
         tTable[unOpNode] = _getT()
 
     unaryOpQuad = Quad(op = unOpNode.op,
-                       x  = Operand(tTable[unOpNode], "TEMPVAR"),
+                       x  = Operand(tTable[unOpNode], "TEMPVAR", unOpNode.type),
                        y  = _getOperand(unOpNode.expr))
     return _joinCodes(childCode, unaryOpQuad)
 
+# Logical operators are lowered to jump code: the right operand of && and ||
+# is only evaluated when the left one does not decide the value, and the
+# conditions of ifs and whiles jump straight to the code they select.
+def _isCondOp(node):
+    return (isinstance(node, RustAST.BinaryOp) and node.op in {"&&", "||"}) \
+        or (isinstance(node, RustAST.UnaryOp) and node.op == "!" and node.type == "bool")
+
+# Logical expressions whose value is computed by jumps (see _threeAddr_Logical)
+def _isLogical(node):
+    if isinstance(node, RustAST.UnaryOp) and node.op == "!":
+        return node.type == "bool" and _isLogical(node.expr)
+    return isinstance(node, RustAST.BinaryOp) and node.op in {"&&", "||"}
+
+# Comparisons giving the negation of each comparison. Ordered comparisons of
+# floats are left out, as NaN is unordered.
+invertedCompares = {"<": ">=", ">=": "<", ">": "<=", "<=": ">", "==": "!=", "!=": "=="}
+
+def _isCompare(node):
+    return isinstance(node, RustAST.BinaryOp) and node.op in invertedCompares
+
+def _invertible(node):
+    return node.op in {"==", "!="} or not node.left.type.startswith("f")
+
+# Code jumping to label if the value of the condition node is sense, falling
+# through otherwise. Comparisons become compare-and-branch quads, inverted
+# when jumping on false. The other values, and the float comparisons that
+# cannot be inverted, are tested against False.
+def _condJump(node, label, sense):
+    if isinstance(node, RustAST.UnaryOp) and _isCondOp(node):
+        return _condJump(node.expr, label, not sense)
+
+    if _isCondOp(node):
+        # a && b is true if both operands are, false if either is; a || b
+        # the other way around
+        if (node.op == "&&") == sense:
+            skipC = _getC()
+            return _joinCodes(_condJump(node.left, skipC, not sense),
+                              _condJump(node.right, label, sense),
+                              Quad(op = "LABEL", x = skipC))
+        return _joinCodes(_condJump(node.left, label, sense), _condJump(node.right, label, sense))
+
+    if _isCompare(node):
+        childCode = _joinCodes(codeCache[node.left], codeCache[node.right])
+        if sense or _invertible(node):
+            return _joinCodes(childCode,
+                              Quad(op = "IF" + (node.op if sense else invertedCompares[node.op]),
+                                   x  = label,
+                                   y  = _getOperand(node.left),
+                                   z  = _getOperand(node.right)))
+        condT = Operand(_getT(), "TEMPVAR", "bool")
+        condCode = _joinCodes(childCode,
+                              Quad(op = node.op, x = condT, y = _getOperand(node.left), z = _getOperand(node.right)))
+    else:
+        condT = _getOperand(node)
+        condCode = codeCache[node]
+
+    if sense:
+        return _joinCodes(condCode, Quad(op = "IF", x = label, y = condT))
+    return _joinCodes(condCode, Quad(op = "IF==", x = label, y = condT, z = Operand("False", "CONSTANT", "bool")))
+
+# The value of a logical expression, set on the two paths of its jumps
+def _threeAddr_Logical(node):
+    tTable[node] = _getT()
+    trueC = _getC()
+    afterC = _getC()
+    result = Operand(tTable[node], "TEMPVAR", "bool")
+
+    return _joinCodes(
+        _condJump(node, trueC, True),
+        Quad(op = "ASSIGN", x = result, y = Operand("False", "CONSTANT", "bool")),
+        Quad(op = "GOTO", x = afterC),
+        Quad(op = "LABEL", x = trueC),
+        Quad(op = "ASSIGN", x = result, y = Operand("True", "CONSTANT", "bool")),
+        Quad(op = "LABEL", x = afterC))
+
+# The constant part of the index is folded into the displacement of the
+# operand, so at most one multiply is left to compute the byte offset.
 def _threeAddr_ArrayElement(aeNode):
-    if not tTable.get(aeNode.index, None):
-        tTable[aeNode.index] = _getT()
+    term, scale, disp = aeTable[aeNode]
+    size = bytesMap[aeNode.arrId.type]
+
+    name = nameTable[aeNode.arrId]
+    if term is None:
+        tTable[aeNode] = arrayElement(name, None, disp * size, aeNode.type)
+        return []
+
+    termOperand = _getOperand(term)
+    if scale * size == 1 and termOperand.type in {"ID", "TEMPVAR"}:
+        tTable[aeNode] = arrayElement(name, termOperand, disp * size, aeNode.type)
+        return codeCache[term]
+
+    offsetOperand = Operand(_getT(), "TEMPVAR", indexType)
+    tTable[aeNode] = arrayElement(name, offsetOperand, disp * size, aeNode.type)
 
     aeQuad = Quad(op = "*",
-                  x  = Operand(tTable[aeNode.index], "TEMPVAR"),
-                  y  = _getOperand(aeNode.index),
-                  z  = Operand(str(bytesMap[aeNode.arrId.type]), "CONSTANT"))
-    return _joinCodes(codeCache[aeNode.index], aeQuad)
+                  x  = offsetOperand,
+                  y  = termOperand,
+                  z  = Operand(str(scale * size), "CONSTANT", indexType))
+    return _joinCodes(codeCache[term], aeQuad)
     
 def _threeAddr_Assignment(assnNode):
     childCode = _joinCodes(codeCache[assnNode.lvalue], codeCache[assnNode.rvalue])
@@ -180,6 +435,15 @@ def _threeAddr_Assignment(assnNode):
                     y  = _getOperand(assnNode.rvalue))
     return _joinCodes(childCode, assnQuad)
 
+def _threeAddr_ArrayFill(fillNode):
+    childCode = _joinCodes(codeCache[fillNode.lvalue], codeCache[fillNode.rvalue])
+
+    fillQuad = Quad(op = "FILL",
+                    x  = _getOperand(fillNode.lvalue),
+                    y  = _getOperand(fillNode.rvalue),
+                    z  = Operand(str(fillNode.count), "CONSTANT", indexType))
+    return _joinCodes(childCode, fillQuad)
+
 def _threeAddr_Compound(compNode):
     childCode = _joinCodes(*(codeCache[child] for child in compNode.block_items))
 
@@ -189,23 +453,30 @@ def _threeAddr_Compound(compNode):
     compQuad = Quad(op = "LABEL", x = cTable[compNode])
     return _joinCodes(compQuad, childCode)
 
+# The condition jumps to the else part (or past the if) when it is false, so
+# the then part is the one falling through
 def _threeAddr_If(ifNode):
     afterIfC = _getC()
-    elseCode = []
 
-    if ifNode.iffalse:
-        elseCode = codeCache[ifNode.iffalse]
+    if not ifNode.iffalse:
+        condCode = _condJump(ifNode.cond, afterIfC, False)
+        labelAfterIf = Quad(op = "LABEL", x = afterIfC)
+        return _joinCodes(condCode, codeCache[ifNode.iftrue], labelAfterIf)
 
-    ifQuad = Quad(op = "IF",
-                  x  = cTable[ifNode.iftrue],
-                  y  = _getOperand(ifNode.cond))
+    # else if parts have no label of their own
+    elseC = cTable.get(ifNode.iffalse, None) or _getC()
+    condCode = _condJump(ifNode.cond, elseC, False)
 
     gotoAfterIf = Quad(op = "GOTO", x = afterIfC)
+    elseCode = codeCache[ifNode.iffalse]
+    if not isinstance(ifNode.iffalse, RustAST.Compound):
+        elseCode = _joinCodes(Quad(op = "LABEL", x = elseC), elseCode)
 
     labelAfterIf = Quad(op = "LABEL", x = afterIfC)
-    # code = "\tif " + _getOperand(ifNode.cond) + " goto " + cTable[ifNode.iftrue] + elseCode + "\n\tgoto " + elseC
-    return _joinCodes(codeCache[ifNode.cond], ifQuad, elseCode, gotoAfterIf, codeCache[ifNode.iftrue], labelAfterIf)
+    return _joinCodes(condCode, codeCache[ifNode.iftrue], gotoAfterIf, elseCode, labelAfterIf)
 
+# The condition leaves the loop when it is false, so an iteration runs a
+# single jump back to the condition
 def _threeAddr_While(whileNode):
     condC = _getC()
     falseC = _getC()
@@ -213,33 +484,30 @@ def _threeAddr_While(whileNode):
     labelCond = Quad(op = "LABEL", x = condC)
     gotoCond = Quad(op = "GOTO", x = condC)
 
-    condQuad = Quad(op = "IF",
-                    x  = cTable[whileNode.stmt],
-                    y  = _getOperand(whileNode.cond))
+    condCode = _condJump(whileNode.cond, falseC, False)
 
-    gotoAfterWhile = Quad(op = "GOTO", x = falseC)
     labelAfterWhile = Quad(op = "LABEL", x = falseC)
 
     return _joinCodes(
         labelCond,
-        codeCache[whileNode.cond],
-        condQuad,
-        gotoAfterWhile,
+        condCode,
         codeCache[whileNode.stmt],
         gotoCond,
         labelAfterWhile)
 
 def _threeAddr_Declaration(declNode):
     declQuad = Quad(op = "VAR",
-                    x  = declNode.assn.lvalue.name,
-                    y  = _getBytes(declNode.type))
+                    x  = nameTable[declNode.assn.lvalue],
+                    y  = _getBytes(declNode.type),
+                    z  = declNode.type["type"]["dataType"])
     return _joinCodes(declQuad, codeCache[declNode.assn])
 
 def _threeAddr_ArrayDecl(arrDeclNode):
     childCode = _joinCodes(*(codeCache[assn] for assn in arrDeclNode.assignments))
     declQuad = Quad(op = "ARR",
-                    x  = arrDeclNode.assignments[0].lvalue.arrId.name,
-                    y  = _getBytes(arrDeclNode.type))
+                    x  = nameTable[arrDeclNode.assignments[0].lvalue.arrId],
+                    y  = _getBytes(arrDeclNode.type),
+                    z  = arrDeclNode.type["type"]["dataType"])
     return _joinCodes(declQuad, childCode)
 
 def _threeAddr_FileAST(fileASTNode):
@@ -257,20 +525,38 @@ codeGens = {
     RustAST.UnaryOp:      _threeAddr_UnaryOp,
     RustAST.ArrayElement: _threeAddr_ArrayElement,
     RustAST.Assignment:   _threeAddr_Assignment,
+    RustAST.ArrayFill:    _threeAddr_ArrayFill,
     RustAST.Compound:     _threeAddr_Compound,
     RustAST.If:           _threeAddr_If
 }
 
 # Reset all the global variables used
 def _resetGlobals():
+    global codeCache, nameTable, bindCount, tc, tTable, aeTable, cc, cTable
     codeCache = {}
+    nameTable = {}
+    bindCount = {}
     tc = -1
     tTable = {}
+    aeTable = {}
     cc = -1
     cTable = {}
 
 # Returns a list of quads for the Intermediate Code
-def generate(ast):
+# If a CompileStats object is given, the quads are generated eagerly and
+# counted along with the temporaries and labels.
+def generate(ast, stats=None):
     _resetGlobals()
-    _postOrderTraverse(ast)
-    return codeCache[ast]
+    if stats is None:
+        _resolveNames(ast, [{}])
+        _postOrderTraverse(ast)
+        return codeCache[ast]
+
+    with stats.phase("icgen"):
+        _resolveNames(ast, [{}])
+        _postOrderTraverse(ast)
+        quadList = list(codeCache[ast])
+    stats.count("quads", len(quadList))
+    stats.count("temps", tc + 1)
+    stats.count("labels", cc + 1)
+    return quadList
@@ -1,166 +1,1285 @@
-import re
+import bisect
+import time
+from collections import Counter
 
 import IntCodeGen as icg
+import ICAnalysis
+import ICInterp
+import ICSSA
 
-# for (!, != : Rust :: not, != : Python)
-# "!" if not followed by "="
-notRe = re.compile(r"!(?!=)")
+# Passes taking a third argument, the ICAnalysis.AnalysisCache of the quads,
+# from the PassManager
+def _usesAnalyses(pas):
+    pas.usesAnalyses = True
+    return pas
 
-def _getLoops(quadList = []):
-    labelInd = {}
-    loops = set()
+# (first, last) quads of the loops, for the loop passes: the natural loops
+# laid out like those of IntCodeGen, the label of the header first and the
+# goto back to it last (see ICAnalysis.Loop.span). The inner loops come first
+# if innerFirst, the outer ones otherwise.
+def _loopSpans(quadList, analyses = None, innerFirst = True):
+    analyses = ICAnalysis.AnalysisCache() if analyses is None else analyses
+    forest = analyses.loops(quadList)
+    spans = []
+    for loop in (forest.postorder() if innerFirst else forest.preorder()):
+        span = loop.span(forest.cfg)
+        if span is not None:
+            spans.append(span)
+    return spans
 
-    for ind, quad in enumerate(quadList):
-        if quad.type == "LABEL":
-            labelInd[quad.x] = ind
-        if quad.type == "GOTO":
-            if quad.x in labelInd:
-                loops.add((labelInd[quad.x], ind))
+# Constant operand holding the value the constant assigned by quad has once
+# stored, converted to the data type of its destination like ICInterp does
+def _constOf(quad):
+    return icg.Operand(ICInterp.wrap(ICInterp.constValue(quad.y), quad.x.dataType), "CONSTANT", quad.x.dataType)
+
+# Folds a unary/binary quad on constants with the semantics of ICInterp. A
+# division by zero is left alone, to fail when it is executed.
+def _fold(quad):
+    return _foldValues(quad, ICInterp.constValue(quad.y), None if quad.type == "UNOP" else ICInterp.constValue(quad.z))
+
+# Folds a unary/binary quad whose operands have the values a and b
+def _foldValues(quad, a, b):
+    try:
+        if quad.type == "UNOP":
+            return ICInterp.evalUnOp(quad.op, a, quad.x.dataType)
+        return ICInterp.evalBinOp(quad.op, a, b, quad.x.dataType)
+    except ICInterp.ICRuntimeError:
+        return None
+
+# Whether a compare-and-branch quad on operands with the values a and b
+# jumps, or None if they cannot be compared
+def _branchTaken(quad, a, b):
+    try:
+        return bool(ICInterp.binaryOps[icg.branchCompares[quad.op]](a, b))
+    except TypeError:
+        return None
 
-    return labelInd, loops
+def _foldBranch(quad):
+    return _branchTaken(quad, ICInterp.constValue(quad.y), ICInterp.constValue(quad.z))
+
+# Constant byte offset of an array element whose index is a known constant
+def _constantIndex(operand, quadList, vcd):
+    if operand.type != "AE" or operand.index is None or operand.index.value not in vcd:
+        return None
+    value = ICInterp.constValue(quadList[vcd[operand.index.value]].y)
+    if not isinstance(value, int) or isinstance(value, bool):
+        return None
+    return value + operand.disp
 
 # Constant Folding and Constant Propagation
-def constantFoldingAndPropagation(quadList = []):
-    newQuadList = [None for _ in quadList]
+# Constants are propagated along straight line code. The known constants are
+# forgotten at every label that is the target of a jump, as other paths meet
+# there.
+def constantFoldingAndPropagation(quadList = [], remarks = None):
+    remarks = Counter() if remarks is None else remarks
+    quadList = list(quadList)
+    # variable -> index of the quad assigning it a constant
     vcd = {}
-    labelInd, loops = _getLoops(quadList)
+    targets = {quad.x for quad in quadList if quad.type in icg.jumpTypes}
 
     ind, quad = 0, None
     while ind < len(quadList):
         quad = quadList[ind]
-        inLoop = False
-        for lb, ub in loops:
-            if lb <= ind <= ub:
-                inLoop = True
-                break
-        if inLoop:
-            ind += 1
-            continue
 
-        if quad.type == "ASSIGN" and quad.y.type == "CONSTANT":
+        if quad.type == "LABEL":
+            if quad.x in targets:
+                vcd = {}
+        elif quad.type == "VAR":
+            # The let runs again, in a loop: a new binding of the name
+            vcd.pop(quad.x, None)
+        elif any(_constantIndex(operand, quadList, vcd) is not None for operand in _readOperands(quad)):
+            # Constant Propagation into the index of array elements
+            for attr in ("x", "y", "z"):
+                operand = getattr(quad, attr)
+                disp = _constantIndex(operand, quadList, vcd) if isinstance(operand, icg.Operand) else None
+                if disp is not None:
+                    setattr(quad, attr, icg.arrayElement(operand.base, None, disp, operand.dataType))
+                    remarks["propagated"] += 1
+            continue
+        elif quad.type == "ASSIGN" and quad.y.type == "CONSTANT":
             vcd[quad.x.value] = ind
-        elif quad.type == "ASSIGN" and quad.y.type in {"ID", "TEMPVAR"}:
+        elif quad.type in {"ASSIGN", "FILL"} and quad.y.type in {"ID", "TEMPVAR"} and quad.y.value in vcd:
             # Constant Propagation
-            if quad.y.value in vcd:
-                quadList[ind].y = icg.Operand(quadList[vcd[quad.y.value]].y.value, "CONSTANT")
-                continue
+            quadList[ind].y = _constOf(quadList[vcd[quad.y.value]])
+            remarks["propagated"] += 1
+            continue
         elif quad.type == "UNOP":
             # Constant Propagation
-            if quad.y.type in {"ID", "TEMPVAR"}:
-                if quad.y.value in vcd:
-                    quadList[ind].y = icg.Operand(quadList[vcd[quad.y.value]].y.value, "CONSTANT")
-                    continue
+            if quad.y.type in {"ID", "TEMPVAR"} and quad.y.value in vcd:
+                quadList[ind].y = _constOf(quadList[vcd[quad.y.value]])
+                remarks["propagated"] += 1
+                continue
             # Constant Folding
             if quad.y.type == "CONSTANT":
-                expr = "%s %s" % (quad.op, str(quad.y.value))
-                expr = notRe.sub("not", expr.replace("&&", "and").replace("||", "or"))
-                expr = eval(expr)
-                quadList[ind] = icg.Quad(op = "ASSIGN", x = quad.x, y = icg.Operand(expr, "CONSTANT"))
-                continue
+                expr = _fold(quad)
+                if expr is not None:
+                    quadList[ind] = icg.Quad(op = "ASSIGN", x = quad.x, y = icg.Operand(expr, "CONSTANT", quad.x.dataType))
+                    remarks["folded"] += 1
+                    continue
         elif quad.type == "BINOP":
             # Constant Propagation
-            if quad.y.type in {"ID", "TEMPVAR"}:
-                if quad.y.value in vcd:
-                    quadList[ind].y = icg.Operand(quadList[vcd[quad.y.value]].y.value, "CONSTANT")
-                    continue
+            if quad.y.type in {"ID", "TEMPVAR"} and quad.y.value in vcd:
+                quadList[ind].y = _constOf(quadList[vcd[quad.y.value]])
+                remarks["propagated"] += 1
+                continue
             # Constant Propagation
-            if quad.z.type in {"ID", "TEMPVAR"}:
-                if quad.z.value in vcd:
-                    quadList[ind].z = icg.Operand(quadList[vcd[quad.z.value]].y.value, "CONSTANT")
-                    continue
+            if quad.z.type in {"ID", "TEMPVAR"} and quad.z.value in vcd:
+                quadList[ind].z = _constOf(quadList[vcd[quad.z.value]])
+                remarks["propagated"] += 1
+                continue
             # Constant Folding
             if quad.y.type == "CONSTANT" and quad.z.type == "CONSTANT":
-                expr = "%s %s %s" % (str(quad.y.value), quad.op, str(quad.z.value))
-                expr = notRe.sub("not", expr.replace("&&", "and").replace("||", "or"))
-                expr = eval(expr)
-                quadList[ind] = icg.Quad(op = "ASSIGN", x = quad.x, y = icg.Operand(expr, "CONSTANT"))
-                continue
+                expr = _fold(quad)
+                if expr is not None:
+                    quadList[ind] = icg.Quad(op = "ASSIGN", x = quad.x, y = icg.Operand(expr, "CONSTANT", quad.x.dataType))
+                    remarks["folded"] += 1
+                    continue
         elif quad.type == "IF":
             # Constant Propagation
-            if quad.y.value in vcd:
-                boolQuad = quadList[vcd[quad.y.value]]
-                expr = eval(str(boolQuad.y.value))
-                if expr:
-                    quadList[ind] = icg.Quad(op = "GOTO", x = quad.x)
-                    continue
-                else:
-                    quadList[ind] = icg.Quad(op = "EMPTY")
+            if quad.y.type in {"ID", "TEMPVAR"} and quad.y.value in vcd:
+                quadList[ind] = icg.Quad(op = "IF", x = quad.x, y = _constOf(quadList[vcd[quad.y.value]]))
+                remarks["propagated"] += 1
+                continue
             # Constant Folding
-            elif quad.y.type == "CONSTANT":
-                if quad.y.value:
+            if quad.y.type == "CONSTANT":
+                if ICInterp.constValue(quad.y):
                     quadList[ind] = icg.Quad(op = "GOTO", x = quad.x)
-                    continue
+                    remarks["folded"] += 1
                 else:
                     quadList[ind] = icg.Quad(op = "EMPTY")
+                    remarks["removed"] += 1
+        elif quad.type == "IFCMP":
+            # Constant Propagation
+            for attr in ("y", "z"):
+                operand = getattr(quad, attr)
+                if operand.type in {"ID", "TEMPVAR"} and operand.value in vcd:
+                    setattr(quad, attr, _constOf(quadList[vcd[operand.value]]))
+                    remarks["propagated"] += 1
+            # Constant Folding
+            taken = _foldBranch(quad) if quad.y.type == "CONSTANT" and quad.z.type == "CONSTANT" else None
+            if taken is not None:
+                quadList[ind] = icg.Quad(op = "GOTO", x = quad.x) if taken else icg.Quad(op = "EMPTY")
+                remarks["folded" if taken else "removed"] += 1
+
+        # Anything else assigned to is no longer a known constant
+        if quad.type in {"ASSIGN", "BINOP", "UNOP"} and vcd.get(quad.x.value, ind) != ind:
+            del vcd[quad.x.value]
+        ind += 1
+    return quadList
+
+# Lattice of sparseConditionalConstantPropagation: names not known yet are
+# _unknown (top), names that are not constants are _overdefined (bottom) and
+# the others have their constant value.
+_unknown = object()
+_overdefined = object()
+
+def _sameConstant(a, b):
+    return type(a) is type(b) and repr(a) == repr(b)
+
+def _meet(a, b):
+    if a is _unknown:
+        return b
+    if b is _unknown or a is _overdefined:
+        return a
+    if b is _overdefined or not _sameConstant(a, b):
+        return _overdefined
+    return a
+
+# Solver of Wegman and Zadeck's sparse conditional constant propagation over
+# an ICSSA.SSAForm. The values flow along the uses of the SSA names, and the
+# blocks are only evaluated once an edge reaching them is found executable.
+class _SCCP():
+    def __init__(self, ssa):
+        self.ssa = ssa
+        self.blocks = ssa.cfg.blocks
+        self.values = {}
+        # executable edges (pred, block) and the blocks reached by them
+        self.executable = set()
+        self.visited = set()
+        self.flowWork = [(None, 0)]
+        self.ssaWork = []
+        # names defined in the reachable blocks, and the blocks and quads or
+        # phis using them
+        self.defined = set()
+        self.uses = {}
+        for ind in ssa.domTree.order:
+            for phi in ssa.phis[ind]:
+                self.defined.add(phi.target)
+                for arg in set(phi.args) - {None}:
+                    self.uses.setdefault(arg, []).append((ind, phi))
+            for quad in ssa.code[ind]:
+                name = ICSSA.definedName(quad)
+                if name is not None:
+                    self.defined.add(name)
+                for name in set(ICSSA.readNames(quad)):
+                    self.uses.setdefault(name, []).append((ind, quad))
+
+    def value(self, name):
+        if name not in self.defined:
+            return _overdefined
+        return self.values.get(name, _unknown)
+
+    def operandValue(self, operand):
+        if operand.type == "CONSTANT":
+            try:
+                return ICInterp.constValue(operand)
+            except ValueError:
+                return _overdefined
+        if operand.type in {"ID", "TEMPVAR"}:
+            return self.value(operand.value)
+        return _overdefined
+
+    def setValue(self, name, value):
+        old = self.values.get(name, _unknown)
+        if value is _unknown or old is _overdefined:
+            return
+        if old is not _unknown:
+            if value is not _overdefined and _sameConstant(old, value):
+                return
+            value = _overdefined
+        self.values[name] = value
+        self.ssaWork.append(name)
+
+    def addEdge(self, pred, ind):
+        if ind is not None and (pred, ind) not in self.executable:
+            self.flowWork.append((pred, ind))
+
+    def visitPhi(self, ind, phi):
+        value = _unknown
+        for pred, arg in zip(self.blocks[ind].preds, phi.args):
+            if (pred, ind) in self.executable:
+                value = _meet(value, self.value(arg))
+        self.setValue(phi.target, value)
+
+    def evaluate(self, quad):
+        if quad.type == "ASSIGN":
+            value = self.operandValue(quad.y)
+            if value is _unknown or value is _overdefined:
+                return value
+            try:
+                return ICInterp.wrap(value, quad.x.dataType)
+            except (ArithmeticError, ValueError):
+                return _overdefined
+        a = self.operandValue(quad.y)
+        b = None if quad.type == "UNOP" else self.operandValue(quad.z)
+        if a is _overdefined or b is _overdefined:
+            return _overdefined
+        if a is _unknown or b is _unknown:
+            return _unknown
+        try:
+            value = _foldValues(quad, a, b)
+        except (ArithmeticError, TypeError, ValueError):
+            return _overdefined
+        return _overdefined if value is None else value
+
+    def visitQuad(self, ind, quad):
+        block = self.blocks[ind]
+        if quad.type in {"ASSIGN", "BINOP", "UNOP"} and quad.x.type in {"ID", "TEMPVAR"}:
+            self.setValue(quad.x.value, self.evaluate(quad))
+        elif quad.type == "VAR":
+            self.setValue(quad.x, _overdefined)
+        elif quad.type == "IF":
+            cond = self.operandValue(quad.y)
+            if cond is _unknown:
+                return
+            if cond is _overdefined or cond:
+                self.addEdge(ind, block.jump)
+            if cond is _overdefined or not cond:
+                self.addEdge(ind, block.fallthrough)
+        elif quad.type == "IFCMP":
+            a, b = self.operandValue(quad.y), self.operandValue(quad.z)
+            if a is _unknown or b is _unknown:
+                return
+            taken = None if a is _overdefined or b is _overdefined else _branchTaken(quad, a, b)
+            if taken is None or taken:
+                self.addEdge(ind, block.jump)
+            if taken is None or not taken:
+                self.addEdge(ind, block.fallthrough)
         elif quad.type == "GOTO":
-            # Skip loops
-            if labelInd[quad.x] > ind:
-                ind = labelInd[quad.x]
+            self.addEdge(ind, block.jump)
+
+    def run(self):
+        phis, code = self.ssa.phis, self.ssa.code
+        while self.flowWork or self.ssaWork:
+            while self.flowWork:
+                edge = self.flowWork.pop()
+                if edge in self.executable:
+                    continue
+                self.executable.add(edge)
+                ind = edge[1]
+                for phi in phis[ind]:
+                    self.visitPhi(ind, phi)
+                if ind in self.visited:
+                    continue
+                self.visited.add(ind)
+                for quad in code[ind]:
+                    self.visitQuad(ind, quad)
+                if not code[ind] or code[ind][-1].type not in icg.jumpTypes:
+                    self.addEdge(ind, self.blocks[ind].fallthrough)
+            while self.ssaWork and not self.flowWork:
+                name = self.ssaWork.pop()
+                for ind, use in self.uses.get(name, ()):
+                    if ind in self.visited:
+                        if isinstance(use, ICSSA.Phi):
+                            self.visitPhi(ind, use)
+                        else:
+                            self.visitQuad(ind, use)
+
+# Sparse Conditional Constant Propagation
+# On the SSA form of the IC (see ICSSA), constants are propagated from the
+# definitions of the variables and temps to their uses, through the phis
+# where control flow meets, and branches on constants only make their taken
+# side executable. Unlike constantFoldingAndPropagation, this finds the
+# constants that reach a loop or a merge point along every executable path,
+# and the branches that can never be taken. Then:
+#  - the uses of constants are replaced by them (array element indices too),
+#  - the unary/binary quads computing a constant become assignments of it,
+#  - ifs on constants become gotos or are removed,
+#  - the blocks found not executable are removed,
+#  - the temps assigned a constant that are no longer used are removed.
+def sparseConditionalConstantPropagation(quadList = [], remarks = None):
+    remarks = Counter() if remarks is None else remarks
+    quadList = list(quadList)
+    ssa = ICSSA.SSAForm(quadList)
+    solver = _SCCP(ssa)
+    solver.run()
+
+    counts = Counter()
+    constants = {name: value for name, value in solver.values.items() if value is not _overdefined}
+
+    def propagate(operand):
+        if not isinstance(operand, icg.Operand):
+            return operand
+        if operand.type in {"ID", "TEMPVAR"} and operand.value in constants:
+            counts["propagated"] += 1
+            return icg.Operand(constants[operand.value], "CONSTANT", operand.dataType)
+        if operand.type == "AE" and operand.index is not None:
+            value = constants.get(operand.index.value, None)
+            if isinstance(value, int) and not isinstance(value, bool):
+                counts["propagated"] += 1
+                return icg.arrayElement(operand.base, None, value + operand.disp, operand.dataType)
+        return operand
+
+    for ind, block in enumerate(ssa.cfg.blocks):
+        if ind not in solver.visited:
+            counts["unreachable"] += sum(quad.type != "EMPTY" for quad in ssa.cfg.quads(block))
+            ssa.code[ind] = []
+            ssa.phis[ind] = []
+            continue
+        code = ssa.code[ind]
+        for at, quad in enumerate(code):
+            if quad.type not in {"BINOP", "UNOP", "ASSIGN", "FILL", "IF", "IFCMP"}:
                 continue
-        ind += 1
-    for ind, quad in enumerate(newQuadList):
-        if not quad:
-            newQuadList[ind] = quadList[ind]
-    # print(vcd)
-    return newQuadList
+            # A branch on a value still unknown would leave its targets out
+            # of the executable blocks: this cannot happen in reachable code,
+            # where every name gets a value.
+            if quad.type in icg.branchTypes and any(
+                operand.type in {"ID", "TEMPVAR"} and solver.value(operand.value) is _unknown
+                for operand in (quad.y, quad.z) if operand is not None
+            ):
+                return quadList
+            quad.y = propagate(quad.y)
+            quad.z = propagate(quad.z)
+            if quad.x.__class__ is icg.Operand and quad.x.type == "AE":
+                quad.x = propagate(quad.x)
+            if quad.type in {"BINOP", "UNOP"} and ICSSA.definedName(quad) in constants:
+                code[at] = icg.Quad(op = "ASSIGN", x = quad.x, y = icg.Operand(constants[quad.x.value], "CONSTANT", quad.x.dataType))
+                counts["folded"] += 1
+            elif quad.type == "IF" and quad.y.type == "CONSTANT":
+                if ICInterp.constValue(quad.y):
+                    code[at] = icg.Quad(op = "GOTO", x = quad.x)
+                    counts["folded"] += 1
+                else:
+                    code[at] = icg.Quad(op = "EMPTY")
+                    counts["removed"] += 1
+            elif quad.type == "IFCMP" and quad.y.type == "CONSTANT" and quad.z.type == "CONSTANT":
+                taken = _foldBranch(quad)
+                if taken is not None:
+                    code[at] = icg.Quad(op = "GOTO", x = quad.x) if taken else icg.Quad(op = "EMPTY")
+                    counts["folded" if taken else "removed"] += 1
+
+    # The versions still read, and those the phis defining them merge
+    live = set()
+    for ind in solver.visited:
+        for quad in ssa.code[ind]:
+            live.update(ICSSA.readNames(quad))
+    phiOf = {phi.target: phi for ind in solver.visited for phi in ssa.phis[ind]}
+    work = [name for name in live if name in phiOf]
+    while work:
+        for arg in phiOf[work.pop()].args:
+            if arg is not None and arg not in live:
+                live.add(arg)
+                if arg in phiOf:
+                    work.append(arg)
+
+    for ind in solver.visited:
+        code = ssa.code[ind]
+        for at, quad in enumerate(code):
+            if quad.type == "ASSIGN" and quad.x.type == "TEMPVAR" and quad.x.value in constants \
+                    and quad.x.value not in live:
+                code[at] = icg.Quad(op = "EMPTY")
+                counts["removed"] += 1
+
+    if not counts:
+        return quadList
+    remarks.update(counts)
+    return ssa.toQuads()
+
+# An operand is loop invariant if nothing assigns to it in the loop. Array
+# elements also need no stores to the array in the loop, and a constant
+# offset in the bounds of the array (of arrayBytes bytes): reading out of
+# bounds traps, which must not happen when the loop body never runs.
+def _isInvariant(operand, loopDefs, storedArrays, arrayBytes):
+    # For unop's z operand
+    if operand == None:
+        return True
+    # Can definitely move if operand is constant
+    if operand.type == "CONSTANT":
+        return True
+    if operand.type == "AE":
+        return operand.base not in storedArrays and operand.index is None \
+            and 0 <= operand.disp <= arrayBytes.get(operand.base, 0) - operand.size
+    # Can't move if operand is being assigned something in loop
+    return operand.value not in loopDefs
 
 # Loop Invariant Code Motion
-def loopInvariantCodeMotion(quadList = []):
-    labelInd, loops = _getLoops(quadList)
+# Only computations of temporaries are hoisted: assignments to variables and
+# array elements must not happen when the loop body never runs, and neither
+# must a division or an array element read that can trap.
+@_usesAnalyses
+def loopInvariantCodeMotion(quadList = [], remarks = None, analyses = None):
+    remarks = Counter() if remarks is None else remarks
+    loops = _loopSpans(quadList, analyses)
 
     # variables in LHS
     vil = {loop:{} for loop in loops}
-    
+    # arrays stored to
+    sil = {loop:set() for loop in loops}
+    # array -> number of bytes
+    arrayBytes = {quad.x: int(quad.y) for quad in quadList if quad.type == "ARR"}
+
     for loop in loops:
         for ind in range(loop[0], loop[1]+1):
             quad = quadList[ind]
             if quad.type in {"ASSIGN", "BINOP", "UNOP"}:
                 vil[loop][quad.x.value] = vil[loop].get(quad.x.value, 0) + 1
+                if quad.x.type == "AE":
+                    sil[loop].add(quad.x.base)
+            elif quad.type == "FILL":
+                sil[loop].add(quad.x.base)
+    # The hoisted quads are moved before the header of the loop, the loop
+    # being rebuilt once so that hoisting is linear in its size. Inner loops
+    # go first: rebuilding an outer loop would move the quads of the loops
+    # it holds away from their indices.
     for loop in loops:
-        loopStartIndex = loop[0]
+        hoisted, kept = [], []
         for ind in range(loop[0], loop[1]+1):
             quad = quadList[ind]
-            operands = [quad.y, quad.z]
-            if quad.type in {"UNOP", "ASSIGN", "BINOP"}:
-                if quad.x.type =="AE":
-                    operands.append(quad.x)
-            # if binop, unop or assign and can be moved out
+            # if binop, unop or assign to a temporary and can be moved out
             if \
             (
                 quad.type in {"UNOP", "ASSIGN", "BINOP"}
-                and
-                all( map
-                (
-                    lambda operand: 
-                        # For unop's z operand
-                        True if operand == None
-                        # Can definitrly move if operand is constant
-                        else True if operand.type == "CONSTANT"
-                        # Can't move if operand is being assigned something in loop
-                        else False if \
-                        (
-                            operand.value if operand.type != "AE"
-                            # Index value of the Array Element
-                            else quad.x.value[quad.x.value.find("[")+1:-1]
-                        ) in vil[loop]
-                        # Operand is not on LHS in the loop
-                        else True,
-                    operands
-                ))
+                and quad.x.type == "TEMPVAR"
+                and vil[loop].get(quad.x.value, 0) == 1
+                and not (quad.op in {"/", "%"} and not (quad.z.type == "CONSTANT" and str(quad.z.value) not in {"0", "0.0"}))
+                and _isInvariant(quad.y, vil[loop], sil[loop], arrayBytes)
+                and _isInvariant(quad.z, vil[loop], sil[loop], arrayBytes)
             ):
-                vil[loop][quad.x.value] -= 1
-                if vil[loop][quad.x.value] <= 0:
-                    del vil[loop][quad.x.value]
-                quadList.insert(loopStartIndex, quadList.pop(ind))
-                loopStartIndex += 1
+                del vil[loop][quad.x.value]
+                hoisted.append(quad)
+                remarks["hoisted"] += 1
+            else:
+                kept.append(quad)
+        if hoisted:
+            quadList[loop[0]:loop[1]+1] = hoisted + kept
     return quadList
 
-def optimize(quadList = [], passes = [], verbose = 0):
-    for pas in passes:
-        if verbose > 0:
+# Operands read by a quad. The array element x of a store reads its index.
+def _readOperands(quad):
+    if quad.type in {"BINOP", "UNOP", "ASSIGN", "FILL", "IF", "IFCMP"}:
+        for operand in (quad.y, quad.z):
+            if isinstance(operand, icg.Operand):
+                yield operand
+        if isinstance(quad.x, icg.Operand) and quad.x.type == "AE":
+            yield quad.x
+
+# Whether operand reads the variable or temp name
+def _reads(operand, name):
+    if operand.type == "AE":
+        return operand.index is not None and operand.index.value == name
+    return operand.type in {"ID", "TEMPVAR"} and operand.value == name
+
+# operand with the variable or temp name replaced by the temp newName
+def _renamed(operand, name, newName):
+    if operand.type == "AE":
+        if operand.index is not None and operand.index.value == name:
+            return icg.arrayElement(operand.base, icg.Operand(newName, "TEMPVAR", operand.index.dataType),
+                                    operand.disp, operand.dataType)
+    elif operand.type in {"ID", "TEMPVAR"} and operand.value == name:
+        return icg.Operand(newName, "TEMPVAR", operand.dataType)
+    return operand
+
+def _rename(quad, name, newName):
+    quad.y = _renamed(quad.y, name, newName) if isinstance(quad.y, icg.Operand) else quad.y
+    quad.z = _renamed(quad.z, name, newName) if isinstance(quad.z, icg.Operand) else quad.z
+    if isinstance(quad.x, icg.Operand) and quad.x.type == "AE":
+        quad.x = _renamed(quad.x, name, newName)
+
+# Names of new temps, following the ones used in quadList
+def _newTemps(quadList):
+    last = -1
+    for quad in quadList:
+        for operand in (quad.x, quad.y, quad.z):
+            if not isinstance(operand, icg.Operand):
+                continue
+            name = icg.operandName(operand)
+            if isinstance(name, str) and name[:1] == "t" and name[1:].isdigit():
+                last = max(last, int(name[1:]))
+    while True:
+        last += 1
+        yield "t" + str(last)
+
+def _intConst(operand):
+    if isinstance(operand, icg.Operand) and operand.type == "CONSTANT":
+        try:
+            value = ICInterp.constValue(operand)
+        except ValueError:
+            return None
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+# Indices of the quads of a loop defining and reading every variable and temp
+def _loopDefsUses(quadList, loop):
+    start, end = loop
+    defs = {}
+    uses = {}
+    for ind in range(start, end+1):
+        quad = quadList[ind]
+        if quad.type in {"ASSIGN", "BINOP", "UNOP"} and quad.x.type in {"ID", "TEMPVAR"}:
+            defs.setdefault(quad.x.value, []).append(ind)
+        for operand in _readOperands(quad):
+            name = icg.operandName(operand)
+            if operand.type in {"ID", "TEMPVAR", "AE"} and name is not None:
+                uses.setdefault(name, []).append(ind)
+    return defs, uses
+
+# Positions of the jumps to every label and of the quads reading, defining and
+# mentioning every variable and temp, so that questions about a loop can be
+# answered without scanning the whole IC. Built once per sweep of a pass over
+# the loops: the quads are changed in place during the sweep and the new code
+# is inserted at the end of it, so the positions stay valid. Quads left EMPTY
+# are still counted, which can only make the answers more conservative.
+class _QuadIndex():
+    def __init__(self, quadList):
+        self.jumps = {}
+        self.reads = {}
+        self.defs = {}
+        self.mentions = {}
+        labels = []
+        for ind, quad in enumerate(quadList):
+            if quad.type in icg.jumpTypes:
+                self.jumps.setdefault(quad.x, []).append(ind)
+            elif quad.type == "LABEL":
+                labels.append(ind)
+            elif quad.type in {"ASSIGN", "BINOP", "UNOP"} and quad.x.type in {"ID", "TEMPVAR"}:
+                self.defs.setdefault(quad.x.value, []).append(ind)
+            for operand in _readOperands(quad):
+                name = icg.operandName(operand)
+                if operand.type in {"ID", "TEMPVAR", "AE"} and name is not None:
+                    inds = self.reads.setdefault(name, [])
+                    if not inds or inds[-1] != ind:
+                        inds.append(ind)
+            for operand in (quad.x, quad.y, quad.z):
+                if isinstance(operand, icg.Operand):
+                    inds = self.mentions.setdefault(icg.operandName(operand), [])
+                    if not inds or inds[-1] != ind:
+                        inds.append(ind)
+        self.jumpTargets = set(self.jumps)
+        # jumps and the labels they go to, where straight line code ends
+        self.barriers = sorted([ind for inds in self.jumps.values() for ind in inds]
+                               + [ind for ind in labels if quadList[ind].x in self.jumpTargets])
+
+    # Whether some quad in table[name] is out of start..end
+    def outside(self, table, name, start, end):
+        inds = table.get(name, ())
+        return len(inds) > 0 and (inds[0] < start or inds[-1] > end)
+
+    # Index of the last definition of name before ind in the same straight
+    # line code, or None
+    def lastDefBefore(self, name, ind):
+        inds = self.defs.get(name, ())
+        at = bisect.bisect_left(inds, ind) - 1
+        if at < 0:
+            return None
+        if bisect.bisect_right(self.barriers, inds[at]) != bisect.bisect_left(self.barriers, ind):
+            return None
+        return inds[at]
+
+# Runs transform(quadList, loop, index) over the loops, inner loops first if
+# innerFirst, until none of them changes. The loops of the first sweep are
+# those of analyses (the AnalysisCache of the given quads), if given; later
+# sweeps find the loops of the changed IC again. Only the list is copied:
+# transform changes the Quad objects of the loop in place, so the caller's
+# quads change too. It returns None if it did nothing, or else (first, last,
+# code, inserts): the quads first..last (both included) are replaced by code
+# if it is not None, and the lists of quads in the inserts dict are inserted
+# before the quads at their keys. A sweep skips the loops overlapping the
+# ones already changed in it, so every sweep is linear in the size of the IC
+# and the nested loops.
+def _sweepLoops(quadList, transform, innerFirst, analyses = None):
+    loops = _loopSpans(quadList, analyses, innerFirst)
+    quadList = list(quadList)
+    changed = True
+    while changed:
+        changed = False
+        index = _QuadIndex(quadList)
+        spans = []
+        replaced = {}
+        inserts = {}
+        for loop in loops:
+            start, end = loop
+            if any(start <= last and first <= end + 2 for first, last in spans):
+                continue
+            result = transform(quadList, loop, index)
+            if result is None:
+                continue
+            first, last, code, loopInserts = result
+            if code is not None:
+                replaced[first] = (last, code)
+            for ind, quads in loopInserts.items():
+                inserts.setdefault(ind, []).extend(quads)
+            spans.append((start, end + 2))
+            changed = True
+
+        if changed:
+            newList = []
+            ind = 0
+            while ind < len(quadList):
+                newList.extend(inserts.get(ind, ()))
+                if ind in replaced:
+                    last, code = replaced[ind]
+                    newList.extend(code)
+                    ind = last + 1
+                else:
+                    newList.append(quadList[ind])
+                    ind += 1
+            newList.extend(inserts.get(len(quadList), ()))
+            quadList = newList
+            loops = _loopSpans(quadList, innerFirst = innerFirst)
+    return quadList
+
+# Basic induction variables of a loop: variables (or temps, if kinds allows
+# them) whose only definition in the loop adds a constant to them on every
+# iteration, either as v = v + c or as t = v + c; v = t.
+# Returns name -> (indices of the update quads, step).
+def _basicInductionVariables(quadList, loop, defs, uses, jumpTargets, kinds = ("ID", )):
+    start, end = loop
+    basics = {}
+    for name, inds in defs.items():
+        if len(inds) != 1 or quadList[inds[0]].x.type not in kinds:
+            continue
+        dataType = ICInterp.typeAliases.get(quadList[inds[0]].x.dataType, quadList[inds[0]].x.dataType)
+        if dataType is None or dataType[0] not in {"i", "u"}:
+            continue
+        ind = inds[0]
+        quad = quadList[ind]
+        updates = (ind, )
+        if quad.type == "ASSIGN" and quad.y.type == "TEMPVAR" and len(defs.get(quad.y.value, ())) == 1 \
+                and len(uses.get(quad.y.value, ())) == 1:
+            updates = (defs[quad.y.value][0], ind)
+            quad = quadList[updates[0]]
+        if quad.type != "BINOP" or quad.op not in {"+", "-"}:
+            continue
+        if _reads(quad.y, name) and quad.y.type in kinds and _intConst(quad.z) is not None:
+            step = _intConst(quad.z) if quad.op == "+" else -_intConst(quad.z)
+        elif quad.op == "+" and _reads(quad.z, name) and quad.z.type in kinds and _intConst(quad.y) is not None:
+            step = _intConst(quad.y)
+        else:
+            continue
+        # The update has to run on every iteration: nothing may jump past it
+        # to the back edge.
+        if any(
+            (q.type == "LABEL" and q.x in jumpTargets) or q.type in icg.jumpTypes
+            for q in quadList[ind+1:end]
+        ):
+            continue
+        basics[name] = (updates, step)
+    return basics
+
+# Tries to strength reduce the multiplies of the induction variables of a
+# loop, a transform for _sweepLoops.
+def _reduceLoop(quadList, loop, index, newTemps, remarks):
+    start, end = loop
+    header = quadList[start].x
+
+    # all the jumps to the header have to be in the loop, for the preheader
+    if index.outside(index.jumps, header, start, end):
+        return None
+
+    defs, uses = _loopDefsUses(quadList, loop)
+
+    basics = _basicInductionVariables(quadList, loop, defs, uses, index.jumpTargets)
+
+    # Derived induction variables: temps computed once as t = v * K, or as
+    # t = (v + x) * K, (v - x) * K for a loop invariant x
+    def isInvariant(operand):
+        return operand.type == "CONSTANT" or (operand.type in {"ID", "TEMPVAR"} and operand.value not in defs)
+
+    derived = {}
+    for name, inds in defs.items():
+        quad = quadList[inds[0]]
+        if len(inds) != 1 or quad.x.type != "TEMPVAR" or quad.type != "BINOP" or quad.op != "*":
+            continue
+        ivName = addend = None
+        for operand, factor in ((quad.y, _intConst(quad.z)), (quad.z, _intConst(quad.y))):
+            if not factor:
+                continue
+            if operand.type == "ID" and operand.value in basics:
+                ivName = operand.value
+                break
+            if operand.type == "TEMPVAR" and len(defs.get(operand.value, ())) == 1 \
+                    and len(uses.get(operand.value, ())) == 1:
+                addQuad = quadList[defs[operand.value][0]]
+                if addQuad.type != "BINOP" or addQuad.op not in {"+", "-"}:
+                    continue
+                if addQuad.y.type == "ID" and addQuad.y.value in basics and isInvariant(addQuad.z):
+                    ivName, addend = addQuad.y.value, defs[operand.value][0]
+                    break
+                if addQuad.op == "+" and addQuad.z.type == "ID" and addQuad.z.value in basics and isInvariant(addQuad.y):
+                    ivName, addend = addQuad.z.value, defs[operand.value][0]
+                    break
+        if ivName is None or ivName == name:
+            continue
+        if any(ind in updates for updates, _ in basics.values() for ind in (inds[0], addend)):
+            continue
+        # v must not be updated between the computation of t and its uses
+        first = inds[0] if addend is None else addend
+        update = basics[ivName][0][-1]
+        if addend is not None and addend > inds[0]:
+            continue
+        if any(use <= inds[0] or first < update <= use for use in uses.get(name, [])):
+            continue
+        derived.setdefault(ivName, []).append((inds[0], factor, addend))
+
+    if not derived:
+        return None
+
+    ivName, candidates = sorted(derived.items())[0]
+    updates, step = basics[ivName]
+    ivType = quadList[updates[-1]].x.dataType
+
+    # One new temp s = v * K per factor, data type and addend
+    reduced = {}
+    for ind, factor, addend in candidates:
+        quad = quadList[ind]
+        addQuad = None if addend is None else quadList[addend]
+        key = (factor, quad.x.dataType, None if addQuad is None else (addQuad.op, str(addQuad.y), str(addQuad.z)))
+        if key not in reduced:
+            reduced[key] = [next(newTemps), False, addQuad]
+        sName = reduced[key][0]
+        tName = quad.x.value
+        for use in uses.get(tName, []):
+            if any(operand.type == "AE" and _reads(operand, tName) for operand in _readOperands(quadList[use])):
+                reduced[key][1] = True
+            _rename(quadList[use], tName, sName)
+        if index.outside(index.reads, tName, start, end):
+            quadList[ind] = icg.Quad(op = "ASSIGN", x = quad.x, y = icg.Operand(sName, "TEMPVAR", quad.x.dataType))
+        else:
+            quadList[ind] = icg.Quad(op = "EMPTY")
+        if addend is not None:
+            quadList[addend] = icg.Quad(op = "EMPTY")
+        remarks["reduced"] += 1
+
+    # Linear function test replacement: if the only other use of v is a
+    # compare with a constant that stops it (v < C, v <= C going up, v > C,
+    # v >= C going down, or a branch leaving the loop on the inverse of
+    # these) and an s is used as a byte offset (so s = v * K does not
+    # overflow), the compare is done on s, the update of v is removed and v
+    # is computed from s after the loop.
+    otherUses = [
+        use for use in set(uses.get(ivName, [])) - set(updates)
+        if any(_reads(operand, ivName) for operand in _readOperands(quadList[use]))
+    ]
+    exitLabel = quadList[end+1] if end + 1 < len(quadList) else None
+    lftr = None
+    exitCode = []
+    if len(otherUses) == 1 and exitLabel is not None and exitLabel.type == "LABEL" \
+            and not index.outside(index.jumps, exitLabel.x, start, end):
+        compare = quadList[otherUses[0]]
+        operators = {"<", "<="} if step > 0 else {">", ">="}
+        if compare.type == "IFCMP" and compare.x == exitLabel.x:
+            operators = {"IF" + icg.invertedCompares[op] for op in operators}
+        if compare.type in {"BINOP", "IFCMP"} and compare.op in operators and compare.y.type == "ID" \
+                and compare.y.value == ivName and _intConst(compare.z) is not None:
+            bound = _intConst(compare.z)
+            for (factor, dataType, addKey), (sName, isOffset, _) in sorted(reduced.items(), key = lambda item: item[1][0]):
+                if addKey is None and isOffset and factor > 0 \
+                        and ICInterp.wrap(bound * factor, dataType) == bound * factor \
+                        and ICInterp.wrap(bound + step, ivType) == bound + step:
+                    lftr = (otherUses[0], sName, factor, dataType, bound)
+                    break
+
+    if lftr is not None:
+        ind, sName, factor, dataType, bound = lftr
+        compare = quadList[ind]
+        quadList[ind] = icg.Quad(op = compare.op, x = compare.x,
+                                 y = icg.Operand(sName, "TEMPVAR", dataType),
+                                 z = icg.Operand(str(bound * factor), "CONSTANT", dataType))
+        for update in updates:
+            quadList[update] = icg.Quad(op = "EMPTY")
+        exitCode.append(icg.Quad(op = "/", x = icg.Operand(ivName, "ID", ivType),
+                                 y = icg.Operand(sName, "TEMPVAR", dataType),
+                                 z = icg.Operand(str(factor), "CONSTANT", dataType)))
+        remarks["replaced"] += 1
+        remarks["eliminated"] += 1
+
+    # s is updated along with v, and computed from v before the loop
+    updateCode = []
+    preheader = []
+    for (factor, dataType, _), (sName, _, addQuad) in reduced.items():
+        sOperand = icg.Operand(sName, "TEMPVAR", dataType)
+        updateCode.append(icg.Quad(op = "+" if step * factor >= 0 else "-", x = sOperand, y = sOperand,
+                                   z = icg.Operand(str(abs(step * factor)), "CONSTANT", dataType)))
+        base = icg.Operand(ivName, "ID", ivType)
+        if addQuad is not None:
+            base = icg.Operand(next(newTemps), "TEMPVAR", addQuad.x.dataType)
+            preheader.append(icg.Quad(op = addQuad.op, x = base, y = addQuad.y, z = addQuad.z))
+        preheader.append(icg.Quad(op = "*", x = sOperand, y = base, z = icg.Operand(str(factor), "CONSTANT", dataType)))
+
+    return start, start, None, {start: preheader, updates[-1] + 1: updateCode, end + 2: exitCode}
+
+# Induction Variable Strength Reduction
+# In every loop, the multiplies t = v * K of a basic induction variable v
+# are replaced by a new temp s, computed as v * K before the loop and
+# increased by step * K after every update of v.
+@_usesAnalyses
+def inductionVariableStrengthReduction(quadList = [], remarks = None, analyses = None):
+    remarks = Counter() if remarks is None else remarks
+    newTemps = _newTemps(quadList)
+    return _sweepLoops(quadList, lambda quadList, loop, index: _reduceLoop(quadList, loop, index, newTemps, remarks),
+                       innerFirst = False, analyses = analyses)
+
+# Whether a compare-and-branch quad can be inverted: ordered comparisons of
+# floats cannot, as NaN is unordered
+def _invertibleBranch(quad):
+    if icg.branchCompares[quad.op] in {"==", "!="}:
+        return True
+    return all(
+        operand.dataType is not None and not operand.dataType.startswith("f")
+        for operand in (quad.y, quad.z)
+    )
+
+# Peephole Cleanup
+# In a few linear sweeps over the IC:
+#  - jumps to a label followed by a goto go to the target of the goto instead
+#    (jump threading), and a goto is replaced by the goto it jumps to,
+#  - the labels of a run of adjacent labels are replaced by the first one,
+#  - a compare-and-branch over a goto is inverted to go where the goto goes,
+#  - gotos (and ifs) to the next instruction are removed,
+#  - code after a goto that no jump reaches is removed,
+#  - labels that nothing jumps to and EMPTY quads are removed.
+def peepholeCleanup(quadList = [], remarks = None):
+    remarks = Counter() if remarks is None else remarks
+    quadList = [quad for quad in quadList if quad.type != "EMPTY"]
+
+    # label -> first label of its run of adjacent labels
+    alias = {}
+    # label -> quad following its run of labels
+    following = {}
+    run = []
+    for quad in quadList:
+        if quad.type == "LABEL":
+            alias[quad.x] = run[0] if run else quad.x
+            run.append(quad.x)
+        else:
+            for label in run:
+                following[label] = quad
+            run = []
+
+    # label -> final target of a chain of gotos, found with path compression
+    final = {}
+    def resolve(label):
+        path = []
+        while label not in final:
+            final[label] = None
+            path.append(label)
+            nextQuad = following.get(label, None)
+            if nextQuad is None or nextQuad.type != "GOTO" or final.get(nextQuad.x, "") is None:
+                break
+            label = nextQuad.x
+        target = final[label] if final[label] is not None else alias.get(label, label)
+        for label in path:
+            final[label] = target
+        return target
+
+    for ind, quad in enumerate(quadList):
+        if quad.type in icg.jumpTypes:
+            target = resolve(quad.x)
+            if target != quad.x:
+                quadList[ind] = icg.Quad(op = quad.op, x = target, y = quad.y, z = quad.z)
+                remarks["threaded"] += 1
+
+    # Branches over a goto
+    for ind in range(len(quadList) - 2):
+        quad, nextQuad = quadList[ind], quadList[ind+1]
+        if quad.type != "IFCMP" or nextQuad.type != "GOTO" or not _invertibleBranch(quad):
+            continue
+        after = ind + 2
+        while after < len(quadList) and quadList[after].type == "LABEL" \
+                and alias[quadList[after].x] != alias.get(quad.x, quad.x):
+            after += 1
+        if after < len(quadList) and quadList[after].type == "LABEL":
+            quadList[ind] = icg.Quad(op = "IF" + icg.invertedCompares[icg.branchCompares[quad.op]],
+                                     x = nextQuad.x, y = quad.y, z = quad.z)
+            quadList[ind+1] = icg.Quad(op = "EMPTY")
+            remarks["inverted"] += 1
+    quadList = [quad for quad in quadList if quad.type != "EMPTY"]
+
+    # Jumps to the next instruction, unreachable code after gotos
+    result = []
+    reachable = True
+    for ind, quad in enumerate(quadList):
+        if quad.type == "LABEL":
+            reachable = True
+        elif not reachable:
+            remarks["unreachable"] += 1
+            continue
+        if quad.type in icg.jumpTypes:
+            nextInd = ind + 1
+            while nextInd < len(quadList) and quadList[nextInd].type == "LABEL":
+                if alias[quadList[nextInd].x] == alias.get(quad.x, quad.x):
+                    break
+                nextInd += 1
+            if nextInd < len(quadList) and quadList[nextInd].type == "LABEL":
+                remarks["removed"] += 1
+                continue
+        if quad.type == "GOTO":
+            reachable = False
+        result.append(quad)
+
+    # Labels: keep the first of every run, if anything jumps to it
+    targets = {alias.get(quad.x, quad.x) for quad in result if quad.type in icg.jumpTypes}
+    quadList = []
+    for quad in result:
+        if quad.type == "LABEL" and (alias[quad.x] != quad.x or quad.x not in targets):
+            remarks["labels"] += 1
+            continue
+        if quad.type in icg.jumpTypes and alias.get(quad.x, quad.x) != quad.x:
+            quad = icg.Quad(op = quad.op, x = alias[quad.x], y = quad.y, z = quad.z)
+        quadList.append(quad)
+    return quadList
+
+# Loop unrolling limits: loops are fully unrolled if that takes at most
+# fullUnrollLimit quads, otherwise unrolled unrollFactor times if the new body
+# takes at most partialUnrollLimit quads.
+fullUnrollLimit = 64
+unrollFactor = 4
+partialUnrollLimit = 256
+
+# Names of new labels, following the ones used in quadList
+def _newLabels(quadList):
+    last = -1
+    for quad in quadList:
+        if quad.type == "LABEL" and quad.x[:1] == "c" and quad.x[1:].isdigit():
+            last = max(last, int(quad.x[1:]))
+    while True:
+        last += 1
+        yield "c" + str(last)
+
+# Compare operators with their operands swapped
+_swappedCompares = {"<": ">", ">": "<", "<=": ">=", ">=": "<=", "!=": "!=", "==": "=="}
+
+# Number of iterations of while v op bound, v starting from first and going up
+# by step, or None if the loop does not stop or v would overflow dataType.
+def _tripCount(first, step, op, bound, dataType):
+    if op == "<=":
+        op, bound = "<", bound + 1
+    elif op == ">=":
+        op, bound = ">", bound - 1
+
+    if op == "<":
+        if first >= bound:
+            return 0
+        if step <= 0:
+            return None
+        count = -(-(bound - first) // step)
+    elif op == ">":
+        if first <= bound:
+            return 0
+        if step >= 0:
+            return None
+        count = -(-(first - bound) // -step)
+    elif op == "!=":
+        if step == 0 or (bound - first) % step != 0 or (bound - first) // step < 0:
+            return None if first != bound else 0
+        count = (bound - first) // step
+    else:
+        return None
+
+    last = first + count * step
+    if ICInterp.wrap(first, dataType) != first or ICInterp.wrap(last, dataType) != last:
+        return None
+    return count
+
+# Copy of quads with new names for their labels and for the temps they define,
+# except for the temps in shared
+def _copyQuads(quads, newTemps, newLabels, shared):
+    labels = {quad.x: next(newLabels) for quad in quads if quad.type == "LABEL"}
+    temps = {}
+    for quad in quads:
+        if quad.type in {"ASSIGN", "BINOP", "UNOP"} and quad.x.type == "TEMPVAR" \
+                and quad.x.value not in temps and quad.x.value not in shared:
+            temps[quad.x.value] = next(newTemps)
+
+    def rename(operand):
+        if not isinstance(operand, icg.Operand):
+            return operand
+        if operand.type == "AE":
+            if operand.index is not None and operand.index.value in temps:
+                return icg.arrayElement(operand.base, rename(operand.index), operand.disp, operand.dataType)
+        elif operand.type == "TEMPVAR" and operand.value in temps:
+            return icg.Operand(temps[operand.value], "TEMPVAR", operand.dataType)
+        return operand
+
+    copies = []
+    for quad in quads:
+        if quad.type == "LABEL" or quad.type in icg.jumpTypes:
+            copies.append(icg.Quad(op = quad.op, x = labels.get(quad.x, quad.x), y = rename(quad.y), z = rename(quad.z)))
+        else:
+            copies.append(icg.Quad(op = quad.op, x = rename(quad.x), y = rename(quad.y), z = rename(quad.z)))
+    return copies
+
+# Unrolls a loop generated for a while statement on an induction variable
+# with a known trip count, a transform for _sweepLoops.
+def _unrollLoop(quadList, loop, index, newTemps, newLabels, remarks):
+    start, end = loop
+    if start + 2 >= end or end + 1 >= len(quadList):
+        return None
+
+    # header: if not v op C goto exit; body: ... goto header; exit: (the
+    # label of the body may be gone)
+    header, branch = quadList[start:start+2]
+    bodyStart = start + 3 if quadList[start+2].type == "LABEL" else start + 2
+    exitLabel = quadList[end+1]
+    if not (
+        branch.type == "IFCMP" and _invertibleBranch(branch)
+        and branch.x == exitLabel.x and exitLabel.type == "LABEL"
+    ):
+        return None
+
+    # the loop is only entered and left through its header
+    for label in [quad.x for quad in quadList[start:bodyStart] if quad.type == "LABEL"] + [exitLabel.x]:
+        if any(ind not in {start + 1, end} for ind in index.jumps.get(label, ())):
+            return None
+
+    defs, uses = _loopDefsUses(quadList, loop)
+    basics = _basicInductionVariables(quadList, loop, defs, uses, index.jumpTargets, kinds = ("ID", "TEMPVAR"))
+
+    op, ivOperand, bound = icg.invertedCompares[icg.branchCompares[branch.op]], branch.y, _intConst(branch.z)
+    if bound is None:
+        op, ivOperand, bound = _swappedCompares[op], branch.z, _intConst(branch.y)
+    if bound is None or ivOperand.type not in {"ID", "TEMPVAR"} or ivOperand.value not in basics:
+        return None
+    ivName = ivOperand.value
+    updates, step = basics[ivName]
+
+    # value of v when entering the loop
+    first = None
+    ind = index.lastDefBefore(ivName, start)
+    if ind is not None and quadList[ind].type == "ASSIGN" and quadList[ind].x.type == ivOperand.type:
+        first = _intConst(quadList[ind].y)
+
+    dataType = ICInterp.typeAliases.get(quadList[updates[-1]].x.dataType, quadList[updates[-1]].x.dataType)
+    if first is None:
+        return None
+    count = _tripCount(first, step, op, bound, dataType)
+    if count is None:
+        return None
+
+    body = [quad for quad in quadList[bodyStart:end] if quad.type != "EMPTY"]
+
+    # temps also used out of the body (like induction variables) keep their names
+    shared = {
+        quad.x.value for quad in body
+        if quad.type in {"ASSIGN", "BINOP", "UNOP"} and quad.x.type == "TEMPVAR"
+        and index.outside(index.mentions, quad.x.value, bodyStart, end - 1)
+    }
+
+    if count * len(body) <= fullUnrollLimit:
+        unrolled = []
+        for _ in range(count):
+            unrolled.extend(_copyQuads(body, newTemps, newLabels, shared))
+        remarks["unrolled"] += 1
+        return start, end + 1, unrolled, {}
+
+    if count >= 2 * unrollFactor and len(body) * unrollFactor <= partialUnrollLimit:
+        # The remaining iterations are peeled in front of the loop, so that
+        # the loop runs a multiple of unrollFactor times.
+        peeled = []
+        for _ in range(count % unrollFactor):
+            peeled.extend(_copyQuads(body, newTemps, newLabels, shared))
+        unrolled = []
+        for _ in range(unrollFactor):
+            unrolled.extend(_copyQuads(body, newTemps, newLabels, shared))
+        remarks["partiallyUnrolled"] += 1
+        return start, end + 1, peeled + quadList[start:bodyStart] + unrolled + [quadList[end], exitLabel], {}
+
+    return None
+
+# Loop Unrolling
+# Loops with an induction variable starting from a constant and compared with
+# a constant are fully unrolled when they are small enough, or else unrolled
+# unrollFactor times. The unrolled bodies are left to the other passes to
+# simplify.
+@_usesAnalyses
+def loopUnrolling(quadList = [], remarks = None, analyses = None):
+    remarks = Counter() if remarks is None else remarks
+    newTemps = _newTemps(quadList)
+    newLabels = _newLabels(quadList)
+    return _sweepLoops(quadList, lambda quadList, loop, index: _unrollLoop(quadList, loop, index, newTemps, newLabels, remarks),
+                       innerFirst = True, analyses = analyses)
+
+# Optimization levels. Each level is a list of pass groups, every group is
+# iterated until none of its passes changes the IC (or maxIterations is hit).
+optLevels = {
+    0: [],
+    1: [[constantFoldingAndPropagation], [peepholeCleanup]],
+    2: [[sparseConditionalConstantPropagation, constantFoldingAndPropagation, loopInvariantCodeMotion,
+         inductionVariableStrengthReduction, loopUnrolling],
+        [peepholeCleanup]],
+}
+
+# Passes that can be selected by name
+passRegistry = {
+    "constantFoldingAndPropagation": constantFoldingAndPropagation,
+    "sparseConditionalConstantPropagation": sparseConditionalConstantPropagation,
+    "loopInvariantCodeMotion":       loopInvariantCodeMotion,
+    "inductionVariableStrengthReduction": inductionVariableStrengthReduction,
+    "loopUnrolling":                 loopUnrolling,
+    "peepholeCleanup":               peepholeCleanup,
+}
+
+# Structured record of a single run of a pass
+class PassRemark():
+    __slots__ = ("name", "group", "iteration", "changed", "counts", "wallTime")
+
+    def __init__(self, name, group, iteration, changed, counts, wallTime):
+        self.name = name
+        self.group = group
+        self.iteration = iteration
+        self.changed = changed
+        self.counts = counts
+        self.wallTime = wallTime
+
+    def __repr__(self):
+        return "<PassRemark>: [%s, group=%d, iteration=%d, changed=%s, counts=%s, wallTime=%.6f]" % (
+            self.name, self.group, self.iteration, self.changed, dict(self.counts), self.wallTime)
+
+    def asDict(self):
+        return {
+            "name": self.name,
+            "group": self.group,
+            "iteration": self.iteration,
+            "changed": self.changed,
+            "counts": dict(self.counts),
+            "wallTime": self.wallTime
+        }
+
+class PassManager():
+    """ Runs groups of optimization passes over a list of quads.
+
+        level:
+            One of the keys of optLevels, used when groups is not given.
+
+        groups:
+            A list of pass groups (lists of pass functions). Every pass is
+            called as pas(quadList, remarks) and must return the new list of
+            quads, counting what it did in the remarks Counter. A pass that
+            counts nothing is considered to have left the IC unchanged.
+            The passes marked with _usesAnalyses get a third argument, the
+            ICAnalysis.AnalysisCache of the IC (analyses), whose results
+            are kept until a pass changes the IC.
+
+        maxIterations:
+            Upper bound on the number of times a group is iterated while
+            looking for a fixpoint.
+
+        stats:
+            A CompileStats object, filled in with a phase per pass
+            ("opt:<pass name>") and the number of quads left.
+    """
+    def __init__(self, level = 1, groups = None, maxIterations = 8, verbose = 0, stats = None):
+        self.groups = [list(group) for group in (optLevels[level] if groups is None else groups)]
+        self.maxIterations = maxIterations
+        self.verbose = verbose
+        self.stats = stats
+        self.remarks = []
+        self.analyses = ICAnalysis.AnalysisCache()
+
+    def _runPass(self, pas, quadList, group, iteration):
+        counts = Counter()
+        if self.verbose > 0:
             print("Applying ", pas)
-        quadList = pas(quadList)
-        if verbose > 0:
+        args = (quadList, counts, self.analyses) if getattr(pas, "usesAnalyses", False) else (quadList, counts)
+        start = time.perf_counter()
+        if self.stats is None:
+            quadList = pas(*args)
+        else:
+            with self.stats.phase("opt:" + pas.__name__):
+                quadList = pas(*args)
+        wallTime = time.perf_counter() - start
+        changed = sum(counts.values()) > 0
+        if changed:
+            self.analyses.invalidate()
+        else:
+            self.analyses.keep(quadList)
+        self.remarks.append(PassRemark(pas.__name__, group, iteration, changed, counts, wallTime))
+        if self.verbose > 0:
             for lno, i in enumerate(quadList):
                 print("%s: %s" % ("{:>2}".format(lno), i))
-    return quadList
+        return quadList, changed
+
+    def run(self, quadList = []):
+        # Bumped every time a pass changes the IC. A pass that left some
+        # version of the IC unchanged would leave it unchanged again, so it is
+        # skipped until another pass changes the IC.
+        version = 0
+        stableAt = {}
+        for groupInd, group in enumerate(self.groups):
+            for iteration in range(self.maxIterations):
+                changed = False
+                for pas in group:
+                    if stableAt.get(pas, None) == version:
+                        continue
+                    quadList, passChanged = self._runPass(pas, quadList, groupInd, iteration)
+                    if passChanged:
+                        version += 1
+                        changed = True
+                    else:
+                        stableAt[pas] = version
+                if not changed:
+                    break
+        if self.stats is not None:
+            self.stats.count("optimizedQuads", len(quadList))
+        return quadList
+
+    def summary(self):
+        """ Totals of the remarks per pass: runs, changed runs, counts and wall time.
+        """
+        totals = {}
+        for remark in self.remarks:
+            total = totals.setdefault(remark.name, {"runs": 0, "changed": 0, "counts": Counter(), "wallTime": 0.0})
+            total["runs"] += 1
+            total["changed"] += remark.changed
+            total["counts"].update(remark.counts)
+            total["wallTime"] += remark.wallTime
+        return totals
+
+# Runs the given passes once each, in order, or the preset of an optimization level.
+def optimize(quadList = [], passes = [], verbose = 0, level = None, maxIterations = 8, stats = None):
+    if level is not None:
+        pm = PassManager(level = level, maxIterations = maxIterations, verbose = verbose, stats = stats)
+    else:
+        pm = PassManager(groups = [[pas] for pas in passes], maxIterations = 1, verbose = verbose, stats = stats)
+    return pm.run(quadList)
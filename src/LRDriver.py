@@ -0,0 +1,251 @@
+# LR parse driver running the tables PLY's yacc computes for a parser.
+#
+# yacc's parse loop is generic: every reduction makes a YaccSymbol and a
+# slice of the symbol stack, and the rules read their symbols through a
+# YaccProduction, whose p[n], p[n] = value, len(p), p.lineno(n) and
+# p.lexpos(n) are all Python method calls.
+#
+# LRDriver exports the LALR tables of a yacc parser to integer arrays. The
+# terminals and the nonterminals are numbered, and every state has a row of
+# actions indexed by terminal (> 0 shift to that state, < 0 reduce by that
+# production, 0 accept) and a row of gotos indexed by nonterminal. The rows
+# are sparse, so they are packed into flat array('i')s by row displacement
+# (see _packRows): the rows overlap, each at its own offset, and a check
+# array tells which state an action slot belongs to, the others being
+# errors. The driver keeps a stack of states, one of values and one of
+# symbols (the tokens, and the names of the nonterminals), and calls the p_
+# functions of the rules with a Production: a list of the values of the
+# symbols, p[0] being the result, read and written as a list is. p.lineno(n),
+# p.lexpos(n), p.slice and p.lexer are those of yacc without tracking, the
+# symbols of p.slice being made when read. The rules of a single symbol whose
+# code is only p[0] = p[1] (stmt, dataType) are not called: their reduction
+# only replaces the symbol and the state on top of the stacks.
+#
+# Like yacc, the driver reduces in the states having a single reduction
+# (defaulted states) without reading a token, so the tokens are read and the
+# rules called in the same order, with the same results, and a syntax error
+# calls p_error with the token (None at the end of the input). Not supported
+# (yacc's own parse is needed for them): error recovery through the error
+# token or an errorfunc that returns, p[n] with n < 0, and debugging output.
+
+import dis
+from array import array
+
+class LRParseError(Exception): pass
+
+# A nonterminal of p.slice
+class Symbol():
+    __slots__ = ("type", "value")
+
+    def __init__(self, type, value):
+        self.type = type
+        self.value = value
+
+    def __repr__(self):
+        return self.type
+
+# p.slice, whose symbols are made when read: the rules mostly read the type
+# of a single one
+class _Slice():
+    __slots__ = ("p",)
+
+    def __init__(self, p):
+        self.p = p
+
+    def __len__(self):
+        return len(self.p)
+
+    def __getitem__(self, n):
+        p = self.p
+        if n == 0:
+            return Symbol(p._name, p[0])
+        symbol = p._symbols[p._base + n]
+        return Symbol(symbol, p[n]) if symbol.__class__ is str else symbol
+
+class Production(list):
+    """ The p argument of the rules: the values of the symbols of the
+        production being reduced, from p[1], and the result in p[0].
+    """
+    __slots__ = ("lexer", "parser", "_symbols", "_base", "_name")
+
+    def lineno(self, n):
+        return getattr(self._symbols[self._base + n], "lineno", 0) if n else 0
+
+    def lexpos(self, n):
+        return getattr(self._symbols[self._base + n], "lexpos", 0) if n else 0
+
+    @property
+    def slice(self):
+        return _Slice(self)
+
+# Code of a rule only doing p[0] = p[1], whose reduction the driver makes
+# without calling it
+def _copyRule(self, p):
+    p[0] = p[1]
+
+def _instructions(function):
+    return [(instruction.opname, instruction.argval) for instruction in dis.get_instructions(function)]
+
+_copyInstructions = _instructions(_copyRule)
+
+def _isCopyRule(function):
+    function = getattr(function, "__func__", function)
+    return (getattr(function, "__code__", None) is not None
+            and function.__code__.co_varnames[:2] == ("self", "p")
+            and _instructions(function) == _copyInstructions)
+
+# Action of the slots holding no action of the state looked up: a syntax error
+_ERROR = -(1 << 31)
+
+# Packs rows (dicts of column -> value, columns < width) into flat arrays by
+# row displacement: the value of row r at column c is values[bases[r] + c]
+# if check[bases[r] + c] == r. The rows go at the first offset where all
+# their columns are free, the longest first, and the arrays are padded so
+# that every column of every row can be looked up.
+def _packRows(rows, width):
+    bases = array("i", [0] * len(rows))
+    values = array("i")
+    check = array("i")
+    # bit i set for the slots taken
+    taken = 0
+    for row in sorted(range(len(rows)), key = lambda row: -len(rows[row])):
+        columns = rows[row]
+        mask = sum(1 << column for column in columns)
+        base = 0
+        while (taken >> base) & mask:
+            base += 1
+        taken |= mask << base
+        if len(check) < base + width:
+            padding = base + width - len(check)
+            values.extend([_ERROR] * padding)
+            check.extend([-1] * padding)
+        for column, value in columns.items():
+            values[base + column] = value
+            check[base + column] = row
+        bases[row] = base
+    return bases, values, check
+
+class LRDriver():
+    """ Parser running the tables of a yacc parser (ply.yacc.LRParser),
+        calling its rule functions.
+
+        terminals, nonterminals:
+            Names of the terminals and the nonterminals, by number.
+
+        actionBases, actionValues, actionCheck:
+            Actions of every state by terminal, packed by _packRows.
+
+        gotoBases, gotoValues:
+            Gotos of every state by nonterminal, packed by _packRows. A
+            goto is only looked up after a reduction, where it exists, so
+            they have no check.
+
+        defaults:
+            Reduction of every defaulted state, 0 for the others (yacc
+            only defaults to reductions).
+
+        rules:
+            (function, length, nonterminal number, name) of every
+            production, the function being None for a copy rule.
+    """
+    def __init__(self, yaccParser):
+        self.terminals = sorted({terminal for row in yaccParser.action.values() for terminal in row})
+        self.nonterminals = sorted({nonterminal for row in yaccParser.goto.values() for nonterminal in row})
+        self.terminalNumber = {terminal: number for number, terminal in enumerate(self.terminals)}
+        nonterminalNumber = {nonterminal: number for number, nonterminal in enumerate(self.nonterminals)}
+
+        states = max(yaccParser.action) + 1
+        actions = [{} for _ in range(states)]
+        gotos = [{} for _ in range(states)]
+        for state, row in yaccParser.action.items():
+            for terminal, action in row.items():
+                actions[state][self.terminalNumber[terminal]] = action
+        for state, row in yaccParser.goto.items():
+            for nonterminal, target in row.items():
+                gotos[state][nonterminalNumber[nonterminal]] = target
+        self.actionBases, self.actionValues, self.actionCheck = _packRows(actions, len(self.terminals))
+        self.gotoBases, self.gotoValues, _ = _packRows(gotos, len(self.nonterminals))
+        self.defaults = array("i", [yaccParser.defaulted_states.get(state, 0) for state in range(states)])
+
+        # The copy rules of a single symbol have no function
+        self.rules = [(None if production.len == 1 and _isCopyRule(production.callable) else production.callable,
+                       production.len, nonterminalNumber.get(production.name), production.name)
+                      for production in yaccParser.productions]
+        self.errorFunc = yaccParser.errorfunc
+
+    def parse(self, input=None, lexer=None, tokenfunc=None):
+        """ Parses the tokens of lexer (given input, if not None) or of
+            tokenfunc, and returns the value of the start symbol.
+        """
+        if input is not None:
+            lexer.input(input)
+        getToken = lexer.token if tokenfunc is None else tokenfunc
+
+        actionBases = self.actionBases
+        actionValues = self.actionValues
+        actionCheck = self.actionCheck
+        gotoBases = self.gotoBases
+        gotoValues = self.gotoValues
+        defaults = self.defaults
+        rules = self.rules
+        terminalNumber = self.terminalNumber
+        end = terminalNumber["$end"]
+
+        p = Production()
+        p.lexer = lexer
+        p.parser = self
+        states = [0]
+        values = [None]
+        symbols = ["$end"]
+        p._symbols = symbols
+        state = 0
+        lookahead = None
+        terminal = None
+        while True:
+            t = defaults[state]
+            if not t:
+                if lookahead is None:
+                    lookahead = getToken()
+                    terminal = end if lookahead is None else terminalNumber.get(lookahead.type)
+                    if lookahead is None:
+                        lookahead = False
+                t = _ERROR
+                if terminal is not None:
+                    slot = actionBases[state] + terminal
+                    if actionCheck[slot] == state:
+                        t = actionValues[slot]
+                if t == _ERROR:
+                    errorToken = lookahead or None
+                    if errorToken is not None and not hasattr(errorToken, "lexer"):
+                        errorToken.lexer = lexer
+                    if self.errorFunc is not None:
+                        self.errorFunc(errorToken)
+                    raise LRParseError("Syntax error at %s" % ("EOF" if errorToken is None else repr(errorToken.value)))
+
+            if t > 0:
+                states.append(t)
+                state = t
+                values.append(lookahead.value)
+                symbols.append(lookahead)
+                lookahead = None
+            elif t < 0:
+                function, length, nonterminal, name = rules[-t]
+                if function is None:
+                    # p[0] = p[1]: only the symbol and the state change
+                    symbols[-1] = name
+                    del states[-1]
+                else:
+                    base = len(values) - length - 1
+                    p[:] = values[base:]
+                    p[0] = None
+                    p._base = base
+                    p._name = name
+                    function(p)
+                    base += 1
+                    del values[base:], symbols[base:], states[base:]
+                    values.append(p[0])
+                    symbols.append(name)
+                state = gotoValues[gotoBases[states[-1]] + nonterminal]
+                states.append(state)
+            else:
+                return values[-1]
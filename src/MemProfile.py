@@ -0,0 +1,164 @@
+# Opt-in per-phase memory profiling.
+#
+# MemoryProfiler is a CompileStats that also takes tracemalloc snapshots at
+# the phase boundaries of the pipeline (lex, parse, icgen, every optimizer
+# pass). For each phase it records:
+#     peak:     highest traced memory during the phase, above its start
+#     retained: traced memory still held at the end of the phase
+#     sites:    the biggest allocation sites (file:line) of the phase
+#     types:    the RustAST nodes, Quads and Operands allocated during the
+#               phase and still alive at its end, per type and allocation site
+# Tracing starts with the first phase and lasts until stop() is called. It
+# slows everything down several times, so the times recorded along with the
+# memory are only good for comparing phases with each other.
+
+import gc
+import sys
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from CompileStats import CompileStats
+
+# Grouping of the objects that make up the AST and the IC
+def _typeGroup(obj):
+    cls = type(obj)
+    module = cls.__module__
+    if module == "RustAST":
+        return "RustAST." + cls.__name__
+    if module == "IntCodeGen" and cls.__name__ in {"Quad", "Operand"}:
+        return cls.__name__
+    return None
+
+def _sizeOf(obj):
+    size = sys.getsizeof(obj)
+    objDict = getattr(obj, "__dict__", None)
+    if objDict is not None:
+        size += sys.getsizeof(objDict)
+    return size
+
+# Live AST and IC objects: (type group, allocation site) -> [count, bytes]
+def _census():
+    census = {}
+    for obj in gc.get_objects():
+        group = _typeGroup(obj)
+        if group is None:
+            continue
+        tb = tracemalloc.get_object_traceback(obj)
+        site = "%s:%d" % (tb[0].filename, tb[0].lineno) if tb else "<untraced>"
+        entry = census.get((group, site), None)
+        if entry is None:
+            entry = census[(group, site)] = [0, 0]
+        entry[0] += 1
+        entry[1] += _sizeOf(obj)
+    return census
+
+class MemoryProfiler(CompileStats):
+    """ CompileStats that records memory per phase. Pass it as the stats
+        argument of the pipeline (see Pipeline.compileFile).
+
+        topSites:
+            Number of allocation sites kept per phase and per type.
+
+        frames:
+            Number of frames tracemalloc keeps for each allocation.
+    """
+    def __init__(self, topSites=5, frames=1):
+        CompileStats.__init__(self)
+        self.topSites = topSites
+        self.frames = frames
+        # phase name -> memory record, for the run of the phase with the highest peak
+        self.memory = {}
+        self._filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+    def start(self):
+        """ Starts tracing allocations. Called by the first phase if needed,
+            so that the objects of every later phase can be traced back to
+            their allocation sites.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name):
+        self.start()
+
+        gc.collect()
+        censusBefore = _census()
+        snapshotBefore = tracemalloc.take_snapshot().filter_traces(self._filters)
+        tracemalloc.reset_peak()
+        startMemory = tracemalloc.get_traced_memory()[0]
+
+        try:
+            with CompileStats.phase(self, name):
+                yield self
+        finally:
+            currentMemory, peakMemory = tracemalloc.get_traced_memory()
+            snapshotAfter = tracemalloc.take_snapshot().filter_traces(self._filters)
+            gc.collect()
+            censusAfter = _census()
+
+            previous = self.memory.get(name, None)
+            if previous is None or previous["peak"] < peakMemory - startMemory:
+                self.memory[name] = {
+                    "peak": peakMemory - startMemory,
+                    "retained": currentMemory - startMemory,
+                    "sites": self._topSites(snapshotBefore, snapshotAfter),
+                    "types": self._typeDelta(censusBefore, censusAfter)
+                }
+
+    def _topSites(self, before, after):
+        sites = []
+        for stat in after.compare_to(before, "lineno")[:self.topSites]:
+            if stat.size_diff <= 0:
+                break
+            frame = stat.traceback[0]
+            sites.append({
+                "site": "%s:%d" % (frame.filename, frame.lineno),
+                "bytes": stat.size_diff,
+                "count": stat.count_diff
+            })
+        return sites
+
+    def _typeDelta(self, before, after):
+        types = {}
+        for (group, site), (count, size) in after.items():
+            beforeCount, beforeSize = before.get((group, site), (0, 0))
+            if count <= beforeCount:
+                continue
+            entry = types.setdefault(group, {"count": 0, "bytes": 0, "sites": Counter()})
+            entry["count"] += count - beforeCount
+            entry["bytes"] += size - beforeSize
+            entry["sites"][site] += size - beforeSize
+
+        for entry in types.values():
+            entry["sites"] = [
+                {"site": site, "bytes": size} for site, size in entry["sites"].most_common(self.topSites)
+            ]
+        return dict(sorted(types.items(), key=lambda item: -item[1]["bytes"]))
+
+    def toDict(self):
+        result = CompileStats.toDict(self)
+        result["memory"] = self.memory
+        return result
+
+    def table(self):
+        from RustParser import multiLineTabulate
+
+        rows = []
+        for name, record in self.memory.items():
+            types = "\n".join(
+                "%s: %d (%d B)" % (group, entry["count"], entry["bytes"])
+                for group, entry in record["types"].items())
+            sites = "\n".join("%s: %d B" % (site["site"], site["bytes"]) for site in record["sites"])
+            rows.append([name, str(record["peak"]), str(record["retained"]), types, sites])
+        if len(rows) == 0:
+            rows = [["", "", "", "", ""]]
+
+        return "\n".join([
+            CompileStats.table(self),
+            multiLineTabulate(rows, ["PHASE", "PEAK (B)", "RETAINED (B)", "NEW OBJECTS", "TOP ALLOCATION SITES"])
+        ])
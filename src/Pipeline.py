@@ -0,0 +1,76 @@
+# Runs the whole pipeline: RustParser.parse -> IntCodeGen.generate -> IntCodeOpt
+#
+# RustParser, with PLY and its tables, is only imported when a file is
+# compiled, not on a hit of the compile cache. The IC modules are needed by
+# the cache too, to name the passes and to load the quads.
+
+import IntCodeGen as icg
+import IntCodeOpt as ico
+
+# Compiles the Rust file at path and returns (ast, quadList).
+#
+# level/passes:
+#     Optimization level preset (see IntCodeOpt.optLevels), or an explicit
+#     list of passes that are run once each, in order.
+# parser:
+#     A RustParser to reuse. A new one is built when not given.
+# stats:
+#     A CompileStats object that every phase fills in.
+# cache:
+#     A CompileCache.CompileCache. When the source, the compiler and the
+#     passes are the same as in an earlier compilation, the stored quads are
+#     returned without lexing, parsing or optimizing again.
+# withAST:
+#     With a cache, whether the AST is stored and returned too. The returned
+#     AST is None on a hit when it is not wanted or could not be loaded.
+def compileFile(path, level=1, passes=None, parser=None, stats=None, cache=None, withAST=True):
+    if cache is not None:
+        return _compileCached(path, level, passes, parser, stats, cache, withAST)
+
+    if parser is None:
+        import RustParser
+        if stats is None:
+            parser = RustParser.RustParser()
+        else:
+            with stats.phase("setup"):
+                parser = RustParser.RustParser()
+
+    ast = parser.parse(path=path, stats=stats)
+    quadList = list(icg.generate(ast, stats=stats))
+
+    if passes is not None:
+        quadList = ico.optimize(quadList, passes=passes, stats=stats)
+    else:
+        quadList = ico.optimize(quadList, level=level, stats=stats)
+
+    return ast, quadList
+
+def _compileCached(path, level, passes, parser, stats, cache, withAST):
+    import CompileCache
+
+    def lookup():
+        with open(path, "rb") as f:
+            source = f.read()
+        # Hash consing changes the quads generated
+        signature = CompileCache.passSignature(level, passes)
+        if parser is not None and parser.hashCons:
+            signature += ";hash-cons"
+        key = cache.key(source, signature)
+        return key, cache.get(key, withAST=withAST)
+
+    if stats is None:
+        key, entry = lookup()
+    else:
+        with stats.phase("cache"):
+            key, entry = lookup()
+        stats.count("cacheHit", int(entry is not None))
+    if entry is not None:
+        return entry
+
+    ast, quadList = compileFile(path, level=level, passes=passes, parser=parser, stats=stats)
+    if stats is None:
+        cache.put(key, quadList, ast=ast if withAST else None)
+    else:
+        with stats.phase("cache"):
+            cache.put(key, quadList, ast=ast if withAST else None)
+    return ast, quadList
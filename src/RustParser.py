@@ -1,12 +1,17 @@
 # Built-in
 import re
+import copy
 import json
+from functools import partial
 
 # Installed
 from ply import yacc
 
 # Project files
 from RustLexer import RustLexer
+from LRDriver import LRDriver
+from CompileStats import countNodes
+from Tabulate import multiLineTabulate
 from plyparser import PLYParser, Coord, ParseError, parameterized, template
 
 # Generated project files
@@ -23,6 +28,8 @@ class RustParser(PLYParser):
             yacctab=None,
             yacc_debug=False,
             taboutputdir='',
+            lr_driver=False,
+            hash_cons=False,
             verbose=0,):
         """ Create a new RustParser.
 
@@ -43,7 +50,9 @@ class RustParser(PLYParser):
 
             lexer:
                 Set this parameter to define the lexer to use if
-                you're not using the default RustLexer.
+                you're not using the default RustLexer, like
+                RustScanner.RustScanner, which gives the same tokens
+                faster.
 
             lextab:
                 Points to the lex table that's used for optimized
@@ -72,6 +81,16 @@ class RustParser(PLYParser):
             taboutputdir:
                 Set this parameter to control the location of generated
                 lextab and yacctab files.
+
+            lr_driver:
+                Set to True to parse with LRDriver, which runs the
+                tables built by yacc faster than yacc and gives the same
+                ASTs. yacc still parses when debugging (debuglevel).
+
+            hash_cons:
+                Set to True to build the equal expressions of a scope
+                (Constant, ID, and UnaryOp and BinaryOp of those) as a
+                single node, whose code IntCodeGen generates once.
         """
 
         # NOTE: set lex/yacc optimize to False due to generated files.
@@ -91,6 +110,10 @@ class RustParser(PLYParser):
                                     tabmodule=yacctab,
                                     outputdir=taboutputdir)
 
+        self.lrDriver = LRDriver(self.rustParser) if lr_driver else None
+        self.hashCons = hash_cons
+        self._resetHashCons()
+
         # Symbol tables for keeping track of symbols. symbolTable[-1] is
         # the current (topmost) scope. Each scope is a dictionary that
         # specifies whether a name is a type. If symbolTable[n][name] is
@@ -109,18 +132,90 @@ class RustParser(PLYParser):
         # Keeps track of the last token given to yacc (the lookahead token)
         self._lastYieldedToken = None
 
-    def parse(self, path='', debuglevel=0):
+    def parse(self, path='', debuglevel=0, stats=None):
+        """ Parses the file at path and returns its AST.
+
+            stats:
+                A CompileStats object. When given, the file is lexed up
+                front so that lexing and parsing are recorded as separate
+                phases, along with the token and AST node counts.
+        """
         fp = open(path, "r")
         text = fp.read()
         self.clex.fileName = path
         self.clex.reset_lineno()
         self._lastYieldedToken = None
+        self._resetHashCons()
 
         self.sourceCode = text.split("\n")
 
-        return self.rustParser.parse(input=text,
-                                     lexer=self.clex,
-                                     debug=debuglevel)
+        if stats is None:
+            return self._runParser(debuglevel, input=text, lexer=self.clex)
+
+        with stats.phase("lex"):
+            self.clex.input(text)
+            tokens = list(iter(self.clex.token, None))
+        stats.count("tokens", len(tokens))
+
+        with stats.phase("parse"):
+            ast = self._runParser(debuglevel, lexer=self.clex, tokenfunc=partial(next, iter(tokens), None))
+        stats.count("astNodes", countNodes(ast))
+
+        return ast
+
+    def _runParser(self, debuglevel, **kwargs):
+        if self.lrDriver is not None and not debuglevel:
+            return self.lrDriver.parse(**kwargs)
+        return self.rustParser.parse(debug=debuglevel, **kwargs)
+
+    # Hash consing: the expression nodes are looked up by their fields in
+    # the table of the current scope (one per compound statement), and only
+    # built when missing. An ID is keyed by the version of its variable, which
+    # every declaration and assignment of the variable changes, so that the
+    # expressions read after an assignment are new nodes. Operators are only
+    # shared when their operands are (not for array elements). Shared nodes
+    # keep the coord of their first occurrence and are never changed.
+    def _resetHashCons(self):
+        self._consTables = [{}]
+        self._consed = set()
+        self._versions = {}
+
+    def _node(self, cls, *fields, coord=None):
+        if not self.hashCons:
+            return cls(*fields, coord)
+        if cls is RustAST.ID:
+            key = (cls, fields, self._versions.get(fields[0], 0))
+        elif cls is RustAST.Constant:
+            # 1, 1.0 and True are equal keys
+            key = (cls, fields, type(fields[1]))
+        elif all(field in self._consed for field in fields if isinstance(field, RustAST.Node)):
+            key = (cls, fields)
+        else:
+            return cls(*fields, coord)
+        node = self._consTables[-1].get(key)
+        if node is None:
+            node = self._consTables[-1][key] = cls(*fields, coord)
+            self._consed.add(node)
+        return node
+
+    # The node converted to type typ (integer and float expressions take the
+    # type they are used with), a new node when it is shared
+    def _retyped(self, node, typ):
+        if node not in self._consed:
+            node.type = typ
+            return node
+        fields = [typ if name == "type" else getattr(node, name) for name in node.__slots__ if name not in {"coord", "__weakref__"}]
+        return self._node(node.__class__, *fields, coord=node.coord)
+
+    # A condition evaluated in other places than where it is written (loop
+    # conditions, else if conditions) must not use the code of the earlier
+    # equal expressions: it gets nodes of its own.
+    def _unshared(self, node):
+        return copy.deepcopy(node) if self.hashCons else node
+
+    def _assigned(self, name):
+        if self.hashCons:
+            self._versions[name] = self._versions.get(name, 0) + 1
 
     def _lexErrorFunc(self, msg, line, column):
         self._parse_error(msg, self._coord(line, column), errorType = "LexicalError")
@@ -175,12 +270,16 @@ class RustParser(PLYParser):
         autoConv = False
         if lhs.type != rhs.type:
             if (rhs.type == "integer" and lhs.type[0] in {"i", "u"}) or (rhs.type == "float" and lhs.type.startswith("f")):
-                rhs.type = lhs.type
+                rhs = self._retyped(rhs, lhs.type)
                 autoConv = True
             if not autoConv:
                 self._parse_error("Mismatched types! expected %s, found %s!" % (lhs.type, rhs.type), rhs.coord)
         return lhs, rhs
 
+    def _isSameConstant(self, first, second):
+        return isinstance(first, RustAST.Constant) and isinstance(second, RustAST.Constant) \
+            and first.type == second.type and str(first.value) == str(second.value)
+
     def p_declStmt(self, p):
         """ declStmt : LET ID COLON type EQUALS init SEMI
                      | LET MUT ID COLON type EQUALS init SEMI
@@ -209,42 +308,48 @@ class RustParser(PLYParser):
                                        RustAST.Assignment("=", lhs, rhs, self._token_coord(p, ideInd)),
                                        self._token_coord(p, 1))
         elif typ["declType"] == "arr":
-            if len(init["initData"]) > int(typ["length"]):
-                self._parse_error("Excess elements in array initializer!", p[initInd]["coord"])
+            length = int(typ["length"])
+            repeat = init.get("repeat", 1)
+            coord = self._token_coord(p, initInd)
 
-            assignments = []
+            if len(init["initData"]) * repeat > length:
+                self._parse_error("Excess elements in array initializer!", p[initInd]["coord"])
 
-            for index, rhs in enumerate(init["initData"]):
+            # Runs of equal constants and [expr; N] are assigned by a single
+            # ArrayFill, as are the elements left to their default value.
+            runs = []
+            for rhs in init["initData"]:
                 lhs, rhs = self._checkAssignmentType(lhs, rhs, p)
-                assignments.append(RustAST.Assignment(
-                    "=",
-                    RustAST.ArrayElement(
-                        RustAST.Constant(
-                            "i64",
-                            index,
-                            self._token_coord(p, initInd)),
-                        lhs,
-                        lhs.type,
-                        self._token_coord(p, initInd)),
-                    rhs,
-                    self._token_coord(p, initInd)
-                ))
-
-            for index in range(len(init["initData"]), int(typ["length"])):
-                assignments.append(RustAST.Assignment(
-                    "=",
-                    RustAST.ArrayElement(RustAST.Constant("i64", index), lhs, lhs.type, self._token_coord(p, initInd)),
-                    RustAST.Constant(
-                        typ["dataType"],
-                        self.defaults[typ["dataType"][0]],
-                        self._token_coord(p, initInd)
-                    ),
-                    self._token_coord(p, initInd)
-                ))
+                if runs and self._isSameConstant(runs[-1][0], rhs):
+                    runs[-1][1] += repeat
+                else:
+                    runs.append([rhs, repeat])
+
+            defaultCount = length - len(init["initData"]) * repeat
+            if defaultCount > 0:
+                default = RustAST.Constant(typ["dataType"], self.defaults[typ["dataType"][0]], coord)
+                if runs and self._isSameConstant(runs[-1][0], default):
+                    runs[-1][1] += defaultCount
+                else:
+                    runs.append([default, defaultCount])
+
+            assignments = []
+            index = 0
+
+            for rhs, count in runs:
+                if count == 0:
+                    continue
+                lvalue = RustAST.ArrayElement(RustAST.Constant("i64", index, coord), lhs, lhs.type, coord)
+                if count == 1:
+                    assignments.append(RustAST.Assignment("=", lvalue, rhs, coord))
+                else:
+                    assignments.append(RustAST.ArrayFill(lvalue, rhs, count, coord))
+                index += count
 
             p[0] = RustAST.ArrayDecl(entry, typ["length"], assignments, self._token_coord(p, 1))
 
         self.symbolTable[-1][ide] = entry
+        self._assigned(ide)
 
         if self.verbose > 0:
             print("Found Delcaration for %s %s." % ("Variable" if typ["declType"] == "var" else "Array", ide))
@@ -265,6 +370,8 @@ class RustParser(PLYParser):
 
         if len(p) == 6:
             ifFalseBlock = p[5]
+            if isinstance(ifFalseBlock, RustAST.If):
+                ifFalseBlock.cond = self._unshared(ifFalseBlock.cond)
 
         p[0] = RustAST.If(ifExpr, ifTrueBlock, ifFalseBlock, self._token_coord(p, 1))
 
@@ -274,7 +381,7 @@ class RustParser(PLYParser):
         if p[2].type != "bool":
             self._parse_error("Mismatched types! expected bool, found %s!" % p[2].type, p[2].coord)
 
-        p[0] = RustAST.While(p[2], p[3], self._token_coord(p, 1))
+        p[0] = RustAST.While(self._unshared(p[2]), p[3], self._token_coord(p, 1))
 
     def p_compStmt(self, p):
         """ compStmt : lbrace stmtList rbrace
@@ -334,6 +441,8 @@ class RustParser(PLYParser):
             lhs = p[1]
 
         lhs, rhs = self._checkAssignmentType(lhs, rhs, p)
+        if not isArray:
+            self._assigned(p1)
 
         p[0] = RustAST.Assignment("=", lhs, rhs, p1Coord)
 
@@ -359,7 +468,8 @@ class RustParser(PLYParser):
         elif lp == 6:
             init = {
                 "initType": "arr",
-                "initData": [p[2] for _ in range(int(p[4]))],
+                "initData": [p[2]],
+                "repeat": int(p[4]),
                 "coord": p[2].coord
             }
         p[0] = init
@@ -378,6 +488,7 @@ class RustParser(PLYParser):
         """ lbrace : LBRACE
         """
         self.symbolTable.append({})
+        self._consTables.append({})
         if self.verbose > 0:
             print("Found New Compound Statement.")
             self.printSymbolTable()
@@ -386,6 +497,7 @@ class RustParser(PLYParser):
         """ rbrace : RBRACE
         """
         self.symbolTable.pop()
+        self._consTables.pop()
         if self.verbose > 0:
             print("Reached End of Compound Statement.")
             self.printSymbolTable()
@@ -435,7 +547,8 @@ class RustParser(PLYParser):
         p1Obj = None
         if len(p) == 2:
             isArray = isinstance(p[1], RustAST.ArrayElement)
-            if isArray or p.slice[1].type == "ID":
+            # an ID is the only symbol whose value is a str
+            if isArray or isinstance(p[1], str):
                 isDecl = False
                 cd = None
 
@@ -458,7 +571,7 @@ class RustParser(PLYParser):
                     p[1].type = typ["dataType"]
                     p1Obj = p[1]
                 else:
-                    p1Obj = RustAST.ID(p1, cs[p1]["type"]["dataType"], self._token_coord(p, 1))
+                    p1Obj = self._node(RustAST.ID, p1, cs[p1]["type"]["dataType"], coord=self._token_coord(p, 1))
             else:
                 p1Obj = p[1]
         else:
@@ -493,7 +606,7 @@ class RustParser(PLYParser):
         p1 = p.slice[1]
         typ = self.typeMap[p1.type]["typ"]
         try:
-            p[0] = RustAST.Constant(typ, self.typeMap[p1.type]["conv"](p1.value), self._token_coord(p, 1))
+            p[0] = self._node(RustAST.Constant, typ, self.typeMap[p1.type]["conv"](p1.value), coord=self._token_coord(p, 1))
         except ValueError as ve:
             suffixStart = None
             if typ == "integer":
@@ -506,7 +619,7 @@ class RustParser(PLYParser):
 
             p1Value = p1.value[:p1.value.find(suffixStart)]
             p1Type = p1.value[p1.value.find(suffixStart):]
-            p[0] = RustAST.Constant(p1Type, self.typeMap[p1.type]["conv"](p1Value), self._token_coord(p, 1))
+            p[0] = self._node(RustAST.Constant, p1Type, self.typeMap[p1.type]["conv"](p1Value), coord=self._token_coord(p, 1))
 
     def p_unopExpr(self, p):
         """ unopExpr : MINUS expr
@@ -514,7 +627,7 @@ class RustParser(PLYParser):
         """
         if p[2].type != "char":
             if not ((p[1] == "-" and p[2].type.startswith("u")) or (p[1] == "!" and p[2].type.startswith("f"))):
-                p[0] = RustAST.UnaryOp(p[1], p[2], p[2].type, self._token_coord(p, 1))
+                p[0] = self._node(RustAST.UnaryOp, p[1], p[2], p[2].type, coord=self._token_coord(p, 1))
                 return
         self._parse_error("Cannot apply unary operator `%s` to type %s!" % (p[1], p[2].type), self._token_coord(p, 1))
 
@@ -561,19 +674,24 @@ class RustParser(PLYParser):
         autoConv = False
         if p[1].type != p[3].type:
             if (p[1].type[0] in {"i", "u"} and p[3].type == "integer") or (p[1].type.startswith("f") and p[3].type == "float"):
-                p[3].type = p[1].type
+                p[3] = self._retyped(p[3], p[1].type)
                 autoConv = True
             elif (p[3].type[0] in {"i", "u"} and p[1].type == "integer") or (p[3].type.startswith("f") and p[1].type == "float"):
-                p[1].type = p[3].type
+                p[1] = self._retyped(p[1], p[3].type)
                 autoConv = True
 
             if not autoConv:
                 self._parse_error("Mismatched types! expected %s, found %s!" % (p[1].type, p[3].type), p[3].coord)
 
+        # The right operand of && and || is only evaluated when the left one
+        # does not decide the value
+        if p[2] in {"&&", "||"}:
+            p[3] = self._unshared(p[3])
+
         if p[2] in arithOpers:
-            p[0] = RustAST.BinaryOp(p[2], p[1], p[3], p[1].type, self._token_coord(p, 2))
+            p[0] = self._node(RustAST.BinaryOp, p[2], p[1], p[3], p[1].type, coord=self._token_coord(p, 2))
         else:
-            p[0] = RustAST.BinaryOp(p[2], p[1], p[3], "bool", self._token_coord(p, 2))
+            p[0] = self._node(RustAST.BinaryOp, p[2], p[1], p[3], "bool", coord=self._token_coord(p, 2))
 
 
     def p_empty(self, p):
@@ -602,72 +720,3 @@ class RustParser(PLYParser):
         print(multiLineTabulate(st, ["PER SCOPE SYMBOL TABLE"]))
         if self.verbose > 1:
             input()
-
-# Utility function placed here for convenience
-from itertools import zip_longest
-
-# This function can take cells with multiple lines of text. Headers can only be a single line.
-# Example:
-#     For rows, header = [["r1c1", "r1c2"], ["r2c1", "r2c2l1\nr2c2l3\nr2c2l3"], ["r3c1l1\nr3c1l2\nr3c1l3", "r3c2"]], ["H1", "H2"]
-#     We get the following table:
-#     ╭──────┬──────╮
-#     │  H1  │  H2  │
-#     ╞══════╪══════╡
-#     │r1c1  │r1c2  │
-#     ├──────┼──────┤
-#     │r2c1  │r2c2l1│
-#     │      │r2c2l3│
-#     │      │r2c2l3│
-#     ├──────┼──────┤
-#     │r3c1l1│r3c2  │
-#     │r3c1l2│      │
-#     │r3c1l3│      │
-#     ╰──────┴──────╯
-def multiLineTabulate(rows, headers):
-    rowWidths = [len(header) for header in headers]
-
-    lines = []
-    for row in rows:
-        rowList = []
-        for column, cell in enumerate(row):
-            rowList.append([])
-            for line in cell.split("\n"):
-                lineLen = len(line)
-                rowWidths[column] = max(lineLen, rowWidths[column])
-                rowList[column].append(line)
-        lines.append(rowList)
-
-    dashs = ["{:─<%d}" % width for width in rowWidths]
-    doubleDashs = ["{:═<%d}" % width for width in rowWidths]
-    spaceCentred = ["{:^%d}" % width for width in rowWidths]
-    spaceLeft = ["{:<%d}" % width for width in rowWidths]
-
-    topHolder = "╭%s╮" % ("┬".join(dashs))
-    bottomHolder = "╰%s╯" % ("┴".join(dashs))
-
-    centredRowHolder = "│%s│" % ("│".join(spaceCentred))
-    leftRowHolder = "│%s│" % ("│".join(spaceLeft))
-    headerLineHolder = "╞%s╡" % ("╪".join(doubleDashs))
-    lineHolder = "├%s┤" % ("┼".join(dashs))
-
-    emptys = [""] * len(headers)
-
-    table = []
-
-    table.append(topHolder.format(*emptys))
-    table.append(centredRowHolder.format(*headers))
-    table.append(headerLineHolder.format(*emptys))
-
-    rows = []
-    for row in lines:
-        tmp = []
-        for line in zip_longest(*row):
-            line = list(map(lambda x: "" if x == None else str(x) , line))
-            tmp.append(leftRowHolder.format(*line))
-        tmp = "\n".join(tmp)
-        rows.append(tmp)
-    table.append(("\n"+lineHolder.format(*emptys)+"\n").join(rows))
-
-    table.append(bottomHolder.format(*emptys))
-
-    return "\n".join(table)
@@ -0,0 +1,138 @@
+# Scanner for the Rust language, an alternative to the PLY lexer of RustLexer.
+#
+# RustScanner has the interface of RustLexer and produces the same tokens
+# (types, values, line numbers and positions) and errors, several times
+# faster. For every token, PLY matches a master regex trying all the rules at
+# the current position, calls back a Python function for most rules and makes
+# a LexToken.
+#
+# Here the rules of RustLexer are combined into one compiled pattern, which
+# also skips the blanks of t_ignore before a token and the blanks after a
+# newline, and whose matches are found by finditer, at C speed. Every match is
+# dispatched on its lastgroup, a group per rule except for the operators and
+# delimiters (the string rules, which are literals) sharing one group, and a
+# last group matching an illegal character. The type of a token is looked up
+# from its text for keywords and operators, and is the name of its group
+# otherwise.
+#
+# The rules starting with the same characters keep the order PLY tries them in
+# (the order of definition of the rules defined as functions, then the longest
+# literals first), which decides between them the same way. As with PLY, the
+# error rules resume one character after the text they matched.
+#
+# Use it with RustParser(lexer=RustScanner).
+
+import re
+
+from RustLexer import RustLexer
+
+# Token of the scanner, with the attributes of PLY's LexToken. Made by the
+# scanner with object.__new__, which is faster than calling an __init__.
+class ScanToken():
+    __slots__ = ("type", "value", "lineno", "lexpos", "lexer")
+
+    def __str__(self):
+        return "LexToken(%s,%r,%d,%d)" % (self.type, self.value, self.lineno, self.lexpos)
+
+    __repr__ = __str__
+
+def _regex(name):
+    rule = getattr(RustLexer, "t_" + name)
+    return rule if isinstance(rule, str) else getattr(rule, "regex", rule.__doc__)
+
+# literal -> token type of the string rules
+_operators = {re.sub(r"\\(.)", r"\1", value): name[2:] for name, value in vars(RustLexer).items()
+              if name.startswith("t_") and name != "t_ignore" and isinstance(value, str)}
+
+_blanks = "[%s]*" % re.escape(RustLexer.t_ignore)
+
+# The longest literals first, the ones of a character in a class
+_operatorRegex = "|".join([re.escape(literal) for literal in sorted(_operators, key=len, reverse=True) if len(literal) > 1]
+                          + ["[%s]" % "".join(re.escape(literal) for literal in _operators if len(literal) == 1)])
+
+# The most frequent tokens first. Only the rules starting with the same
+# characters have to keep their order, ID excluding what BOOL_CONST matches
+# since it comes after it
+_groups = [
+    ("ID", "(?!%s)%s" % (_regex("BOOL_CONST"), _regex("ID"))),
+    ("OPERATOR", _operatorRegex),
+    ("NEWLINE", "%s(\\n%s)*" % (_regex("NEWLINE"), _blanks)),
+    ("BOOL_CONST", _regex("BOOL_CONST")),
+    ("FLOAT_CONST", _regex("FLOAT_CONST")),
+    ("INT_CONST_DEC", _regex("INT_CONST_DEC")),
+    ("CHAR_CONST", _regex("CHAR_CONST")),
+    ("UNMATCHED_QUOTE", _regex("UNMATCHED_QUOTE")),
+    ("BAD_CHAR_CONST", _regex("BAD_CHAR_CONST")),
+    # a character no rule matches
+    ("ILLEGAL", "[^%s\\n]" % re.escape(RustLexer.t_ignore)),
+]
+
+_pattern = re.compile("%s(?:%s)" % (_blanks, "|".join("(?P<%s>%s)" % group for group in _groups)), re.VERBOSE)
+
+# Groups reporting an error: the message for the matched text, and the
+# number of characters skipped after it
+_errors = {
+    "ILLEGAL": (lambda value: "Illegal character %s" % repr(value), 0),
+    "UNMATCHED_QUOTE": (lambda value: "Unmatched '", 1),
+    "BAD_CHAR_CONST": (lambda value: "Invalid char constant %s" % value, 1),
+}
+
+# Groups not making a token
+_special = set(_errors) | {"NEWLINE"}
+
+class RustScanner(RustLexer):
+    """ A scanner for the Rust language, used like RustLexer.
+    """
+    def build(self, **kwargs):
+        # The arguments are the options of PLY's lex, which are not used.
+        # lexer and lexdata are kept for the code reading them from the
+        # lexer of PLY.
+        self.lexer = self
+        self.lineno = 1
+        self.lexdata = ""
+        self._tokens = iter(())
+        # token text -> type, for the tokens whose type is not their group
+        self._types = dict(self.keywordMap)
+        self._types.update(_operators)
+
+    def input(self, text):
+        self.lexdata = self.stripComments(text)
+        self._tokens = self._scan(self.lexdata)
+
+    def token(self):
+        self.lastToken = next(self._tokens, None)
+        return self.lastToken
+
+    def _scan(self, text):
+        types = self._types
+        special = _special
+        new = object.__new__
+        Token = ScanToken
+        lineno = self.lineno
+        pos = 0
+        while True:
+            for m in _pattern.finditer(text, pos):
+                kind = m.lastgroup
+                value = m[kind]
+                pos = m.end()
+                if kind not in special:
+                    token = new(Token)
+                    token.type = types.get(value, kind)
+                    token.value = value
+                    token.lineno = lineno
+                    token.lexpos = pos - len(value)
+                    yield token
+                elif kind == "NEWLINE":
+                    lineno += value.count("\n")
+                    self.lineno = lineno
+                else:
+                    message, skip = _errors[kind]
+                    self._error(message(value), pos - len(value))
+                    if skip:
+                        pos += skip
+                        break
+            else:
+                return
+
+    def _error(self, msg, lexpos):
+        self.errorFunc(msg, self.lineno, self.find_tok_column(lexpos))
@@ -0,0 +1,70 @@
+# Text tables for the test scripts and reports, without the dependencies of
+# RustParser (which still exports multiLineTabulate).
+
+from itertools import zip_longest
+
+# This function can take cells with multiple lines of text. Headers can only be a single line.
+# Example:
+#     For rows, header = [["r1c1", "r1c2"], ["r2c1", "r2c2l1\nr2c2l3\nr2c2l3"], ["r3c1l1\nr3c1l2\nr3c1l3", "r3c2"]], ["H1", "H2"]
+#     We get the following table:
+#     ╭──────┬──────╮
+#     │  H1  │  H2  │
+#     ╞══════╪══════╡
+#     │r1c1  │r1c2  │
+#     ├──────┼──────┤
+#     │r2c1  │r2c2l1│
+#     │      │r2c2l3│
+#     │      │r2c2l3│
+#     ├──────┼──────┤
+#     │r3c1l1│r3c2  │
+#     │r3c1l2│      │
+#     │r3c1l3│      │
+#     ╰──────┴──────╯
+def multiLineTabulate(rows, headers):
+    rowWidths = [len(header) for header in headers]
+
+    lines = []
+    for row in rows:
+        rowList = []
+        for column, cell in enumerate(row):
+            rowList.append([])
+            for line in cell.split("\n"):
+                lineLen = len(line)
+                rowWidths[column] = max(lineLen, rowWidths[column])
+                rowList[column].append(line)
+        lines.append(rowList)
+
+    dashs = ["{:─<%d}" % width for width in rowWidths]
+    doubleDashs = ["{:═<%d}" % width for width in rowWidths]
+    spaceCentred = ["{:^%d}" % width for width in rowWidths]
+    spaceLeft = ["{:<%d}" % width for width in rowWidths]
+
+    topHolder = "╭%s╮" % ("┬".join(dashs))
+    bottomHolder = "╰%s╯" % ("┴".join(dashs))
+
+    centredRowHolder = "│%s│" % ("│".join(spaceCentred))
+    leftRowHolder = "│%s│" % ("│".join(spaceLeft))
+    headerLineHolder = "╞%s╡" % ("╪".join(doubleDashs))
+    lineHolder = "├%s┤" % ("┼".join(dashs))
+
+    emptys = [""] * len(headers)
+
+    table = []
+
+    table.append(topHolder.format(*emptys))
+    table.append(centredRowHolder.format(*headers))
+    table.append(headerLineHolder.format(*emptys))
+
+    rows = []
+    for row in lines:
+        tmp = []
+        for line in zip_longest(*row):
+            line = list(map(lambda x: "" if x == None else str(x) , line))
+            tmp.append(leftRowHolder.format(*line))
+        tmp = "\n".join(tmp)
+        rows.append(tmp)
+    table.append(("\n"+lineHolder.format(*emptys)+"\n").join(rows))
+
+    table.append(bottomHolder.format(*emptys))
+
+    return "\n".join(table)
@@ -82,6 +82,10 @@ class NodeCfg(object):
         src = self._gen_init()
         src += '\n' + self._gen_children()
         src += '\n' + self._gen_iter()
+        src += '\n' + self._gen_reduce()
+
+        src += '\n' + self._gen_encode()
+        src += '\n' + self._gen_decode()
 
         src += '\n' + self._gen_attr_names()
         return src
@@ -157,8 +161,56 @@ class NodeCfg(object):
 
         return src
 
+    def _gen_encode(self):
+        """ _encode(ref) returns the fields as a tuple, with the child
+            nodes replaced by their indices given by ref.
+        """
+        src = '    def _encode(self, ref):\n'
+        fields = []
+        for entry in self.all_entries:
+            if entry in self.child:
+                fields.append('ref(self.%s)' % entry)
+            elif entry in self.seq_child:
+                fields.append('_refs(self.%s, ref)' % entry)
+            else:
+                fields.append('self.%s' % entry)
+        src += '        return (%s)\n' % ''.join(field + ', ' for field in fields)
+        return src
+
+    def _gen_decode(self):
+        """ _decode(record, node, coord) rebuilds a node from an encoded
+            record, whose fields start at index 2, with node mapping indices
+            back to the already decoded nodes.
+        """
+        src = '    @classmethod\n'
+        src += '    def _decode(cls, record, node, coord):\n'
+        fields = []
+        for i, entry in enumerate(self.all_entries):
+            field = 'record[%d]' % (i + 2)
+            if entry in self.child:
+                field = 'node(%s)' % field
+            elif entry in self.seq_child:
+                field = '_nodes(%s, node)' % field
+            fields.append(field)
+        src += '        return cls(%s)\n' % ', '.join(fields + ['coord=coord'])
+        return src
+
+    def _gen_reduce(self):
+        """ __reduce__ rebuilds the node from its fields for pickle and
+            copy, __copy__ does the same without going through copyreg.
+        """
+        fields = ''.join('self.%s, ' % entry for entry in self.all_entries)
+        src = '    def __reduce__(self):\n'
+        src += '        return (self.__class__, (%sself.coord))\n' % fields
+        src += '\n'
+        src += '    def __copy__(self):\n'
+        src += '        return self.__class__(%scoord=self.coord)\n' % fields
+        return src
+
     def _gen_attr_names(self):
-        src = "    attr_names = (" + ''.join("%r, " % nm for nm in self.attr) + ')'
+        src = "    attr_names = (" + ''.join("%r, " % nm for nm in self.attr) + ')\n'
+        src += "    child_fields = (" + ''.join("%r, " % nm for nm in self.child) + ')\n'
+        src += "    seq_fields = (" + ''.join("%r, " % nm for nm in self.seq_child) + ')'
         return src
 
 
@@ -182,44 +234,191 @@ r'''#-----------------------------------------------------------------
 
 _PROLOGUE_CODE = r'''
 import sys
+import json
+import marshal
+
+from plyparser import Coord
+
+# Bumped when the encoding of the nodes changes
+AST_FORMAT_VERSION = 1
 
 def _repr(obj):
     """
     Get the representation of an object, with dedicated pprint-like format for lists.
     """
-    if isinstance(obj, list):
-        return '[' + (',\n '.join((_repr(e).replace('\n', '\n ') for e in obj))) + '\n]'
-    else:
-        return repr(obj) 
+    out = []
+    _write_repr(obj, out)
+    return ''.join(out)
+
+def _write_repr(obj, out):
+    """ Appends the representation of obj to out. Every line break inside a
+        nested node or list is followed by the padding of all the enclosing
+        ones, carried on the stack instead of re-indenting the nested
+        representations, so the cost is linear in the size of the output.
+    """
+    stack = [(obj, '')]
+    while stack:
+        item, pad = stack.pop()
+        if pad is None:
+            out.append(item)
+        elif isinstance(item, list):
+            work = [('[', None)]
+            for i, e in enumerate(item):
+                if i:
+                    work.append((',\n' + pad + ' ', None))
+                work.append((e, pad + ' '))
+            work.append(('\n' + pad + ']', None))
+            stack.extend(reversed(work))
+        elif isinstance(item, Node):
+            name = item.__class__.__name__
+            work = [(name + '(', None)]
+            indent = ''
+            for field in item.__slots__[:-2]:
+                if indent:
+                    work.append((',' + indent, None))
+                work.append((field + '=', None))
+                work.append((getattr(item, field), pad + '  ' + ' ' * (len(field) + len(name))))
+                indent = '\n' + pad + ' ' + ' ' * len(name)
+            work.append((indent + ')', None))
+            stack.extend(reversed(work))
+        else:
+            out.append(repr(item).replace('\n', '\n' + pad))
+
+def _refs(seq, ref):
+    return None if seq is None else tuple(ref(child) for child in seq)
+
+def _nodes(refs, node):
+    return None if refs is None else [node(i) for i in refs]
+
+def encode(root):
+    """ Encodes the tree under root into tuples of strings, numbers, dicts
+        and None, that marshal and json can store:
+            (AST_FORMAT_VERSION, class names, file names, records)
+        with a record per node, (class index, coord, fields...), in post
+        order so that children (referred to by their record index) come
+        before their parents. The root is the last record.
+    """
+    index = {id(root): None}
+    order = []
+    stack = [(root, iter(root))]
+    while stack:
+        node, children = stack[-1]
+        for child in children:
+            if id(child) not in index:
+                index[id(child)] = None
+                stack.append((child, iter(child)))
+                break
+        else:
+            stack.pop()
+            index[id(node)] = len(order)
+            order.append(node)
+
+    def ref(node):
+        return None if node is None else index[id(node)]
+
+    classes = {}
+    files = {}
+    records = []
+    for node in order:
+        cls = classes.setdefault(node.__class__.__name__, len(classes))
+        coord = node.coord
+        if coord is not None:
+            coord = (files.setdefault(coord.file, len(files)), coord.line, coord.column)
+        records.append((cls, coord) + node._encode(ref))
+    return (AST_FORMAT_VERSION, tuple(classes), tuple(files), tuple(records))
+
+def decode(data):
+    """ Rebuilds the tree encoded by encode(), which may have gone through
+        marshal or json (turning the tuples into lists).
+    """
+    version, class_names, files, records = data
+    if version != AST_FORMAT_VERSION:
+        raise ValueError("unsupported AST format version %r" % (version, ))
+    classes = [globals()[name] for name in class_names]
+    nodes = []
+
+    def node(i):
+        return None if i is None else nodes[i]
+
+    for record in records:
+        coord = record[1]
+        if coord is not None:
+            coord = Coord(files[coord[0]], coord[1], coord[2])
+        nodes.append(classes[record[0]]._decode(record, node, coord))
+    return nodes[-1] if nodes else None
+
+def dumps(root):
+    """ Compact binary form of the tree under root.
+    """
+    return marshal.dumps(encode(root))
+
+def loads(data):
+    return decode(marshal.loads(data))
+
+def write_json(root, buf):
+    """ Writes the encoding of the tree under root to buf as JSON, a record
+        per line.
+    """
+    version, class_names, files, records = encode(root)
+    buf.write('[%d,\n%s,\n%s,\n[' % (version, json.dumps(class_names), json.dumps(files)))
+    separator = '\n'
+    for record in records:
+        buf.write(separator)
+        buf.write(json.dumps(record, separators=(',', ':')))
+        separator = ',\n'
+    buf.write('\n]]\n')
+
+def read_json(buf):
+    return decode(json.load(buf))
+
+def walk(node):
+    """ Yields all the nodes of the tree under node in preorder, the
+        children of a node in the order of iteration, without recursion.
+    """
+    stack = [node]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node = pop()
+        yield node
+        for name in reversed(node.seq_fields):
+            seq = getattr(node, name)
+            if seq:
+                stack.extend(reversed(seq))
+        for name in reversed(node.child_fields):
+            child = getattr(node, name)
+            if child is not None:
+                push(child)
 
 class Node(object):
     __slots__ = ()
     """ Abstract base class for AST nodes.
+
+        child_fields and seq_fields name the fields holding a child node
+        and a sequence of child nodes, in the order of iteration.
     """
+    attr_names = ()
+    child_fields = ()
+    seq_fields = ()
+
     def __repr__(self):
         """ Generates a python representation of the current node
         """
-        result = self.__class__.__name__ + '('
-        
-        indent = ''
-        separator = ''
-        for name in self.__slots__[:-2]:
-            result += separator
-            result += indent
-            result += name + '=' + (_repr(getattr(self, name)).replace('\n', '\n  ' + (' ' * (len(name) + len(self.__class__.__name__)))))
-            
-            separator = ','
-            indent = '\n ' + (' ' * len(self.__class__.__name__))
-        
-        result += indent + ')'
-        
-        return result
+        return _repr(self)
 
     def children(self):
         """ A sequence of all children that are Nodes
         """
         pass
 
+    def __deepcopy__(self, memo):
+        """ Copies the tree under the node through its encoding, so that
+            deep trees do not hit the recursion limit.
+        """
+        copy = decode(encode(self))
+        memo[id(self)] = copy
+        return copy
+
     def show(self, buf=sys.stdout, offset=0, attrnames=False, nodenames=False, showcoord=False, _my_node_name=None):
         """ Pretty print the Node and all its attributes and
             children (recursively) to a buffer.
@@ -305,28 +504,39 @@ class NodeVisitor(object):
             (the ast module of Python 3.0)
     """
 
-    _method_cache = None
+    # Node class -> visit function, resolved once per visitor class
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
 
     def visit(self, node):
         """ Visit a node.
         """
-
-        if self._method_cache is None:
-            self._method_cache = {}
-
-        visitor = self._method_cache.get(node.__class__.__name__, None)
-        if visitor is None:
-            method = 'visit_' + node.__class__.__name__
-            visitor = getattr(self, method, self.generic_visit)
-            self._method_cache[node.__class__.__name__] = visitor
-
-        return visitor(node)
+        try:
+            method = self._dispatch[node.__class__]
+        except KeyError:
+            method = self._resolve(node.__class__)
+        return method(self, node)
+
+    @classmethod
+    def _resolve(cls, node_class):
+        method = getattr(cls, 'visit_' + node_class.__name__, cls.generic_visit)
+        cls._dispatch[node_class] = method
+        return method
 
     def generic_visit(self, node):
         """ Called if no explicit visitor function exists for a
             node. Implements preorder visiting of the node.
         """
-        for c in node:
-            self.visit(c)
+        visit = self.visit
+        for name in node.child_fields:
+            child = getattr(node, name)
+            if child is not None:
+                visit(child)
+        for name in node.seq_fields:
+            for child in getattr(node, name) or ():
+                visit(child)
 
 '''
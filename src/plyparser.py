@@ -39,21 +39,17 @@ class PLYParser(object):
         setattr(self.__class__, optrule.__name__, optrule)
 
     def _coord(self, lineno, column=None):
-        return Coord(
-                file=self.clex.fileName,
-                line=lineno,
-                column=column)
+        return Coord(self.clex.fileName, lineno, column)
 
     def _token_coord(self, p, token_idx):
         """ Returns the coordinates for the YaccProduction objet 'p' indexed
             with 'token_idx'. The coordinate includes the 'lineno' and
             'column'. Both follow the lex semantic, starting from 1.
         """
-        last_cr = p.lexer.lexer.lexdata.rfind('\n', 0, p.lexpos(token_idx))
-        if last_cr < 0:
-            last_cr = -1
-        column = (p.lexpos(token_idx) - (last_cr))
-        return self._coord(p.lineno(token_idx), column)
+        lexpos = p.lexpos(token_idx)
+        # rfind gives -1 on the first line
+        column = lexpos - p.lexer.lexer.lexdata.rfind('\n', 0, lexpos)
+        return Coord(self.clex.fileName, p.lineno(token_idx), column)
 
     def _parse_error(self, msg, coord, errorType = "ParseError"):
         print("\033[1;31m%s\033[0m in %s" % (errorType, coord))
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# Command line entry point of PyRust.
+#
+# Runs the pipeline on a Rust file up to the phase given by --stop-after and
+# writes what that phase produces:
+#     lex:   the tokens
+#     parse: the AST
+#     ic:    the intermediate code, not optimized
+#     opt:   the optimized intermediate code (the default)
+# The modules of a phase are only imported when it runs: lexing never loads
+# the parser (PLY's yacc, the grammar and the AST classes), and parsing never
+# loads the IC generator and the optimizer.
+#
+# Usage: pyrust.py FILE [--stop-after PHASE] [-O LEVEL | --passes NAME,...]
+#                  [--format FORMAT] [-o OUTPUT] [--lexer ply|scanner]
+#                  [--hash-cons] [--cache DIR] [--time]
+
+import argparse
+import sys
+from contextlib import nullcontext
+
+phases = ("lex", "parse", "ic", "opt")
+
+# Output formats of every phase, the first one being the default
+formats = {
+    "lex":   ("text", "jsonl"),
+    "parse": ("text", "json", "repr"),
+    "ic":    ("text", "jsonl", "binary", "c"),
+    "opt":   ("text", "jsonl", "binary", "c"),
+}
+
+# Lexers: the PLY one of RustLexer, or RustScanner
+lexers = ("ply", "scanner")
+
+class CLIError(Exception): pass
+
+def _phase(stats, name):
+    return nullcontext() if stats is None else stats.phase(name)
+
+def lexerClass(name):
+    if name == "scanner":
+        from RustScanner import RustScanner
+        return RustScanner
+    from RustLexer import RustLexer
+    return RustLexer
+
+# Tokens of the file at path, lexing errors being added to errors
+def lexFile(path, stats = None, errors = None, lexer = "ply"):
+    errors = [] if errors is None else errors
+    def errorFunc(msg, line, column):
+        errors.append("%s:%d:%d: %s" % (path, line, column, msg))
+
+    with open(path, "r") as f:
+        text = f.read()
+    with _phase(stats, "setup"):
+        clex = lexerClass(lexer)(path, errorFunc)
+        clex.build(optimize=False)
+    with _phase(stats, "lex"):
+        clex.input(text)
+        tokens = [(token, clex.find_tok_column(token.lexpos)) for token in iter(clex.token, None)]
+    if stats is not None:
+        stats.count("tokens", len(tokens))
+    return tokens
+
+def newParser(stats = None, lexer = "ply", hashCons = False):
+    import RustParser
+
+    with _phase(stats, "setup"):
+        return RustParser.RustParser(lexer=lexerClass(lexer), hash_cons=hashCons)
+
+def parseFile(path, stats = None, lexer = "ply", hashCons = False):
+    return newParser(stats, lexer, hashCons).parse(path=path, stats=stats)
+
+def _writeTokens(tokens, out, fmt):
+    if fmt == "jsonl":
+        import json
+        for token, column in tokens:
+            out.write(json.dumps({"type": token.type, "value": token.value, "line": token.lineno, "column": column}) + "\n")
+    else:
+        for token, column in tokens:
+            out.write("%d:%d\t%s\t%s\n" % (token.lineno, column, token.type, token.value))
+
+def _writeAST(ast, out, fmt):
+    import RustAST
+
+    if fmt == "json":
+        RustAST.write_json(ast, out)
+    elif fmt == "repr":
+        out.write(repr(ast) + "\n")
+    else:
+        ast.show(buf=out)
+
+def _writeIC(quads, out, fmt):
+    if fmt == "c":
+        import CBackend
+        out.write(CBackend.generate(quads))
+    else:
+        import ICWriter
+        ICWriter.dump(quads, out, format=fmt)
+
+def _passes(names):
+    import IntCodeOpt
+
+    passes = []
+    for name in names.split(","):
+        name = name.strip()
+        if name not in IntCodeOpt.passRegistry:
+            raise CLIError("unknown pass %r, expected some of: %s" % (name, ", ".join(sorted(IntCodeOpt.passRegistry))))
+        passes.append(IntCodeOpt.passRegistry[name])
+    return passes
+
+def argumentParser():
+    argParser = argparse.ArgumentParser(prog="pyrust", description="Compiles a Rust file to intermediate code.")
+    argParser.add_argument("file", help="Rust source file")
+    argParser.add_argument("--stop-after", choices=phases, default="opt", dest="stopAfter",
+                           help="last phase to run, whose result is written (default: opt)")
+    optimization = argParser.add_mutually_exclusive_group()
+    optimization.add_argument("-O", type=int, default=1, dest="level", metavar="LEVEL",
+                              help="optimization level (default: 1)")
+    optimization.add_argument("--passes", help="comma separated passes to run once each, instead of a level")
+    argParser.add_argument("--format", help="output format: %s" % "; ".join(
+        "%s: %s" % (phase, ", ".join(names)) for phase, names in formats.items()))
+    argParser.add_argument("-o", "--output", default="-", help="output file (default: standard output)")
+    argParser.add_argument("--lexer", choices=lexers, default="ply", help="lexer to use (default: ply)")
+    argParser.add_argument("--hash-cons", action="store_true", dest="hashCons",
+                           help="build the equal expressions of a scope as one AST node, computed once")
+    argParser.add_argument("--cache", metavar="DIR", help="compile cache directory, for the ic and opt phases")
+    argParser.add_argument("--time", action="store_true", help="write the time of every phase to standard error")
+    return argParser
+
+def run(args, out):
+    """ Runs the phases asked for by the parsed arguments and writes the
+        result to out. Returns the exit status.
+    """
+    stats = None
+    if args.time:
+        from CompileStats import CompileStats
+        stats = CompileStats()
+
+    status = 0
+    if args.stopAfter == "lex":
+        errors = []
+        _writeTokens(lexFile(args.file, stats, errors, args.lexer), out, args.format)
+        for error in errors:
+            print(error, file=sys.stderr)
+        status = 1 if errors else 0
+    elif args.stopAfter == "parse":
+        _writeAST(parseFile(args.file, stats, args.lexer, args.hashCons), out, args.format)
+    else:
+        import Pipeline
+
+        passes = [] if args.stopAfter == "ic" else None if args.passes is None else _passes(args.passes)
+        cache = None
+        if args.cache is not None:
+            import CompileCache
+            cache = CompileCache.CompileCache(args.cache)
+        parser = None if args.lexer == "ply" and not args.hashCons else newParser(stats, args.lexer, args.hashCons)
+        _, quads = Pipeline.compileFile(args.file, level=args.level, passes=passes, parser=parser, stats=stats,
+                                        cache=cache, withAST=False)
+        if args.format == "binary":
+            import ICBinary
+            ICBinary.dump(quads, args.output)
+        else:
+            _writeIC(quads, out, args.format)
+
+    if stats is not None:
+        print(stats.table(), file=sys.stderr)
+    return status
+
+def main(argv = None):
+    argParser = argumentParser()
+    args = argParser.parse_args(argv)
+    if args.format is None:
+        args.format = formats[args.stopAfter][0]
+    if args.format not in formats[args.stopAfter]:
+        argParser.error("the %s phase writes %s, not %s" % (args.stopAfter, ", ".join(formats[args.stopAfter]), args.format))
+    if args.format == "binary" and args.output == "-":
+        argParser.error("the binary format needs an output file (-o FILE)")
+    if args.cache is not None and args.stopAfter not in {"ic", "opt"}:
+        argParser.error("--cache only applies to the ic and opt phases")
+    if args.stopAfter == "opt" and args.passes is None:
+        import IntCodeOpt
+        if args.level not in IntCodeOpt.optLevels:
+            argParser.error("argument -O: invalid choice: %d (choose from %s)" % (
+                args.level, ", ".join(map(str, sorted(IntCodeOpt.optLevels)))))
+
+    out = None
+    try:
+        if args.output != "-" and args.format != "binary":
+            out = open(args.output, "w")
+        return run(args, sys.stdout if out is None else out)
+    except CLIError as error:
+        print("pyrust: error: %s" % error, file=sys.stderr)
+        return 2
+    except SystemExit as exit:
+        # The parser reports syntax errors and exits
+        return 1 if exit.code in (None, 0) else exit.code
+    finally:
+        if out is not None:
+            out.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
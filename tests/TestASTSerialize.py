@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import io
+import sys
+import time
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import RustAST
+
+parser = RustParser.RustParser(verbose=0)
+
+ast = parser.parse(path=sys.argv[1])
+
+# A chain of additions deeper than the recursion limit
+deep = RustAST.Constant("i64", 0)
+for i in range(2 * sys.getrecursionlimit()):
+    deep = RustAST.BinaryOp("+", deep, RustAST.Constant("i64", i), "i64")
+
+def toJSON(root):
+    buf = io.StringIO()
+    RustAST.write_json(root, buf)
+    return buf.getvalue()
+
+formats = [
+    ["marshal", RustAST.dumps, RustAST.loads],
+    ["json", toJSON, lambda text: RustAST.read_json(io.StringIO(text))],
+]
+
+failed = False
+rows = []
+for treeName, tree in [[path.basename(sys.argv[1]), ast], ["deep", deep]]:
+    encoded = RustAST.encode(tree)
+    for name, dump, load in formats:
+        start = time.perf_counter()
+        data = dump(tree)
+        dumpTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = load(data)
+        loadTime = time.perf_counter() - start
+
+        same = RustAST.encode(loaded) == encoded
+        if tree is ast:
+            same = same and repr(loaded) == repr(ast)
+        failed = failed or not same
+        rows.append([treeName, name, str(len(data)), "%.3f" % (dumpTime * 1000), "%.3f" % (loadTime * 1000), "yes" if same else "NO"])
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Tree", "Format", "Size", "Dump (ms)", "Load (ms)", "Round Trip"]))
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import copy
+import pickle
+import sys
+import time
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import RustAST
+
+parser = RustParser.RustParser(verbose=0)
+
+ast = parser.parse(path=sys.argv[1])
+
+# A chain of additions deeper than the recursion limit
+deep = RustAST.Constant("i64", 0)
+for i in range(2 * sys.getrecursionlimit()):
+    deep = RustAST.BinaryOp("+", deep, RustAST.Constant("i64", i), "i64")
+
+# Preorder through children(), as the traversals did before walk()
+def preorder(node, out):
+    out.append(node)
+    for _, child in node.children():
+        preorder(child, out)
+    return out
+
+class Counter(RustAST.NodeVisitor):
+    def __init__(self):
+        self.counts = {}
+
+    def generic_visit(self, node):
+        name = node.__class__.__name__
+        self.counts[name] = self.counts.get(name, 0) + 1
+        RustAST.NodeVisitor.generic_visit(self, node)
+
+class ConstantCounter(Counter):
+    def visit_Constant(self, node):
+        self.counts["Constant"] = self.counts.get("Constant", 0) + 1
+
+failed = False
+rows = []
+
+def check(name, ok, seconds=None):
+    global failed
+    failed = failed or not ok
+    rows.append([name, "-" if seconds is None else "%.3f" % (seconds * 1000), "yes" if ok else "NO"])
+
+start = time.perf_counter()
+expected = preorder(ast, [])
+seconds = time.perf_counter() - start
+check("children() preorder", True, seconds)
+
+start = time.perf_counter()
+walked = list(RustAST.walk(ast))
+seconds = time.perf_counter() - start
+check("walk() preorder", [id(node) for node in walked] == [id(node) for node in expected], seconds)
+check("walk() deep tree", sum(1 for _ in RustAST.walk(deep)) == 4 * sys.getrecursionlimit() + 1)
+
+counts = {}
+for node in walked:
+    counts[node.__class__.__name__] = counts.get(node.__class__.__name__, 0) + 1
+counter = Counter()
+start = time.perf_counter()
+counter.visit(ast)
+seconds = time.perf_counter() - start
+check("NodeVisitor counts", counter.counts == counts, seconds)
+
+# The subclass resolves its own visit_Constant, the base class table is not shared
+constants = ConstantCounter()
+constants.visit(ast)
+check("NodeVisitor dispatch per class",
+      constants.counts == counts and Counter._dispatch.get(RustAST.Constant) is Counter.generic_visit
+      and ConstantCounter._dispatch.get(RustAST.Constant) is ConstantCounter.visit_Constant)
+
+start = time.perf_counter()
+pickled = pickle.loads(pickle.dumps(ast))
+seconds = time.perf_counter() - start
+check("pickle", repr(pickled) == repr(ast) and pickled is not ast, seconds)
+
+shallow = copy.copy(ast)
+check("copy", repr(shallow) == repr(ast) and shallow is not ast and shallow.ext is ast.ext)
+
+start = time.perf_counter()
+copied = copy.deepcopy(ast)
+seconds = time.perf_counter() - start
+check("deepcopy", repr(copied) == repr(ast)
+      and not {id(node) for node in RustAST.walk(ast)} & {id(node) for node in RustAST.walk(copied)}, seconds)
+
+copiedDeep = copy.deepcopy(deep)
+check("deepcopy deep tree", RustAST.encode(copiedDeep) == RustAST.encode(deep) and copiedDeep is not deep)
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Check", "Time (ms)", "Passed"]))
+
+sys.exit(1 if failed else 0)
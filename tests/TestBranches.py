@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import sys
+import tempfile
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import ICInterp
+
+# A counting loop, and comparisons with NaN that are false either way round
+branches = """fn main () {
+    let zero:f64 = 0.0;
+    let n:f64 = zero / zero;
+    let mut i:i64 = 0;
+    let mut below:i64 = 0;
+    let mut above:i64 = 0;
+    while i < 10 {
+        i = i + 1;
+    }
+    if n < 1.0 {
+        below = 1;
+    } else {
+        below = 2;
+    }
+    if !(n < 1.0) {
+        above = 1;
+    }
+    let ordered:bool = !(n >= 1.0) && n == n;
+}
+"""
+
+expected = {"zero": 0.0, "i": 10, "below": 2, "above": 1, "ordered": False}
+
+# Conditional branches on temps computed by a comparison, which should have
+# been compare-and-branch quads
+def unfused(quadList):
+    compares = {quad.x.value for quad in quadList
+                if quad.type == "BINOP" and quad.op in {"<", ">", "<=", ">=", "==", "!="} and quad.x.type == "TEMPVAR"}
+    return [quad for quad in quadList if quad.type == "IF" and quad.y.type == "TEMPVAR" and quad.y.value in compares]
+
+tmp = tempfile.TemporaryDirectory()
+branchesPath = path.join(tmp.name, "branches.rs")
+with open(branchesPath, "w") as f:
+    f.write(branches)
+
+parser = RustParser.RustParser(verbose=0)
+
+failed = False
+rows = []
+for name, sourcePath in [[path.basename(sys.argv[1]), sys.argv[1]], ["branches", branchesPath]]:
+    reference = None
+    for level in sorted(Pipeline.ico.optLevels):
+        _, ic = Pipeline.compileFile(sourcePath, level=level, parser=parser)
+        ic = list(ic)
+        result = ICInterp.run(ic)
+        problems = ["%s is not fused" % str(quad).strip() for quad in unfused(ic)]
+        if reference is None:
+            reference = result.variables
+        # repr, as NaN is not equal to itself
+        if repr(result.variables) != repr(reference):
+            problems.append("computes %s" % result.variables)
+        if name == "branches":
+            values = {key: value for key, value in result.variables.items() if key != "n"}
+            if values != expected:
+                problems.append("computes %s" % values)
+            # Every iteration of the loop runs its compare-and-branch and the
+            # goto back to it
+            if level == 0 and (result.opCounts["IFCMP"] != 11 + 4 or result.opCounts["GOTO"] != 10 + 1):
+                problems.append("runs %d branches and %d gotos" % (result.opCounts["IFCMP"], result.opCounts["GOTO"]))
+        rows.append([name, "-O%d" % level, str(len(ic)), str(result.steps), "\n".join(problems) or "ok"])
+        failed = failed or bool(problems)
+
+tmp.cleanup()
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Program", "Level", "Quads", "Executed", "Status"]))
+
+sys.exit(1 if failed else 0)
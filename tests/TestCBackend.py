@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import sys
+import shutil
+from os import path, environ
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import ICInterp
+import CBackend
+
+if shutil.which(environ.get("CC", "cc")) is None:
+    print("No C compiler found, skipping the C backend test")
+    sys.exit(0)
+
+repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+parser = RustParser.RustParser()
+
+rows = []
+failed = False
+for level in sorted(Pipeline.ico.optLevels):
+    ast, ic = Pipeline.compileFile(sys.argv[1], level=level, parser=parser)
+    ic = list(ic)
+    expected = ICInterp.run(ic).variables
+    result = CBackend.runNative(ic, repeat=repeat)
+    same = result.returnCode == 0 and result.variables == expected
+    failed = failed or not same
+    rows.append([
+        "-O%d" % level,
+        str(len(ic)),
+        "%.3f" % (result.seconds * 1e6) if result.seconds is not None else "",
+        "\n".join("%s = %s" % kv for kv in result.variables.items()),
+        "yes" if same else "no"
+    ])
+
+print(RustParser.multiLineTabulate(
+    rows=rows,
+    headers=["Level", "Quads", "Native Time per Run (us)", "Final Values", "Matches Interpreter"]))
+
+# The native program must compute what the interpreter computes
+if failed:
+    print("The native program does not compute the same values as the interpreter!")
+    sys.exit(1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+srcPath = path.join(scriptPath, "..", "src")
+sys.path.append(srcPath)
+
+import RustParser
+import RustAST
+import Pipeline
+import ICWriter
+import ICBinary
+
+cli = path.join(srcPath, "pyrust.py")
+rustFile = sys.argv[1]
+
+def pyrust(*args):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, cli, rustFile] + list(args), capture_output=True, text=True)
+    return result, time.perf_counter() - start
+
+# Modules loaded by pyrust.main(args), run in a fresh interpreter
+def loadedModules(*args):
+    code = ("import sys, io, contextlib\n"
+            "sys.path.insert(0, %r)\n"
+            "import pyrust\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            "    pyrust.main(%r)\n"
+            "print('\\n'.join(sys.modules))\n") % (srcPath, [rustFile] + list(args))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return set(result.stdout.split())
+
+failed = False
+rows = []
+
+def check(name, ok, seconds=None):
+    global failed
+    failed = failed or not ok
+    rows.append([name, "-" if seconds is None else "%.1f" % (seconds * 1000), "yes" if ok else "NO"])
+
+# Tokens, one per line, in both formats
+result, seconds = pyrust("--stop-after", "lex")
+lines = result.stdout.splitlines()
+check("lex text", result.returncode == 0 and len(lines) > 0 and all(len(line.split("\t")) == 3 for line in lines), seconds)
+result, seconds = pyrust("--stop-after", "lex", "--format", "jsonl")
+tokens = [json.loads(line) for line in result.stdout.splitlines()]
+check("lex jsonl", result.returncode == 0 and len(tokens) == len(lines)
+      and ["%d:%d\t%s\t%s" % (t["line"], t["column"], t["type"], t["value"]) for t in tokens] == lines, seconds)
+
+result, seconds = pyrust("--stop-after", "lex", "--lexer", "scanner")
+check("lex text with the scanner", result.returncode == 0 and result.stdout.splitlines() == lines, seconds)
+
+# The AST as JSON is the one of the parser
+ast = RustParser.RustParser(verbose=0).parse(path=rustFile)
+result, seconds = pyrust("--stop-after", "parse", "--format", "json")
+check("parse json", result.returncode == 0
+      and RustAST.encode(RustAST.read_json(io.StringIO(result.stdout))) == RustAST.encode(ast), seconds)
+
+# The intermediate code is the one of the pipeline, optimized or not
+def icText(quads, format="text"):
+    out = io.StringIO()
+    ICWriter.dump(quads, out, format=format)
+    return out.getvalue()
+
+for args, level, passes in [(["--stop-after", "ic"], 1, []), ([], 1, None), (["-O", "2"], 2, None),
+                            (["--passes", "constantFoldingAndPropagation,peepholeCleanup"], 1,
+                             [Pipeline.ico.constantFoldingAndPropagation, Pipeline.ico.peepholeCleanup])]:
+    _, quads = Pipeline.compileFile(rustFile, level=level, passes=passes)
+    result, seconds = pyrust(*args)
+    check("ic " + (" ".join(args) or "(default)"), result.returncode == 0 and result.stdout == icText(quads), seconds)
+
+_, quads = Pipeline.compileFile(rustFile, parser=RustParser.RustParser(verbose=0, hash_cons=True))
+result, seconds = pyrust("--hash-cons")
+check("ic --hash-cons", result.returncode == 0 and result.stdout == icText(quads), seconds)
+
+_, quads = Pipeline.compileFile(rustFile)
+result, seconds = pyrust("--format", "jsonl")
+check("ic jsonl", result.returncode == 0 and result.stdout == icText(quads, "jsonl"), seconds)
+with tempfile.TemporaryDirectory() as tmp:
+    binaryPath = path.join(tmp, "out.icb")
+    result, seconds = pyrust("--format", "binary", "-o", binaryPath)
+    with ICBinary.load(binaryPath) as view:
+        check("ic binary", result.returncode == 0 and icText(view) == icText(quads), seconds)
+    cachePath = path.join(tmp, "cache")
+    first, _ = pyrust("--cache", cachePath)
+    result, seconds = pyrust("--cache", cachePath)
+    check("ic cached", first.returncode == 0 and result.stdout == first.stdout == icText(quads), seconds)
+
+result, seconds = pyrust("--time")
+check("time table on stderr", result.returncode == 0 and "PHASE" in result.stderr and "PHASE" not in result.stdout, seconds)
+
+# Bad arguments are rejected
+result, _ = pyrust("--stop-after", "lex", "--format", "binary")
+check("format of another phase", result.returncode == 2)
+result, _ = pyrust("--passes", "noSuchPass")
+check("unknown pass", result.returncode == 2 and "noSuchPass" in result.stderr)
+result, _ = pyrust("-O", "5")
+check("unknown level", result.returncode == 2 and "-O" in result.stderr and "Traceback" not in result.stderr)
+
+# Every phase only loads the modules it needs
+lexModules = loadedModules("--stop-after", "lex")
+check("lex loads no parser", "RustLexer" in lexModules and not lexModules & {"ply.yacc", "RustParser", "RustAST"})
+parseModules = loadedModules("--stop-after", "parse")
+check("parse loads no IC", "RustParser" in parseModules and not parseModules & {"IntCodeGen", "IntCodeOpt"})
+with tempfile.TemporaryDirectory() as tmp:
+    cachePath = path.join(tmp, "cache")
+    loadedModules("--cache", cachePath)
+    cachedModules = loadedModules("--cache", cachePath)
+check("cache hit loads no parser", "CompileCache" in cachedModules and not cachedModules & {"ply.yacc", "RustParser"})
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Check", "Time (ms)", "Passed"]))
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import time
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+from CompileCache import CompileCache, versionFiles
+
+failed = False
+rows = []
+
+with tempfile.TemporaryDirectory() as workDir:
+    cache = CompileCache(path.join(workDir, "cache"))
+    for level in sorted(Pipeline.ico.optLevels):
+        start = time.perf_counter()
+        _, reference = Pipeline.compileFile(sys.argv[1], level=level)
+        uncached = time.perf_counter() - start
+
+        start = time.perf_counter()
+        Pipeline.compileFile(sys.argv[1], level=level, cache=cache)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ast, quadList = Pipeline.compileFile(sys.argv[1], level=level, cache=cache)
+        warm = time.perf_counter() - start
+
+        same = list(map(repr, quadList)) == list(map(repr, reference)) and ast is not None
+        failed = failed or not same
+        rows.append(["-O%d" % level, "%.3f" % (uncached * 1000), "%.3f" % (cold * 1000), "%.3f" % (warm * 1000), "yes" if same else "NO"])
+
+    if (cache.hits, cache.misses) != (len(rows), len(rows)):
+        print("Expected %d hits and misses, got %d hits and %d misses" % (len(rows), cache.hits, cache.misses))
+        failed = True
+
+    # A changed source is a miss
+    source = path.join(workDir, "changed.rs")
+    with open(sys.argv[1]) as f:
+        text = f.read()
+    with open(source, "w") as f:
+        f.write(text + "\n// changed\n")
+    Pipeline.compileFile(source, level=1, cache=cache)
+    if cache.misses != len(rows) + 1:
+        print("A changed source was not a miss")
+        failed = True
+
+    # Every module folding constants or building the IC is in the compiler version
+    missing = {"RustParser.py", "IntCodeGen.py", "IntCodeOpt.py", "ICInterp.py"} - set(versionFiles())
+    if missing:
+        print("Not in the compiler version: %s" % ", ".join(sorted(missing)))
+        failed = True
+
+    # Least recently used entries are evicted first
+    small = CompileCache(path.join(workDir, "small"))
+    keys = [small.key(b"%d" % i, "test") for i in range(3)]
+    for i, key in enumerate(keys):
+        small.put(key, reference)
+        os.utime(small._path(key, ".pyic"), (i, i))
+    small.get(keys[0])
+    small.maxBytes = small.size() - 1
+    small.evict()
+    left = [key for key in keys if small.get(key) is not None]
+    if left != [keys[0], keys[2]]:
+        print("Eviction removed the wrong entries")
+        failed = True
+    leftovers = [name for _, _, names in os.walk(small.directory) for name in names if name.endswith(".tmp")]
+    if leftovers:
+        print("Temporary files were left: %s" % leftovers)
+        failed = True
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Level", "Uncached (ms)", "Cold (ms)", "Warm (ms)", "Same IC"]))
+
+sys.exit(1 if failed else 0)
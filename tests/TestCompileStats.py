@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+
+import sys
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import Pipeline
+from CompileStats import CompileStats
+
+stats = CompileStats()
+
+ast, ic = Pipeline.compileFile(sys.argv[1], level=2, stats=stats)
+
+print(stats.table())
+print(stats.toJSON(indent=4))
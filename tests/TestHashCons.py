@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import sys
+import tempfile
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+sys.path.append(path.join(scriptPath, "..", "bench"))
+
+import RustParser
+import RustAST
+import Pipeline
+import ICInterp
+
+import RustGen
+
+# Repeated expressions, read again after assignments, in loop and else if
+# conditions, and converted to the types they are used with
+repeated = """fn main() {
+    let mut a: i64 = 3;
+    let mut b: i64 = 4;
+    let mut x: i64 = a * b + 7;
+    let mut y: i64 = a * b + 7;
+    let mut w: i32 = 1 + 1;
+    let mut v: u8 = 1 + 1;
+    let mut arr: [i64; 4] = [a * b; 4];
+    a = a * b + 1;
+    y = a * b + 7;
+    while a * b < 100 {
+        a = a + 1;
+        x = a * b;
+    }
+    if a * b > 5 {
+        b = a * b - 1;
+    } else if a * b < 2 {
+        b = 0;
+    } else {
+        b = a * b;
+    }
+    let mut c: bool = a * b > 5;
+    x = a * b + y - (a * b + y);
+    arr[1] = a * b + arr[0];
+}
+"""
+
+plainParser = RustParser.RustParser(verbose=0)
+consParser = RustParser.RustParser(verbose=0, hash_cons=True)
+
+def variables(quads):
+    return ICInterp.run(quads, maxSteps=10**6).variables
+
+tmp = tempfile.TemporaryDirectory()
+programs = [[path.basename(sys.argv[1]), sys.argv[1]]]
+for name, text in [["repeated", repeated], ["generated", RustGen.generate(RustGen.Workload(statements=200), seed=2)]]:
+    programs.append([name, path.join(tmp.name, name + ".rs")])
+    with open(programs[-1][1], "w") as f:
+        f.write(text)
+
+failed = False
+rows = []
+for name, sourcePath in programs:
+    for level in [0, 1, 2]:
+        plainAST, plainQuads = Pipeline.compileFile(sourcePath, level=level, parser=plainParser)
+        consAST, consQuads = Pipeline.compileFile(sourcePath, level=level, parser=consParser)
+        nodes = list(RustAST.walk(consAST))
+        # The same tree, whose equal expressions are shared
+        same = repr(consAST) == repr(plainAST) and variables(consQuads) == variables(plainQuads)
+        if name == "repeated" and level == 0:
+            same = same and len(consQuads) < len(plainQuads)
+        failed = failed or not same
+        rows.append([name, str(level), str(len(nodes)), str(len({id(node) for node in nodes})),
+                     str(len(plainQuads)), str(len(consQuads)), "yes" if same else "NO"])
+
+tmp.cleanup()
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Program", "Level", "Nodes", "Distinct", "Quads", "Hash Consed Quads", "Same Tree and Values"]))
+
+sys.exit(1 if failed else 0)
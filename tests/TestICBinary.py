@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import tempfile
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import ICBinary
+import ICInterp
+
+parser = RustParser.RustParser()
+
+rows = []
+failed = False
+with tempfile.TemporaryDirectory() as tmpDir:
+    for sourcePath in sys.argv[1:]:
+        for level in sorted(Pipeline.ico.optLevels):
+            ast, ic = Pipeline.compileFile(sourcePath, level=level, parser=parser)
+            icPath = path.join(tmpDir, "%s.O%d.pyic" % (path.basename(sourcePath), level))
+
+            start = time.perf_counter()
+            ICBinary.dump(ic, icPath)
+            dumpTime = time.perf_counter() - start
+
+            start = time.perf_counter()
+            text = "\n".join(map(str, ic))
+            textTime = time.perf_counter() - start
+
+            with ICBinary.load(icPath) as view:
+                # lazy access to a single quad
+                last = str(view[-1]) if len(view) else ""
+                loaded = list(view)
+
+            # Every quad and operand must come back as it was
+            same = len(loaded) == len(ic) and all(
+                repr(a) == repr(b) and repr(a.x) == repr(b.x) and repr(a.y) == repr(b.y) and repr(a.z) == repr(b.z)
+                for a, b in zip(ic, loaded)
+            ) and last == (str(ic[-1]) if len(ic) else "")
+            try:
+                same = same and ICInterp.run(loaded).variables == ICInterp.run(ic).variables
+            except ICInterp.ICRuntimeError:
+                pass
+            failed = failed or not same
+
+            rows.append([
+                path.basename(sourcePath),
+                "-O%d" % level,
+                str(len(ic)),
+                str(len(text.encode("utf-8"))),
+                str(os.path.getsize(icPath)),
+                "%.3f" % (textTime * 1000),
+                "%.3f" % (dumpTime * 1000),
+                "yes" if same else "no"
+            ])
+
+print(RustParser.multiLineTabulate(
+    rows=rows,
+    headers=["Program", "Level", "Quads", "Text (B)", "Binary (B)", "Text (ms)", "Binary (ms)", "Round Trip"]))
+
+if failed:
+    print("The binary IC does not load back to the same quads!")
+    sys.exit(1)
@@ -8,6 +8,7 @@ sys.path.append(path.join(scriptPath, "..", "src"))
 
 import RustParser
 import IntCodeGen as icg
+import ICWriter
 
 parser = RustParser.RustParser(verbose=0)
 
@@ -15,4 +16,4 @@ ast = parser.parse(path=sys.argv[1])
 
 ic = icg.generate(ast)
 
-print("\n".join(map(str, ic)))
+ICWriter.dump(ic, sys.stdout)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import sys
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import ICInterp
+
+def execute(quadList):
+    try:
+        return ICInterp.run(quadList)
+    except ICInterp.ICRuntimeError as error:
+        return error
+
+def counts(result):
+    if isinstance(result, ICInterp.ICRuntimeError):
+        return "panicked: %s" % result
+    return "\n".join("%s: %d" % kv for kv in sorted(result.opCounts.items()))
+
+def labels(result):
+    if isinstance(result, ICInterp.ICRuntimeError):
+        return ""
+    return "\n".join("%s: %d" % kv for kv in result.labelCounts.items())
+
+def variables(result):
+    if isinstance(result, ICInterp.ICRuntimeError):
+        return ""
+    return "\n".join("%s = %s" % kv for kv in result.variables.items())
+
+parser = RustParser.RustParser()
+
+results = []
+for level in sorted(Pipeline.ico.optLevels):
+    ast, ic = Pipeline.compileFile(sys.argv[1], level=0, parser=parser)
+    pm = Pipeline.ico.PassManager(level=level)
+    ic = pm.run(list(ic))
+    results.append((level, len(ic), execute(ic)))
+
+print(RustParser.multiLineTabulate(
+    rows=[
+        ["-O%d" % level, str(size), str(getattr(result, "steps", "")), counts(result), labels(result), variables(result)]
+        for level, size, result in results
+    ],
+    headers=["Level", "Quads", "Executed", "Executed per Opcode", "Reached per Label", "Final Values"]))
+
+# Every optimization level must compute the same values (or fail the same way)
+reference = results[0][2]
+for level, size, result in results[1:]:
+    if isinstance(reference, ICInterp.ICRuntimeError):
+        same = str(reference) == str(result)
+    else:
+        same = not isinstance(result, ICInterp.ICRuntimeError) and result.variables == reference.variables
+    if not same:
+        print("-O%d does not compute the same values as -O0!" % level)
+        sys.exit(1)
+
+# The loops of the file are there for the loop passes and the cleanup, which
+# must change them at the highest level
+summary = pm.summary()
+for name, remark in [["inductionVariableStrengthReduction", "reduced"],
+                     ["loopUnrolling", "unrolled"],
+                     ["loopUnrolling", "partiallyUnrolled"],
+                     ["peepholeCleanup", "threaded"]]:
+    if not summary.get(name, {}).get("counts", {}).get(remark):
+        print("%s: nothing %s at -O%d!" % (name, remark, level))
+        sys.exit(1)
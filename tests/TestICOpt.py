@@ -21,15 +21,25 @@ icBefore = "\n".join(map(str, ic))
 # for lno, i in enumerate(ic):
 #     print("%s: %s" % ("{:>2}".format(lno), i))
 
-ic = ico.optimize(
-    ic, 
-    passes =  [
-        ico.constantFoldingAndPropagation,
-        ico.loopInvariantCodeMotion,
-        ico.constantFoldingAndPropagation
-    ])
+pm = ico.PassManager(
+    groups = [
+        [ico.constantFoldingAndPropagation],
+        [ico.loopInvariantCodeMotion],
+        [ico.inductionVariableStrengthReduction],
+        [ico.loopUnrolling],
+        [ico.constantFoldingAndPropagation],
+        [ico.peepholeCleanup]
+    ],
+    maxIterations = 1)
+ic = pm.run(ic)
 # ic = ico.optimize(ic,passes=[ico.constantFolding])
 
 icAfter = "\n".join(map(str, ic))
 
-print(RustParser.multiLineTabulate(rows=[[icBefore, icAfter]], headers=["Before Optimization", "After Optimization"]))
\ No newline at end of file
+print(RustParser.multiLineTabulate(rows=[[icBefore, icAfter]], headers=["Before Optimization", "After Optimization"]))
+
+remarkRows = [
+    [remark.name, str(remark.changed), ", ".join("%s=%d" % kv for kv in sorted(remark.counts.items())), "%.6f" % remark.wallTime]
+    for remark in pm.remarks
+]
+print(RustParser.multiLineTabulate(rows=remarkRows, headers=["Pass", "Changed", "Remarks", "Wall Time (s)"]))
\ No newline at end of file
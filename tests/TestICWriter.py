@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import io
+import itertools
+import sys
+import time
+import tracemalloc
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import IntCodeGen as icg
+import ICWriter
+
+failed = False
+rows = []
+
+for level in sorted(Pipeline.ico.optLevels):
+    _, ic = Pipeline.compileFile(sys.argv[1], level=level)
+
+    text = io.StringIO()
+    ICWriter.dump(ic, text, bufferSize=64)
+    sameText = text.getvalue() == "".join(str(quad) + "\n" for quad in ic)
+
+    jsonl = io.StringIO()
+    ICWriter.dump(ic, jsonl, format="jsonl")
+    jsonl.seek(0)
+    loaded = list(ICWriter.readJSONLines(jsonl))
+    sameJSON = [repr(quad) for quad in loaded] == [repr(quad) for quad in ic] \
+        and [[repr(operand) for operand in (q.x, q.y, q.z)] for q in loaded] == [[repr(operand) for operand in (q.x, q.y, q.z)] for q in ic]
+
+    failed = failed or not (sameText and sameJSON)
+    rows.append(["-O%d" % level, str(len(ic)), "yes" if sameText else "NO", "yes" if sameJSON else "NO"])
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Level", "Quads", "Text", "JSON Lines"]))
+
+# Streams many quads from a generator to a sink that keeps nothing: the memory
+# used has to stay bounded by the buffer, not grow with the number of quads.
+class Sink():
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+_, ic = Pipeline.compileFile(sys.argv[1], level=0)
+rows = []
+for count in [2000, 20000]:
+    for fmt in ICWriter.formats:
+        quads = (icg.Quad(op=quad.op, x=quad.x, y=quad.y, z=quad.z) for quad in itertools.islice(itertools.cycle(ic), count))
+        sink = Sink()
+        tracemalloc.start()
+        start = time.perf_counter()
+        written = ICWriter.dump(quads, sink, format=fmt)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        bounded = written == count and peak < 1024 * 1024
+        failed = failed or not bounded
+        rows.append([fmt, str(count), str(sink.size), "%.1f" % (peak / 1024), "%.1f" % (seconds * 1000), "yes" if bounded else "NO"])
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Format", "Quads", "Characters", "Peak Memory (KiB)", "Time (ms)", "Bounded"]))
+
+sys.exit(1 if failed else 0)
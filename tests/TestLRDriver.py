@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import contextlib
+import gc
+import io
+import sys
+import tempfile
+import time
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+sys.path.append(path.join(scriptPath, "..", "bench"))
+
+import RustParser
+import RustAST
+from RustScanner import RustScanner
+
+import RustGen
+
+yaccParser = RustParser.RustParser(verbose=0)
+lrParser = RustParser.RustParser(verbose=0, lr_driver=True)
+scannerParser = RustParser.RustParser(verbose=0, lr_driver=True, lexer=RustScanner)
+
+# AST of the file at sourcePath (or the syntax error message), and the
+# fastest of repeat parses
+def parse(parser, sourcePath, repeat):
+    best = None
+    for _ in range(repeat):
+        out = io.StringIO()
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(out):
+                result = RustAST.encode(parser.parse(path=sourcePath))
+        except SystemExit:
+            result = out.getvalue()
+        finally:
+            seconds = time.perf_counter() - start
+            gc.enable()
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+with open(sys.argv[1], "r") as f:
+    source = f.read()
+programs = [
+    [path.basename(sys.argv[1]), source, 1],
+    ["generated", RustGen.generate(RustGen.Workload(statements=2000), seed=1), 3],
+    ["syntax error", source[:len(source) // 2], 1],
+]
+
+failed = False
+
+# The packed tables hold every action and goto of yacc, and no other action
+driver = lrParser.lrDriver
+yaccTables = lrParser.rustParser
+for state in range(len(driver.defaults)):
+    for number, terminal in enumerate(driver.terminals):
+        slot = driver.actionBases[state] + number
+        action = driver.actionValues[slot] if driver.actionCheck[slot] == state else None
+        if action != yaccTables.action.get(state, {}).get(terminal):
+            print("Action of state %d on %s is %s, not %s" % (state, terminal, action, yaccTables.action.get(state, {}).get(terminal)))
+            failed = True
+    for number, nonterminal in enumerate(driver.nonterminals):
+        target = yaccTables.goto.get(state, {}).get(nonterminal)
+        if target is not None and driver.gotoValues[driver.gotoBases[state] + number] != target:
+            print("Goto of state %d on %s is not %d" % (state, nonterminal, target))
+            failed = True
+
+rows = []
+tmp = tempfile.TemporaryDirectory()
+for name, text, repeat in programs:
+    sourcePath = path.join(tmp.name, "program.rs")
+    with open(sourcePath, "w") as f:
+        f.write(text)
+    expected, yaccTime = parse(yaccParser, sourcePath, repeat)
+    for parserName, parser in [["lr", lrParser], ["lr + scanner", scannerParser]]:
+        result, seconds = parse(parser, sourcePath, repeat)
+        same = result == expected
+        failed = failed or not same
+        rows.append([name, parserName, "%.1f" % (yaccTime * 1000), "%.1f" % (seconds * 1000),
+                     "%.2f" % (yaccTime / seconds), "yes" if same else "NO"])
+
+tmp.cleanup()
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Program", "Driver", "yacc (ms)", "Driver (ms)", "Speedup", "Same AST"]))
+
+sys.exit(1 if failed else 0)
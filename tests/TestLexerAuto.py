@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import glob
 import re
 import sys
 import unittest
@@ -10,6 +11,7 @@ sys.path.append(path.join(scriptPath, "..", "src"))
 
 sys.path.insert(0, '..')
 from RustLexer import RustLexer
+from RustScanner import RustScanner
 
 
 def tokenList(clex):
@@ -25,11 +27,13 @@ class TestRustLexerNoErrors(unittest.TestCase):
         errors. Therefore, the errorFunc passed to the lexer
         raises an exception.
     """
+    lexerClass = RustLexer
+
     def errorFunc(self, msg, line, column):
         self.fail(msg)
 
     def setUp(self):
-        self.clex = RustLexer("test-lex-auto", self.errorFunc)
+        self.clex = self.lexerClass("test-lex-auto", self.errorFunc)
         self.clex.build(optimize=False)
 
     def assertTokensTypes(self, string, types):
@@ -130,11 +134,13 @@ class TestRustLexerErrors(unittest.TestCase):
         Works by passing an error functions that saves the error
         in an attribute for later perusal.
     """
+    lexerClass = RustLexer
+
     def errorFunc(self, msg, line, column):
         self.error = msg
 
     def setUp(self):
-        self.clex = RustLexer("test-lex-auto", self.errorFunc)
+        self.clex = self.lexerClass("test-lex-auto", self.errorFunc)
         self.clex.build(optimize=False)
         self.error = ""
 
@@ -168,5 +174,44 @@ class TestRustLexerErrors(unittest.TestCase):
         self.assertLexerError("'jx'", ERR_INVALID_CCONST)
         self.assertLexerError(r"'\*'", ERR_INVALID_CCONST)
 
+# The same tests, with the scanner
+class TestRustScannerNoErrors(TestRustLexerNoErrors):
+    lexerClass = RustScanner
+
+class TestRustScannerErrors(TestRustLexerErrors):
+    lexerClass = RustScanner
+
+
+class TestRustScannerSameTokens(unittest.TestCase):
+    """ Test that the scanner gives the same tokens and errors as the
+        PLY lexer.
+    """
+    def lex(self, lexerClass, text):
+        errors = []
+        clex = lexerClass("test-lex-auto", lambda msg, line, column: errors.append((msg, line, column)))
+        clex.build(optimize=False)
+        clex.input(text)
+        return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in tokenList(clex)], errors
+
+    def assertSameTokens(self, text):
+        self.assertEqual(self.lex(RustScanner, text), self.lex(RustLexer, text), repr(text))
+
+    def testPrograms(self):
+        for fileName in sorted(glob.glob(path.join(scriptPath, "*.rs"))):
+            with open(fileName) as f:
+                self.assertSameTokens(f.read())
+
+    def testPrefixes(self):
+        # The rules tried first win over the longest match
+        self.assertSameTokens('truest falsely true_ main mainly u8 u80')
+        self.assertSameTokens('12e 12e3 1.5.5 .5e 3u8i8 7f32 1.0u8 a.b')
+        self.assertSameTokens('a<=b<c==d=e!=!f||g|h&&i&j')
+
+    def testErrors(self):
+        self.assertSameTokens("x ~ y\n'b\nz '' 'jx' $ \\ 'a")
+        self.assertSameTokens("'abc")
+        self.assertSameTokens("\t 'x\n\n y ` \n")
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
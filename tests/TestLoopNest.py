@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import sys
+import tempfile
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import ICAnalysis
+import ICInterp
+import IntCodeOpt as ico
+
+# Loops three deep, next to each other, and holding an if
+nested = """fn main() {
+    let mut s: i64 = 0;
+    let mut i: i64 = 0;
+    while i < 3 {
+        let mut j: i64 = 0;
+        while j < 4 {
+            let mut k: i64 = 0;
+            while k < 2 {
+                s = s + i * j + k;
+                k = k + 1;
+            }
+            j = j + 1;
+        }
+        let mut m: i64 = 0;
+        while m < 5 {
+            if m > 2 {
+                s = s - 1;
+            }
+            m = m + 1;
+        }
+        i = i + 1;
+    }
+}
+"""
+
+# Loops found by scanning for gotos back to an earlier label, and their
+# nesting depth found from their intervals
+def intervalLoops(quadList):
+    labelInd = {}
+    loops = []
+    for ind, quad in enumerate(quadList):
+        if quad.type == "LABEL":
+            labelInd[quad.x] = ind
+        elif quad.type == "GOTO" and quad.x in labelInd:
+            loops.append((labelInd[quad.x], ind))
+    return {loop: sum(outer[0] <= loop[0] and loop[1] <= outer[1] for outer in loops) for loop in loops}
+
+def checkForest(quadList):
+    analyses = ICAnalysis.AnalysisCache()
+    forest = analyses.loops(quadList)
+    domTree = analyses.domTree(quadList)
+    blocks = forest.cfg.blocks
+    problems = []
+    for loop in forest.loops:
+        for ind in loop.blocks:
+            if not domTree.dominates(loop.header, ind):
+                problems.append("header %d does not dominate block %d" % (loop.header, ind))
+        for ind in loop.exits:
+            if ind in loop.blocks or not any(pred in loop.blocks for pred in blocks[ind].preds):
+                problems.append("block %d is no exit of the loop of %d" % (ind, loop.header))
+        if loop.parent is not None and not loop.blocks < loop.parent.blocks:
+            problems.append("loop of %d is not inside its parent" % loop.header)
+    postorder = forest.postorder()
+    if any(postorder.index(loop) > postorder.index(loop.parent) for loop in forest.loops if loop.parent is not None):
+        problems.append("postorder has an outer loop first")
+
+    # The loops of IntCodeGen are the intervals between a label and a goto
+    # back to it
+    spans = {loop.span(forest.cfg): loop.depth for loop in forest.loops}
+    if spans != intervalLoops(quadList):
+        problems.append("loops %s, intervals %s" % (spans, intervalLoops(quadList)))
+    return forest, problems
+
+tmp = tempfile.TemporaryDirectory()
+nestedPath = path.join(tmp.name, "nested.rs")
+with open(nestedPath, "w") as f:
+    f.write(nested)
+
+failed = False
+rows = []
+for name, sourcePath in [[path.basename(sys.argv[1]), sys.argv[1]], ["nested", nestedPath]]:
+    _, ic = Pipeline.compileFile(sourcePath, level=0)
+    forest, problems = checkForest(ic)
+    depths = ",".join(str(loop.depth) for loop in forest.preorder()) or "-"
+    rows.append([name, "loop forest", "%d loops, depths %s" % (len(forest.loops), depths), "\n".join(problems) or "ok"])
+    failed = failed or bool(problems)
+
+    # The loop passes share the analyses of the IC until one of them changes
+    # it, and compute the same values
+    pm = ico.PassManager(level=2)
+    optimized = pm.run(ic)
+    runs = sum(getattr(ico.passRegistry[remark.name], "usesAnalyses", False) for remark in pm.remarks)
+    computed = pm.analyses.computed["loops"]
+    same = ICInterp.run(optimized).variables == ICInterp.run(ic).variables
+    ok = same and computed <= runs
+    rows.append([name, "cached analyses", "%d loop forests for %d loop pass runs" % (computed, runs), "ok" if ok else "NO"])
+    failed = failed or not ok
+
+tmp.cleanup()
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Program", "Check", "Result", "Status"]))
+
+sys.exit(1 if failed else 0)
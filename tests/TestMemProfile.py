@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+
+import sys
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import Pipeline
+from MemProfile import MemoryProfiler
+
+profiler = MemoryProfiler(topSites=3)
+
+ast, ic = Pipeline.compileFile(sys.argv[1], level=2, stats=profiler)
+
+profiler.stop()
+
+print(profiler.table())
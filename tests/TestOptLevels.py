@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import sys
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import ICInterp
+
+def execute(quadList):
+    try:
+        return ICInterp.run(quadList)
+    except ICInterp.ICRuntimeError as error:
+        return error
+
+# NaN is not equal to itself, so the values are compared by their repr
+def outcome(result):
+    if isinstance(result, ICInterp.ICRuntimeError):
+        return "panicked: %s" % result
+    return repr(result.variables)
+
+parser = RustParser.RustParser()
+
+# Every preset must compute what -O0 computes, on every file given
+rows = []
+failed = False
+for sourcePath in sys.argv[1:]:
+    reference = None
+    for level in sorted(Pipeline.ico.optLevels):
+        _, ic = Pipeline.compileFile(sourcePath, level=level, parser=parser)
+        result = execute(list(ic))
+        if reference is None:
+            reference = outcome(result)
+        same = outcome(result) == reference
+        failed = failed or not same
+        rows.append([path.basename(sourcePath), "-O%d" % level, str(len(ic)),
+                     str(getattr(result, "steps", "")), "yes" if same else outcome(result)])
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Program", "Level", "Quads", "Executed", "Same as -O0"]))
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import sys
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import ICInterp
+import ICSSA
+import IntCodeOpt as ico
+
+def execute(quadList):
+    try:
+        return ICInterp.run(quadList)
+    except ICInterp.ICRuntimeError as error:
+        return error
+
+def sameResult(a, b):
+    if isinstance(a, ICInterp.ICRuntimeError) or isinstance(b, ICInterp.ICRuntimeError):
+        return str(a) == str(b)
+    return a.variables == b.variables
+
+_, ic = Pipeline.compileFile(sys.argv[1], level=0)
+reference = execute(ic)
+
+ssa = ICSSA.SSAForm(ic)
+print(ssa)
+
+# Every version is defined once, and read where a definition of it dominates
+definedIn = {}
+problems = []
+for ind in ssa.domTree.order:
+    for phi in ssa.phis[ind]:
+        if phi.target in definedIn:
+            problems.append("%s defined twice" % phi.target)
+        definedIn[phi.target] = ind
+        if len(phi.args) != len(ssa.cfg.blocks[ind].preds):
+            problems.append("%s has %d arguments for %d preds" % (phi.target, len(phi.args), len(ssa.cfg.blocks[ind].preds)))
+    for quad in ssa.code[ind]:
+        name = ICSSA.definedName(quad)
+        if name is not None:
+            if name in definedIn:
+                problems.append("%s defined twice" % name)
+            definedIn[name] = ind
+for ind in ssa.domTree.order:
+    for quad in ssa.code[ind]:
+        for name in ICSSA.readNames(quad):
+            if not name.endswith(".0") and not ssa.domTree.dominates(definedIn.get(name, ind), ind):
+                problems.append("%s read in block %d out of its definition" % (name, ind))
+    for phi in ssa.phis[ind]:
+        for pred, arg in zip(ssa.cfg.blocks[ind].preds, phi.args):
+            if arg is not None and not arg.endswith(".0") and not ssa.domTree.dominates(definedIn.get(arg, pred), pred):
+                problems.append("%s reaches block %d out of its definition" % (arg, ind))
+
+rows = [["SSA form", "%d versions, %d phis" % (len(definedIn), sum(len(phis) for phis in ssa.phis)), "\n".join(problems) or "ok"]]
+
+# Going out of SSA gives back a program computing the same values
+result = execute(ssa.toQuads())
+rows.append(["Out of SSA", "%d quads" % len(ssa.toQuads()), "ok" if sameResult(result, reference) else "different values"])
+failed = len(problems) > 0 or not sameResult(result, reference)
+
+# Both constant propagation passes, followed by the cleanup
+sizes = {}
+for pas in [ico.constantFoldingAndPropagation, ico.sparseConditionalConstantPropagation]:
+    pm = ico.PassManager(groups=[[pas], [ico.peepholeCleanup]])
+    optimized = pm.run(list(Pipeline.compileFile(sys.argv[1], level=0)[1]))
+    result = execute(optimized)
+    same = sameResult(result, reference)
+    failed = failed or not same
+    sizes[pas] = len(optimized)
+    counts = pm.summary()[pas.__name__]["counts"]
+    rows.append([pas.__name__, "%d quads, %s executed" % (len(optimized), getattr(result, "steps", "-")),
+                 ("ok" if same else "different values") + "\n" + ", ".join("%s=%d" % kv for kv in sorted(counts.items()))])
+
+# SCCP finds at least the constants found along straight line code
+if sizes[ico.sparseConditionalConstantPropagation] > sizes[ico.constantFoldingAndPropagation]:
+    rows.append(["sparseConditionalConstantPropagation", "", "left more quads than constantFoldingAndPropagation"])
+    failed = True
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Check", "Size", "Result"]))
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import sys
+import tempfile
+from os import path
+
+scriptPath = path.dirname(path.realpath(__file__))
+sys.path.append(path.join(scriptPath, "..", "src"))
+
+import RustParser
+import Pipeline
+import ICInterp
+
+# The right operands index a past the end once i reaches 4, so the program
+# panics unless && and || skip them
+guarded = """fn main () {
+    let mut a:[i64; 4] = [1; 4];
+    let mut i:i64 = 0;
+    let mut b:i64 = 7;
+    let mut hits:i64 = 0;
+    let f:f64 = 1.5;
+    while i < 4 && a[i] > 0 {
+        i = i + 1;
+    }
+    if i > 3 || a[i] == 0 {
+        hits = hits + 1;
+    }
+    let mut ok:bool = i < 4 && a[i] > 0;
+    let mut no:bool = !(i < 4 && a[i] > 0) || b == 2;
+    if !(i < 4) && !(f < 1.0) {
+        hits = hits + 10;
+    }
+    if (b > 2 || b < 0) && !ok {
+        hits = hits + 100;
+    }
+    while !(b < 3) {
+        b = b - 1;
+    }
+}
+"""
+
+expected = {"a": [1, 1, 1, 1], "i": 4, "b": 2, "hits": 111, "f": 1.5, "ok": False, "no": True}
+
+def check(quadList, reference):
+    problems = []
+    logical = [quad for quad in quadList if quad.op in {"&&", "||"}]
+    if logical:
+        problems.append("%d logical operator quads" % len(logical))
+    try:
+        result = ICInterp.run(quadList)
+    except ICInterp.ICRuntimeError as error:
+        return None, problems + ["panicked: %s" % error]
+    if reference is not None and result.variables != reference:
+        problems.append("computes %s" % result.variables)
+    return result, problems
+
+tmp = tempfile.TemporaryDirectory()
+guardedPath = path.join(tmp.name, "guarded.rs")
+with open(guardedPath, "w") as f:
+    f.write(guarded)
+
+failed = False
+rows = []
+for name, sourcePath, reference in [[path.basename(sys.argv[1]), sys.argv[1], None], ["guarded", guardedPath, expected]]:
+    for hashCons in [False, True]:
+        parser = RustParser.RustParser(verbose=0, hash_cons=hashCons)
+        for level in sorted(Pipeline.ico.optLevels):
+            _, ic = Pipeline.compileFile(sourcePath, level=level, parser=parser)
+            result, problems = check(list(ic), reference)
+            if reference is None and result is not None:
+                reference = result.variables
+            rows.append([name, "-O%d%s" % (level, " --hash-cons" if hashCons else ""),
+                         str(getattr(result, "steps", "")), "\n".join(problems) or "ok"])
+            failed = failed or bool(problems)
+
+tmp.cleanup()
+
+print(RustParser.multiLineTabulate(rows=rows, headers=["Program", "Options", "Executed", "Status"]))
+
+sys.exit(1 if failed else 0)
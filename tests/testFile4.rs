@@ -0,0 +1,65 @@
+// For testing the IC interpreter.
+fn main () {
+    let mut a:[i32; 8] = [3; 5];
+    let mut i:i64 = 0;
+    let mut sum:i32 = 0;
+    let mut small:u8 = 250;
+    let mut q:i32 = -7 / 2;
+    let r:i32 = -7 % 2;
+    while i < 8 {
+        a[i] = a[i] * 2 + 1;
+        sum = sum + a[i];
+        small = small + 1u8;
+        i = i + 1;
+    }
+    if sum > 20 && !(q == 0) {
+        q = q * 10;
+    } else {
+        q = 0;
+    }
+    // Constants are stored with the type of their variable
+    let big:f32 = 16777217.0;
+    let bigger:f32 = big + 1.0;
+    let t:i8 = 200;
+    let mut over:i32 = 0;
+    if t > 100 {
+        over = 1;
+    }
+    // A let in a block only shadows the outer binding until the block ends
+    if over == 0 {
+        let sum:u8 = 255;
+        let sum:u8 = sum + 2;
+        small = small + sum;
+    }
+    let last:i32 = sum;
+    // Loops with constant trip counts over strided array elements
+    let mut b:[i64; 64] = [0; 64];
+    let mut j:i64 = 0;
+    while j < 30 {
+        b[2 * j + 1] = j * 3;
+        j = j + 1;
+    }
+    let mut k:i64 = 67;
+    let mut odd:i64 = 0;
+    while k > 3 {
+        k = k - 4;
+        if k > 31 {
+            odd = odd + b[k];
+        } else {
+            odd = odd - b[k];
+        }
+    }
+    // An element read in a branch that is never taken must not be hoisted
+    // out of the loop, as it is out of bounds
+    let g:[i32; 4] = [1; 4];
+    let far:[i64; 2] = [10; 2];
+    let mut n:i64 = 0;
+    let mut m:i64 = far[0];
+    let mut gs:i32 = 0;
+    while n < 3 {
+        if m < 4 {
+            gs = g[m] + 1;
+        }
+        n = n + 1;
+    }
+}
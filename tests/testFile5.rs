@@ -0,0 +1,48 @@
+// For testing SSA and sparse conditional constant propagation.
+fn main () {
+    let mut a:[i64; 4] = [0; 4];
+    let mode:i64 = 2;
+    let mut scale:i64 = 0;
+    if mode == 1 {
+        scale = 3;
+    } else {
+        scale = 4;
+    }
+    // scale is 4 on the only executable path
+    let mut i:i64 = 0;
+    let mut step:i64 = 1;
+    let mut total:i64 = 0;
+    while i < 4 {
+        // step stays 1 around the loop
+        if step != 1 {
+            step = step + 1;
+        }
+        a[i * step] = i * scale;
+        total = total + a[i];
+        i = i + step;
+    }
+    let debug:bool = !true;
+    let mut trace:i64 = 0;
+    if debug {
+        trace = trace + total;
+    }
+    // A binding shadowing x is another variable, the outer x is back after
+    // the block
+    let mut x:i64 = 5;
+    total = total + x;
+    {
+        let x:i64 = scale * 3;
+        total = total + x;
+    }
+    x = x + 1;
+    let mut z:i32 = 1;
+    if mode == 2 {
+        let mut z:u8 = 2;
+        z = z + 1u8;
+    }
+    z = -7;
+    let mut negative:bool = false;
+    if z < 0 {
+        negative = true;
+    }
+}
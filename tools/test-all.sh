@@ -21,6 +21,23 @@ runTest() {
 runTest "$BASEDIR/tests/TestLexerAuto.py" "Running Lexer Unit Tests"
 runTest "$BASEDIR/tests/TestLexerManual.py" "Running Lexer Manual Test"
 runTest "$BASEDIR/tests/TestSymbolTable.py $BASEDIR/tests/testFile2.rs 1" "Running Symbol Table Test"
+runTest "$BASEDIR/tests/TestLRDriver.py $BASEDIR/tests/testFile1.rs" "Running LR Parse Driver Test"
 runTest "$BASEDIR/tests/TestAST.py $BASEDIR/tests/testFile1.rs" "Running Abstract Syntax Tree Test"
+runTest "$BASEDIR/tests/TestASTSerialize.py $BASEDIR/tests/testFile1.rs" "Running AST Serialization Test"
+runTest "$BASEDIR/tests/TestASTWalk.py $BASEDIR/tests/testFile1.rs" "Running AST Traversal Test"
+runTest "$BASEDIR/tests/TestHashCons.py $BASEDIR/tests/testFile4.rs" "Running Hash Consing Test"
 runTest "$BASEDIR/tests/TestICGen.py $BASEDIR/tests/testFile1.rs" "Running Intermediate Code Generation Test"
+runTest "$BASEDIR/tests/TestShortCircuit.py $BASEDIR/tests/testFile4.rs" "Running Short-Circuit Lowering Test"
+runTest "$BASEDIR/tests/TestBranches.py $BASEDIR/tests/testFile5.rs" "Running Compare-and-Branch Test"
+runTest "$BASEDIR/tests/TestICWriter.py $BASEDIR/tests/testFile4.rs" "Running IC Writer Test"
 runTest "$BASEDIR/tests/TestICOpt.py $BASEDIR/tests/testFile3.rs" "Running Intermediate Code Optimization Test"
+runTest "$BASEDIR/tests/TestSSA.py $BASEDIR/tests/testFile5.rs" "Running SSA and Sparse Conditional Constant Propagation Test"
+runTest "$BASEDIR/tests/TestLoopNest.py $BASEDIR/tests/testFile5.rs" "Running Loop Nest Analysis Test"
+runTest "$BASEDIR/tests/TestCompileStats.py $BASEDIR/tests/testFile1.rs" "Running Compile Statistics Test"
+runTest "$BASEDIR/tests/TestMemProfile.py $BASEDIR/tests/testFile1.rs" "Running Memory Profiling Test"
+runTest "$BASEDIR/tests/TestICInterp.py $BASEDIR/tests/testFile4.rs" "Running Intermediate Code Interpreter Test"
+runTest "$BASEDIR/tests/TestOptLevels.py $BASEDIR/tests/*.rs" "Running Optimization Levels Test"
+runTest "$BASEDIR/tests/TestCBackend.py $BASEDIR/tests/testFile4.rs" "Running C Backend Test"
+runTest "$BASEDIR/tests/TestICBinary.py $BASEDIR/tests/testFile4.rs $BASEDIR/tests/testFile1.rs" "Running Binary IC Format Test"
+runTest "$BASEDIR/tests/TestCompileCache.py $BASEDIR/tests/testFile4.rs" "Running Compile Cache Test"
+runTest "$BASEDIR/tests/TestCLI.py $BASEDIR/tests/testFile1.rs" "Running Command Line Test"